@@ -4,15 +4,23 @@ Initializes the Dash app, sets up routing, and registers callbacks.
 """
 
 import os
+
+import startup  # first, so the startup report covers every import
 from dash import Dash, html, dcc
 
 from config import APP_INDEX_STRING
 from callbacks import register_callbacks
+from uploads import register_upload_routes
+from jobs import BACKGROUND_MANAGER
+from layouts import navbar, home_layout, single_layout, cross_layout, docs_layout
+
+startup.mark("imports")
 
 # -----------------------------
 # App Setup
 # -----------------------------
-app = Dash(__name__, suppress_callback_exceptions=True)
+# Heavy analyses run as background callbacks (progress, cancel) managed by jobs.py
+app = Dash(__name__, suppress_callback_exceptions=True, background_callback_manager=BACKGROUND_MANAGER)
 app.title = "Index Data Analysis"
 app.index_string = APP_INDEX_STRING
 
@@ -43,6 +51,19 @@ app.layout = html.Div(
 # Register all callbacks
 register_callbacks(app)
 
+# Resumable chunked uploads for large files (binary chunks straight to the server)
+register_upload_routes(server)
+startup.mark("app setup")
+
+# Build the (memoized) page layouts now rather than on the first visit to each page
+for build_layout in (navbar, home_layout, single_layout, cross_layout, docs_layout):
+    build_layout()
+startup.mark("layouts")
+
+# numpy/pandas/plotly are imported lazily; load them in the background while the worker serves
+startup.warm_up()
+startup.startup_report()
+
 # -----------------------------
 # Local run (useful for dev & Render health checks)
 # -----------------------------
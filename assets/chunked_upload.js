@@ -0,0 +1,102 @@
+// Resumable chunked uploads for <button class="chunked-upload-button"> (components.ChunkedUploader).
+// Dash has no file <input> component, so a click opens the picker of a detached file input.
+// The file is sent in binary chunks to the routes in uploads.py, which parse it in the background;
+// the result is polled and only the dataset handle is written to the Dash store named by data-store-id.
+(function () {
+    function setStatus(button, text) {
+        var el = document.getElementById(button.dataset.statusId);
+        if (el) {
+            el.textContent = text;
+        }
+    }
+
+    function sleep(ms) {
+        return new Promise(function (resolve) { setTimeout(resolve, ms); });
+    }
+
+    async function readJson(resp) {
+        var body = await resp.json().catch(function () { return {}; });
+        if (!resp.ok && resp.status !== 409) {
+            throw new Error(body.error || resp.statusText);
+        }
+        return body;
+    }
+
+    async function putChunk(url, blob, retries) {
+        for (var attempt = 0; ; attempt++) {
+            try {
+                var resp = await fetch(url, {
+                    method: "PUT",
+                    headers: {"Content-Type": "application/octet-stream"},
+                    body: blob
+                });
+                // 409 carries the server's offset, so the caller simply resumes from there;
+                // other 4xx are real errors, only 5xx / network failures are retried
+                if (resp.status < 500) {
+                    return await readJson(resp);
+                }
+                if (attempt >= retries) {
+                    throw new Error(resp.statusText);
+                }
+            } catch (err) {
+                if (attempt >= retries) {
+                    throw err;
+                }
+            }
+            await sleep(1000 * (attempt + 1));
+        }
+    }
+
+    async function upload(button, file) {
+        var base = button.dataset.uploadUrl;
+        var init = await readJson(await fetch(base + "/init", {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({filename: file.name, size: file.size, fingerprint: String(file.lastModified)})
+        }));
+        var received = init.received;
+        while (received < file.size) {
+            setStatus(button, "Uploading " + file.name + ": " + Math.floor(100 * received / file.size) + "%");
+            var chunk = file.slice(received, received + init.chunk_size);
+            received = (await putChunk(base + "/" + init.upload_id + "?offset=" + received, chunk, 5)).received;
+        }
+        setStatus(button, "Processing " + file.name + "...");
+        var done = await readJson(await fetch(base + "/" + init.upload_id + "/complete", {method: "POST"}));
+        if (!done.batch_id) {
+            return {filename: file.name, error: done.error || "upload is incomplete"};
+        }
+        for (;;) {
+            await sleep(1000);
+            var result = await readJson(await fetch(base + "/batch/" + done.batch_id));
+            if (result.state !== "pending") {
+                result.filename = result.filename || file.name;
+                return result;
+            }
+        }
+    }
+
+    document.addEventListener("click", function (event) {
+        var button = event.target.closest ? event.target.closest(".chunked-upload-button") : null;
+        if (!button) {
+            return;
+        }
+        var input = document.createElement("input");
+        input.type = "file";
+        input.accept = button.dataset.accept || "";
+        input.addEventListener("change", function () {
+            if (!input.files.length) {
+                return;
+            }
+            var file = input.files[0];
+            upload(button, file)
+                .catch(function (err) {
+                    return {filename: file.name, error: "Upload failed: " + (err.message || err)};
+                })
+                .then(function (result) {
+                    setStatus(button, "");
+                    window.dash_clientside.set_props(button.dataset.storeId, {data: result});
+                });
+        });
+        input.click();
+    });
+})();
@@ -0,0 +1,174 @@
+"""
+Multi-file batch uploads.
+Files dropped together are parsed in parallel in a process pool (same rules as a single
+upload, utils.parse_upload); each result is registered in the dataset registry with its
+own warnings or error. The UI polls batch_status() to show progress as files complete.
+Batch status lives in the job store (jobs.JOB_CACHE), so a poll served by another gunicorn
+worker sees the files the submitting worker has finished.
+Files already parsed before (same upload_fingerprint) are reused without a worker round trip.
+A finished chunked upload (uploads.py) is parsed the same way, as a one-file batch
+(submit_upload_file), so the request that completes it does not wait for the parse.
+"""
+
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import BATCH_UPLOAD_WORKERS, JOB_RESULT_TTL_SECONDS
+from datasets import (register_dataset, find_uploaded_dataset, dataset_meta, get_dataset, upload_fingerprint,
+                      file_fingerprint)
+from jobs import JOB_CACHE
+from startup import lazy_import
+from utils import parse_upload, parse_upload_file
+
+pd = lazy_import("pandas")
+
+_lock = threading.Lock()
+_pool = None
+
+
+def _get_pool(reset: bool = False) -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None or reset:
+            # spawn: forking a threaded web server process is not safe
+            _pool = ProcessPoolExecutor(max_workers=BATCH_UPLOAD_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _submit(fn, *args):
+    try:
+        return _get_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory) - start a fresh pool for the rest
+        return _get_pool(reset=True).submit(fn, *args)
+
+
+def _parse_file(contents: str, filename: str):
+    """Runs in a worker: parse one upload and send back only the two result columns."""
+    return _columns(*parse_upload(contents, filename))
+
+
+def _parse_stored_file(path: str, filename: str):
+    """
+    Runs in a worker: hash and parse an upload assembled on disk, then delete the file.
+    Returns (upload_hash, key of a dataset already parsed from the same bytes or None,
+    datetimes, values, warnings, error). Earlier uploads are found through the dataset
+    directory, which the workers share with the web processes.
+    """
+    try:
+        upload_hash = file_fingerprint(path, filename)
+        key = find_uploaded_dataset(upload_hash)
+        if key is not None:
+            return upload_hash, key, None, None, [], None
+        return (upload_hash, None) + _columns(*parse_upload_file(path, filename))
+    finally:
+        _remove(path)
+
+
+def _columns(df, warns, err):
+    if err:
+        return None, None, warns, err
+    return df["datetime"].to_numpy(), df["index"].to_numpy(), warns, None
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _save_file(batch_id: str, i: int, entry: dict):
+    # One key per file: each is written by a single thread, so updates never race
+    JOB_CACHE.set(("batch", batch_id, i), entry, expire=JOB_RESULT_TTL_SECONDS)
+
+
+def _finish(batch_id: str, i: int, entry: dict, upload_hash: str, future):
+    try:
+        datetimes, values, warns, err = future.result()
+    except Exception as e:
+        datetimes = values = None
+        warns, err = [], f"Failed to parse: {e}"
+    _record(batch_id, i, entry, upload_hash, datetimes, values, warns, err)
+
+
+def _finish_stored(batch_id: str, entry: dict, path: str, future):
+    try:
+        upload_hash, key, datetimes, values, warns, err = future.result()
+    except Exception as e:
+        # The worker died before it could delete the file
+        _remove(path)
+        upload_hash, key, datetimes, values, warns, err = None, None, None, None, [], f"Failed to parse: {e}"
+    df = get_dataset(key) if key else None
+    if df is not None:
+        _reuse(batch_id, 0, entry, key, df)
+    else:
+        _record(batch_id, 0, entry, upload_hash, datetimes, values, warns, err)
+
+
+def _reuse(batch_id: str, i: int, entry: dict, key: str, df):
+    entry.update({"state": "done", "rows": int(len(df)), "dataset_key": key,
+                  "warnings": dataset_meta(key).get("warnings") or []})
+    _save_file(batch_id, i, entry)
+
+
+def _record(batch_id: str, i: int, entry: dict, upload_hash: str, datetimes, values, warns, err):
+    if err:
+        update = {"state": "error", "error": err, "warnings": warns}
+    else:
+        df = pd.DataFrame({"datetime": datetimes, "index": values}, copy=False)
+        key = register_dataset(df, upload_hash=upload_hash, filename=entry["filename"], warnings=warns)
+        update = {"state": "done", "rows": int(len(df)), "warnings": warns, "dataset_key": key}
+    entry.update(update)
+    _save_file(batch_id, i, entry)
+
+
+def _new_batch(filenames):
+    files = [{"filename": name, "state": "pending", "rows": None, "warnings": [], "error": None,
+              "dataset_key": None} for name in filenames]
+    batch_id = uuid.uuid4().hex
+    for i, entry in enumerate(files):
+        _save_file(batch_id, i, entry)
+    JOB_CACHE.set(("batch", batch_id), len(files), expire=JOB_RESULT_TTL_SECONDS)
+    return batch_id, files
+
+
+def submit_batch(contents_list, filenames) -> str:
+    """Queue every file for parsing and return the batch id to poll."""
+    batch_id, files = _new_batch(filenames)
+    for i, (entry, contents) in enumerate(zip(files, contents_list)):
+        upload_hash = upload_fingerprint(contents, entry["filename"])
+        key = find_uploaded_dataset(upload_hash)
+        df = get_dataset(key) if key else None
+        if df is not None:
+            _reuse(batch_id, i, entry, key, df)
+            continue
+        future = _submit(_parse_file, contents, entry["filename"])
+        future.add_done_callback(
+            lambda f, i=i, entry=entry, upload_hash=upload_hash: _finish(batch_id, i, entry, upload_hash, f))
+    return batch_id
+
+
+def submit_upload_file(path: str, filename: str) -> str:
+    """
+    Queue a file assembled on disk for hashing and parsing as a one-file batch and return the
+    batch id to poll. The file is handed over: the worker deletes it once parsed.
+    """
+    batch_id, (entry,) = _new_batch([filename])
+    future = _submit(_parse_stored_file, path, filename)
+    future.add_done_callback(lambda f: _finish_stored(batch_id, entry, path, f))
+    return batch_id
+
+
+def batch_status(batch_id: str):
+    """Per-file status dicts ({filename, state, rows, warnings, error, dataset_key}) or None if unknown."""
+    count = JOB_CACHE.get(("batch", batch_id)) if batch_id else None
+    if count is None:
+        return None
+    files = [JOB_CACHE.get(("batch", batch_id, i)) for i in range(count)]
+    return None if any(f is None for f in files) else files
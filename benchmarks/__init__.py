@@ -0,0 +1,8 @@
+"""
+Benchmark suite for the utils.py analysis kernels.
+
+Run from the repository root:
+    python -m benchmarks                                # full sweep, 1e3 .. 1e7 rows
+    python -m benchmarks --sizes 1000 100000 --output bench.json
+    python -m benchmarks --baseline bench.json          # fail on regressions vs a stored report
+"""
@@ -0,0 +1,46 @@
+"""
+Command line entry point: python -m benchmarks [--sizes ...] [--output report.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks.kernels import DEFAULT_SIZES, DEFAULT_WINDOWS, KERNELS
+from benchmarks.runner import run_suite, compare_reports
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the utils.py analysis kernels.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="row counts to generate")
+    parser.add_argument("--windows", type=int, nargs="+", default=DEFAULT_WINDOWS, help="window sizes in calendar days")
+    parser.add_argument("--kernels", nargs="+", choices=list(KERNELS), help="subset of kernels (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against; exit code 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.windows, args.kernels, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        for r in regressions:
+            window = "" if r["window"] is None else f" window={r['window']}d"
+            print(f"REGRESSION {r['kernel']} rows={r['rows']:,}{window}: "
+                  f"{r['baseline_seconds_min'] * 1000:.2f} ms -> {r['seconds_min'] * 1000:.2f} ms (x{r['ratio']:.2f})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Synthetic data and the kernels timed by the benchmark runner.
+Each kernel is a setup function returning a zero-argument callable; setup cost is not timed.
+Kernels missing from the utils.py being measured are left out, so this package can also be
+copied into an older checkout to produce a baseline report (see README).
+"""
+
+import base64
+
+import numpy as np
+import pandas as pd
+
+from utils import (
+    parse_csv_flexible, compute_windowed_returns_calendar,
+    build_indicators, compute_drawdown_recovery, drop_event_analysis, gain_event_analysis,
+)
+
+try:
+    from utils import compute_windowed_returns_matrix
+except ImportError:  # added after the original tree (53f5ac6)
+    compute_windowed_returns_matrix = None
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_WINDOWS = [1, 5, 21, 63, 252]
+
+# Daily rows stop fitting in the datetime64[ns] range well before 1e7, so larger series are intraday
+_DAILY_MAX_ROWS = 50_000
+
+
+def synthetic_series(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Sorted ['datetime','index'] random walk with weekends removed (daily, or minute bars for large sizes)."""
+    freq = "D" if rows <= _DAILY_MAX_ROWS else "min"
+    # 7/5 covers the weekend days dropped below
+    stamps = pd.date_range("1990-01-01", periods=rows * 7 // 5 + 7, freq=freq)
+    stamps = stamps[stamps.dayofweek < 5][:rows]
+    # ~1% daily volatility regardless of bar size keeps long intraday walks in a sane range
+    step_vol = 0.01 if freq == "D" else 0.01 / np.sqrt(24 * 60)
+    rng = np.random.default_rng(seed)
+    prices = 1000.0 * np.exp(np.cumsum(rng.normal(0.0, step_vol, rows)))
+    return pd.DataFrame({"datetime": stamps, "index": prices})
+
+
+def csv_upload(df: pd.DataFrame):
+    """(contents, filename) as dcc.Upload delivers them for df written as CSV."""
+    payload = df.rename(columns={"datetime": "Date", "index": "Close"}).to_csv(index=False).encode()
+    return "data:text/csv;base64," + base64.b64encode(payload).decode(), "bench.csv"
+
+
+def _parse_csv(df, window):
+    contents, filename = csv_upload(df)
+    return lambda: parse_csv_flexible(contents, filename)
+
+
+def _windowed_returns(df, window):
+    return lambda: compute_windowed_returns_calendar(df, window)
+
+
+def _windowed_returns_matrix(df, window):
+    return lambda: compute_windowed_returns_matrix(df, DEFAULT_WINDOWS)
+
+
+def _indicators(df, window):
+    return lambda: build_indicators(df)
+
+
+def _drawdowns(df, window):
+    return lambda: compute_drawdown_recovery(df)
+
+
+def _drop_events(df, window):
+    return lambda: drop_event_analysis(df, 0.05, window)
+
+
+def _gain_events(df, window):
+    return lambda: gain_event_analysis(df, 0.05, window)
+
+
+# name -> (setup(df, window), swept over window sizes?)
+KERNELS = {
+    "parse_csv_flexible": (_parse_csv, False),
+    "compute_windowed_returns_calendar": (_windowed_returns, True),
+    "compute_windowed_returns_matrix": (_windowed_returns_matrix, False),
+    "build_indicators": (_indicators, False),
+    "compute_drawdown_recovery": (_drawdowns, False),
+    "drop_event_analysis": (_drop_events, True),
+    "gain_event_analysis": (_gain_events, True),
+}
+if compute_windowed_returns_matrix is None:
+    del KERNELS["compute_windowed_returns_matrix"]
@@ -0,0 +1,99 @@
+"""
+Timing / peak-memory measurement and baseline comparison for the benchmark suite.
+"""
+
+import gc
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.kernels import KERNELS, synthetic_series
+
+
+def measure(fn, repeat: int = 3) -> dict:
+    """Best/median wall time over `repeat` runs plus traced peak memory of one extra run."""
+    times = []
+    for _ in range(max(int(repeat), 1)):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    # Separate run: tracemalloc slows Python-level code down, so it must not skew the timings
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def run_suite(sizes, windows, kernels=None, repeat: int = 3, log=print) -> dict:
+    """Time every selected kernel for every size (and window, where the kernel takes one)."""
+    kernels = list(KERNELS) if not kernels else list(kernels)
+    unknown = [k for k in kernels if k not in KERNELS]
+    if unknown:
+        raise ValueError(f"Unknown kernel(s): {unknown}. Available: {list(KERNELS)}")
+
+    results = []
+    for rows in sizes:
+        df = synthetic_series(int(rows))
+        for name in kernels:
+            setup, per_window = KERNELS[name]
+            for window in (windows if per_window else [None]):
+                fn = setup(df, window)
+                entry = {"kernel": name, "rows": int(rows), "window": window, **measure(fn, repeat)}
+                results.append(entry)
+                log(_format_entry(entry))
+                del fn
+        del df
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _result_key(entry):
+    return entry["kernel"], entry["rows"], entry["window"]
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Entries of `report` whose best time is more than `tolerance` (fraction) slower than the
+    matching (kernel, rows, window) entry of `baseline`. Entries missing from either side are ignored.
+    """
+    base = {_result_key(e): e for e in baseline.get("results", [])}
+    regressions = []
+    for entry in report.get("results", []):
+        ref = base.get(_result_key(entry))
+        if ref is None or ref["seconds_min"] <= 0:
+            continue
+        ratio = entry["seconds_min"] / ref["seconds_min"]
+        if ratio > 1.0 + tolerance:
+            regressions.append({**entry, "baseline_seconds_min": ref["seconds_min"], "ratio": ratio})
+    return regressions
+
+
+def _format_entry(entry) -> str:
+    window = "" if entry["window"] is None else f"{entry['window']}d"
+    return (f"{entry['kernel']:<36}{entry['rows']:>12,}{window:>7}"
+            f"{entry['seconds_min'] * 1000:>12.2f} ms{entry['peak_mb']:>10.1f} MB")
@@ -3,22 +3,31 @@ Callback functions for the Index Data Analysis app.
 Contains all Dash app callbacks for user interactions.
 """
 
-import base64
-import io
-import numpy as np
-import pandas as pd
-from dash import html, dcc, dash_table, no_update
-from dash.dependencies import Input, Output, State
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from dash import html, dcc, dash_table, no_update, ctx, Patch
+from dash.dependencies import Input, Output, State, MATCH
 
 from utils import (
-    parse_csv_flexible, compute_range, compute_windowed_returns_calendar,
-    build_indicators, drop_event_analysis, gain_event_analysis,
-    compute_drawdown_recovery
+    parse_upload, compute_range, indicator_columns_for, drop_event_analysis, gain_event_analysis,
+    count_exceedances, exceedance_curve,
+    cached_windowed_returns, cached_sorted_returns, cached_indicators,
+    compute_drawdown_recovery, cached_drawdown_recovery, drawdown_shading, build_trade_window_table, get_trade_windows, page_trade_windows,
+    downsampled_graph, zoom_downsampled_traces, stored_views_available, is_normalized
 )
-from config import STORE_RAW, STORE_META, STORE_A, STORE_B, MONTH_OPTIONS
+from datasets import (register_dataset, get_dataset, dataset_meta, upload_fingerprint,
+                      find_uploaded_dataset, switch_dataset, append_dataset)
+from batch_upload import submit_batch, batch_status
+from jobs import report_progress, run_sections, single_flight
+from result_cache import cached_result
+from components import JOB_STATUS_SHOWN, JOB_STATUS_HIDDEN
+from config import STORE_RAW, STORE_META, STORE_A, STORE_B, MONTH_OPTIONS, JOB_POLL_INTERVAL_MS
 from layouts import navbar, home_layout, single_layout, cross_layout, docs_layout
+from startup import lazy_import
+
+# Imported on first use (or by startup.warm_up), not when a worker boots
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+go = lazy_import("plotly.graph_objects")
+subplots = lazy_import("plotly.subplots")
 
 
 def register_callbacks(app):
@@ -61,7 +70,6 @@ def register_callbacks(app):
         prevent_initial_call=True,
     )
     def update_indicators_select_all(select_all_clicks, clear_all_clicks, options):
-        ctx = dash.callback_context
         if not ctx.triggered:
             return no_update
         
@@ -76,6 +84,44 @@ def register_callbacks(app):
         
         return no_update
     
+    def load_upload(contents, filename, handle, use_handle):
+        """
+        (df, warnings, error, filename, dataset_key) for a dcc.Upload payload, or for the handle
+        a ChunkedUploader store received once the server parsed the file (use_handle=True).
+        A payload whose content was already parsed (by any session) reuses that dataset.
+        """
+        if use_handle:
+            filename = handle.get("filename")
+            if handle.get("error"):
+                return None, [], handle["error"], filename, None
+            df = get_dataset(handle.get("dataset_key"))
+            if df is None:
+                return None, [], "This upload is no longer loaded on the server. Please upload the file again.", filename, None
+            return df, handle.get("warnings") or [], None, filename, handle["dataset_key"]
+        upload_hash = upload_fingerprint(contents, filename)
+        dataset_key = find_uploaded_dataset(upload_hash)
+        df = get_dataset(dataset_key) if dataset_key else None
+        if df is not None:
+            return df, dataset_meta(dataset_key).get("warnings") or [], None, filename, dataset_key
+        df, warns, err = parse_upload(contents, filename)
+        dataset_key = register_dataset(df, upload_hash=upload_hash, filename=filename, warnings=warns) if not err else None
+        return df, warns, err, filename, dataset_key
+    
+    def append_upload(contents, filename, previous):
+        """(df, warnings, error, filename, dataset_key) after merging an uploaded file's rows into the session's dataset."""
+        previous_key = (previous or {}).get("dataset_key")
+        if not previous_key:
+            return None, [], "Upload a dataset first, then append new rows to it.", filename, None
+        rows, warns, err = parse_upload(contents, filename)
+        if err:
+            return None, warns, err, filename, None
+        base_filename = previous.get("filename") or filename
+        dataset_key, kept = append_dataset(previous_key, rows, filename=base_filename, warnings=warns)
+        if dataset_key is None:
+            return None, [], "The dataset to append to is no longer loaded on the server. Please upload it again.", filename, None
+        warns = [f"Appended {filename}: kept {kept:,} stored rows, merged {len(rows):,} new/updated rows."] + warns
+        return get_dataset(dataset_key), warns, None, base_filename, dataset_key
+    
     # -----------------------------
     # Upload callback (Single page)
     # -----------------------------
@@ -103,14 +149,32 @@ def register_callbacks(app):
         Output("jump-year-gain", "value"),
         Output("jump-month-gain", "value"),
         Input("uploader", "contents"),
+        Input("uploader-chunked", "data"),
+        Input("batch-dataset-select", "value"),
+        Input("uploader-append", "contents"),
         State("uploader", "filename"),
+        State("uploader-append", "filename"),
+        State(STORE_RAW, "data"),
         prevent_initial_call=True,
     )
-    def on_upload_single(contents, filename):
-        if contents is None:
-            return (no_update,)*19
-    
-        df, warns, err = parse_csv_flexible(contents, filename)
+    def on_upload_single(contents, chunked, batch_key, append_contents, filename, append_filename, previous):
+        if ctx.triggered_id == "uploader-append":
+            if append_contents is None:
+                return (no_update,)*19
+            df, warns, err, filename, dataset_key = append_upload(append_contents, append_filename, previous)
+            if err:
+                # A bad append file leaves the loaded dataset as it was
+                return (html.Div(err, style={"color":"crimson"}), None) + (no_update,)*17
+        else:
+            if ctx.triggered_id == "batch-dataset-select":
+                # A dataset parsed by the batch uploader: same shape as a chunked-upload handle
+                chunked = {"dataset_key": batch_key, **dataset_meta(batch_key)} if batch_key else None
+            use_handle = ctx.triggered_id in ("uploader-chunked", "batch-dataset-select")
+            if (chunked if use_handle else contents) is None:
+                return (no_update,)*19
+            df, warns, err, filename, dataset_key = load_upload(contents, filename, chunked, use_handle)
+        # This session now holds dataset_key instead of whatever it showed before
+        switch_dataset((previous or {}).get("dataset_key"), dataset_key)
         if err:
             return (html.Div(err, style={"color":"crimson"}), None, None, None, None,
                     no_update, no_update, no_update, no_update,
@@ -168,7 +232,7 @@ def register_callbacks(app):
             "filename": filename,
             "columns": list(df.columns),
             "rows": int(len(df)),
-            "csv_b64": base64.b64encode(df.to_csv(index=False).encode()).decode(),
+            "dataset_key": dataset_key,
         }
         meta = {"summary": {"rows": int(len(df)), "columns": list(df.columns)}}
     
@@ -186,6 +250,55 @@ def register_callbacks(app):
             year_options, min_d.year, 1
         )
     
+    # -----------------------------
+    # Batch upload (Single page): parse many files in a process pool, poll progress
+    # -----------------------------
+    @app.callback(
+        Output("batch-id", "data"),
+        Output("batch-poll", "disabled"),
+        Input("batch-uploader", "contents"),
+        State("batch-uploader", "filename"),
+        prevent_initial_call=True,
+    )
+    def start_batch_upload(contents_list, filenames):
+        if not contents_list:
+            return no_update, no_update
+        return submit_batch(contents_list, filenames), False
+    
+    @app.callback(
+        Output("batch-progress", "children"),
+        Output("batch-dataset-select", "options"),
+        Output("batch-poll", "disabled", allow_duplicate=True),
+        Input("batch-poll", "n_intervals"),
+        State("batch-id", "data"),
+        prevent_initial_call=True,
+    )
+    def poll_batch_upload(_n, batch_id):
+        files = batch_status(batch_id)
+        if files is None:
+            return None, [], True
+    
+        finished = sum(f["state"] != "pending" for f in files)
+        rows = []
+        for f in files:
+            if f["state"] == "pending":
+                detail, color = "parsing…", "rgba(255,255,255,0.6)"
+            elif f["state"] == "error":
+                detail, color = f["error"], "crimson"
+            else:
+                detail, color = f"{f['rows']:,} rows", "#00c896"
+            warn = f" · {'; '.join(f['warnings'])}" if f["warnings"] else ""
+            rows.append(html.Li([html.Strong(f["filename"]), html.Span(f" · {detail}", style={"color": color}),
+                                 html.Span(warn, style={"color": "#996800"})]))
+        progress = html.Div([
+            html.Div(f"Parsed {finished} of {len(files)} files"),
+            html.Progress(value=str(finished), max=str(len(files)), style={"width": "100%"}),
+            html.Ul(rows, style={"marginTop": "8px", "paddingLeft": "20px"}),
+        ])
+        options = [{"label": f"{f['filename']} ({f['rows']:,} rows)", "value": f["dataset_key"]}
+                   for f in files if f["state"] == "done"]
+        return progress, options, finished == len(files)
+    
     # Preset → custom when dates edited (Single page)
     @app.callback(Output("preset-drop", "value"),
                   Input("date-range-drop", "start_date"),
@@ -270,8 +383,14 @@ def register_callbacks(app):
         # Indicators toggles
         State("indicators-select", "value"),
         prevent_initial_call=True,
+        # Runs as a background job: a newer click supersedes it, Cancel terminates it
+        background=True,
+        running=[(Output("analysis-job-status", "style"), JOB_STATUS_SHOWN, JOB_STATUS_HIDDEN)],
+        progress=[Output("analysis-job-progress", "children")],
+        cancel=[Input("analysis-job-cancel", "n_clicks")],
+        interval=JOB_POLL_INTERVAL_MS,
     )
-    def run_analysis_single(n_clicks, raw_payload, analysis_types,
+    def run_analysis_single(set_progress, n_clicks, raw_payload, analysis_types,
                      preset_drop, sd_drop, ed_drop, snap_drop, ws_drop, ws_in_drop, th_drop, th_in_drop,
                      preset_gain, sd_gain, ed_gain, snap_gain, ws_gain, ws_in_gain, th_gain, th_in_gain,
                      indicators_selected):
@@ -282,43 +401,52 @@ def register_callbacks(app):
             hidden_style = {"display": "none"}
             return (None, None, None, None, None, None, None, None, None, None, None, hidden_style)
     
-        try:
-            csv_bytes = base64.b64decode(raw_payload["csv_b64"].encode())
-            df = pd.read_csv(io.BytesIO(csv_bytes))
-        except Exception as e:
-            # Hide all results on error
-            hidden_style = {"display": "none"}
-            return (None, None, None, None, None, None, None, None, None, None, None, hidden_style)
-    
-        df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
-        df["index"] = pd.to_numeric(df["index"], errors="coerce")
-        df = df.dropna(subset=["datetime", "index"]).sort_values("datetime").reset_index(drop=True)
-    
+        report_progress(set_progress, 1, 3, "Loading dataset")
+        dataset_key = raw_payload.get("dataset_key")
+        # Set for a dataset made by an append: lets the cached kernels recompute only the tail
+        append_base = dataset_meta(dataset_key).get("append_base")
+        df = get_dataset(dataset_key)
+        if df is None:
+            # Evicted from the server-side registry (expired, or restarted worker)
+            expired = html.Div("This dataset is no longer loaded on the server. Please upload the file again.",
+                               style={"color": "crimson"})
+            return (expired, None, None, None, None, None, None, None, None, None, None,
+                    {"display": "flex", "gap": "20px", "flexWrap": "wrap"})
+    
+        # Registry datasets are already typed and sorted (normalized-dataset contract)
         data_min, data_max = df["datetime"].min(), df["datetime"].max()
     
-        def build_outputs(mode: str,
-                          preset, sdate, edate, snap, ws_radio, ws_custom, th_radio, th_custom):
+        def resolve_section(preset, sdate, edate, snap, ws_radio, ws_custom, th_radio, th_custom):
             snap_month = ("snap" in (snap or []))
             start, end = compute_range(preset, sdate, edate, data_min, data_max, snap_month)
             dff = df[(df["datetime"] >= start) & (df["datetime"] <= end)].reset_index(drop=True)
+            ws = int(ws_custom) if ws_custom else int(ws_radio)
+            th_pct = float(th_custom) if th_custom is not None else float(th_radio)
+            return {"start": start, "end": end, "dff": dff, "ws": ws, "th_pct": th_pct}
+    
+        def build_outputs(mode: str, section, ret):
+            start, end, dff = section["start"], section["end"], section["dff"]
             if dff.empty:
                 msg = html.Div(f"No data in selected date range ({start.date()} to {end.date()}).", style={"color": "crimson"})
                 empty = go.Figure()
                 return msg, empty, empty, None, None
     
-            ws = int(ws_custom) if ws_custom else int(ws_radio)
-            th_pct = float(th_custom) if th_custom is not None else float(th_radio)
+            ws = section["ws"]
+            th_pct = section["th_pct"]
             th_frac = th_pct / 100.0
     
+            # Sorted returns: one structure answers the card, the bar chart and the survival curve
+            exceedance = cached_sorted_returns(ret, ws, dataset_key, (start, end))
+    
             # Weekend-aware summary
             if mode == "gain":
-                summary = gain_event_analysis(dff, minimum_per_gain=th_frac, windows_size=ws)
+                summary = gain_event_analysis(dff, minimum_per_gain=th_frac, windows_size=ws, exceedance=exceedance)
                 title = "Gain Event Analysis"
                 label = "Min Gain: "
                 sign = +1
                 color = "#22c55e"
             else:
-                summary = drop_event_analysis(dff, minimum_per_drop=th_frac, windows_size=ws)
+                summary = drop_event_analysis(dff, minimum_per_drop=th_frac, windows_size=ws, exceedance=exceedance)
                 title = "Drop Event Analysis"
                 label = "Min Drop: "
                 sign = -1
@@ -349,7 +477,6 @@ def register_callbacks(app):
             ], style={"border": f"1px solid {border_color}", "borderRadius": "16px", "padding": "24px", "background": bg_color, "boxShadow": "0 4px 12px rgba(0,0,0,0.3)"})
     
             # Weekend-aware returns for visuals
-            ret = compute_windowed_returns_calendar(dff, ws)
             mask = ~ret.isna()
             x_time = dff.loc[mask, "datetime"]
             y_pct = ret.loc[mask].values * 100.0
@@ -391,18 +518,14 @@ def register_callbacks(app):
     
             # Bar chart (counts & probabilities by threshold)
             ret_clean = ret.dropna()
-            N = len(ret_clean)
+            N = len(exceedance)
             thresholds_pct = [i for i in range(1, 11)]
             labels = [f"{t}%" for t in thresholds_pct]
-            if mode == "gain":
-                counts = np.array([(ret_clean >= (t/100.0)).sum() for t in thresholds_pct], dtype=int)
-                bar_title = f"{ws}-day gain events"
-            else:
-                counts = np.array([(ret_clean <= -(t/100.0)).sum() for t in thresholds_pct], dtype=int)
-                bar_title = f"{ws}-day drop events"
+            counts = count_exceedances(exceedance, [t/100.0 for t in thresholds_pct], mode).astype(int)
+            bar_title = f"{ws}-day gain events" if mode == "gain" else f"{ws}-day drop events"
             probs = (counts / N) * 100.0 if N > 0 else np.zeros_like(counts, dtype=float)
     
-            bar_fig = make_subplots(specs=[[{"secondary_y": True}]])
+            bar_fig = subplots.make_subplots(specs=[[{"secondary_y": True}]])
             bar_fig.add_trace(
                 go.Bar(
                     x=labels, y=counts, name="Count",
@@ -448,6 +571,52 @@ def register_callbacks(app):
             bar_fig.update_yaxes(title_text="Count of events", secondary_y=False)
             bar_fig.update_yaxes(title_text="Probability (%)", range=[0, y2_top], secondary_y=True)
     
+            # Survival curve: P(move beyond threshold) on a 0.1% grid up to 50%
+            curve_x, curve_counts, curve_probs = exceedance_curve(exceedance, mode, step_pct=0.1, max_pct=50.0)
+            surv_fig = go.Figure()
+            if N > 0:
+                surv_fig.add_trace(go.Scatter(
+                    x=curve_x, y=curve_probs, mode="lines", name="P(exceed)",
+                    line=dict(color=color, width=2),
+                    customdata=curve_counts,
+                    hovertemplate="≥ %{x:.1f}%<br>Probability: %{y:.2f}%<br>Count: %{customdata:,}<extra></extra>",
+                ))
+                th_prob = float(v["events"]) / N * 100.0
+                surv_fig.add_trace(go.Scatter(
+                    x=[th_pct], y=[th_prob], mode="markers", name=f"Threshold {th_pct:.2f}%",
+                    marker=dict(color="white", size=9, line=dict(color=color, width=2)),
+                ))
+            surv_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor="rgba(26,26,26,0.8)",
+                paper_bgcolor="rgba(10,10,10,0.8)",
+                font=dict(color="rgba(255,255,255,0.9)"),
+                title=dict(
+                    text=f"{ws}-day {mode} survival curve",
+                    x=0.5,
+                    xanchor="center",
+                    y=0.98,
+                    yanchor="top"
+                ),
+                margin=dict(t=100, r=10, l=40, b=40),
+                xaxis_title=f"{mode.title()} threshold (%)",
+                yaxis_title="Probability (%)",
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.01,
+                    xanchor="center",
+                    x=0.5,
+                    bgcolor="rgba(10,10,10,0.9)",
+                    bordercolor="rgba(255,255,255,0.2)",
+                    borderwidth=1,
+                    itemwidth=30,
+                    font=dict(size=10)
+                ),
+                xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
+                yaxis=dict(gridcolor="rgba(255,255,255,0.1)")
+            )
+    
             # Stats
             if N > 0:
                 desc = ret_clean.describe()
@@ -472,11 +641,11 @@ def register_callbacks(app):
                       "borderRadius": "16px", "padding": "24px", "boxShadow": "0 4px 12px rgba(0,0,0,0.3)"})
     
             # Trade windows list
-            # trade_table = build_trade_window_table(dff[["datetime","index"]], ws, limit=200)
+            trade_table = build_trade_window_table(dff[["datetime","index"]], ws)
             
             # Wrap graphs and tables in containers with proper styling
             return_chart_container = html.Div([
-                dcc.Graph(figure=line_fig, config={"displayModeBar": False}, style={"height": "320px"})
+                downsampled_graph(line_fig, config={"displayModeBar": False}, style={"height": "320px"})
             ], style={
                 "background":"rgba(255,255,255,0.05)", "borderRadius":"12px",
                 "padding":"16px", "marginBottom":"16px",
@@ -485,7 +654,8 @@ def register_callbacks(app):
             })
             
             bar_chart_container = html.Div([
-                dcc.Graph(figure=bar_fig, config={"displayModeBar": False}, style={"height": "320px"})
+                downsampled_graph(bar_fig, config={"displayModeBar": False}, style={"height": "320px"}),
+                downsampled_graph(surv_fig, config={"displayModeBar": False}, style={"height": "320px"})
             ], style={
                 "background":"rgba(255,255,255,0.05)", "borderRadius":"12px",
                 "padding":"16px", "marginBottom":"16px",
@@ -493,190 +663,237 @@ def register_callbacks(app):
                 "border":"1px solid rgba(255,255,255,0.1)"
             })
             
-            # COMMENTED OUT FOR DEBUGGING - Trade windows data hidden
-            # trade_windows_container = html.Div([
-            #     html.H4("Trade windows (first and last day)", style={
-            #         "fontSize":"20px", "fontWeight":600, "color":"inherit",
-            #         "marginTop":"32px", "marginBottom":"16px"
-            #     }),
-            #     trade_table
-            # ], style={
-            #     "background":"rgba(255,255,255,0.05)", "borderRadius":"12px",
-            #     "padding":"20px", "boxShadow":"0 2px 8px rgba(0,0,0,0.3)",
-            #     "border":"1px solid rgba(255,255,255,0.1)"
-            # })
-            trade_windows_container = html.Div()  # Empty placeholder
-    
-            return card, return_chart_container, bar_chart_container, stats_view, trade_windows_container, dff
+            trade_windows_container = html.Div([
+                html.H4("Trade windows (first and last day)", style={
+                    "fontSize":"20px", "fontWeight":600, "color":"inherit",
+                    "marginTop":"32px", "marginBottom":"16px"
+                }),
+                trade_table
+            ], style={
+                "background":"rgba(255,255,255,0.05)", "borderRadius":"12px",
+                "padding":"20px", "boxShadow":"0 2px 8px rgba(0,0,0,0.3)",
+                "border":"1px solid rgba(255,255,255,0.1)"
+            })
+    
+            return card, return_chart_container, bar_chart_container, stats_view, trade_windows_container
     
         want_drop = "drop" in (analysis_types or [])
         want_gain = "gain" in (analysis_types or [])
     
-        drop_out = build_outputs("drop",
-                                 preset_drop, sd_drop, ed_drop, snap_drop, ws_drop, ws_in_drop, th_drop, th_in_drop) \
-                   if want_drop else (html.Div("Drop disabled"), None, None, None, None, None)
-    
-        gain_out = build_outputs("gain",
-                                 preset_gain, sd_gain, ed_gain, snap_gain, ws_gain, ws_in_gain, th_gain, th_in_gain) \
-                   if want_gain else (html.Div("Gain disabled"), None, None, None, None, None)
+        sections = {}
+        if want_drop:
+            sections["drop"] = resolve_section(preset_drop, sd_drop, ed_drop, snap_drop,
+                                               ws_drop, ws_in_drop, th_drop, th_in_drop)
+        if want_gain:
+            sections["gain"] = resolve_section(preset_gain, sd_gain, ed_gain, snap_gain,
+                                               ws_gain, ws_in_gain, th_gain, th_in_gain)
     
         # Build indicators figure from the union of the filtered range (prefer gain range if both same; else use full df slice)
         # We'll use the DROP slice if available, else GAIN slice, else overall df.
-        dff_for_indicators = None
-        if drop_out[-1] is not None:
-            dff_for_indicators = drop_out[-1]
-        if gain_out[-1] is not None:
+        def section_dff(mode):
+            # The slice build_outputs works on for mode; None when that section is off or empty
+            sec = sections.get(mode)
+            return sec["dff"] if sec is not None and not sec["dff"].empty else None
+    
+        dff_for_indicators = section_dff("drop")
+        if section_dff("gain") is not None:
             # if both exist, take intersection of their date windows to keep consistent
             if dff_for_indicators is not None:
                 s1, e1 = dff_for_indicators["datetime"].min(), dff_for_indicators["datetime"].max()
-                s2, e2 = gain_out[-1]["datetime"].min(), gain_out[-1]["datetime"].max()
+                s2, e2 = section_dff("gain")["datetime"].min(), section_dff("gain")["datetime"].max()
                 s, e = max(s1, s2), min(e1, e2)
                 dff_for_indicators = df[(df["datetime"]>=s) & (df["datetime"]<=e)].reset_index(drop=True)
             else:
-                dff_for_indicators = gain_out[-1]
+                dff_for_indicators = section_dff("gain")
         if dff_for_indicators is None:
             dff_for_indicators = df.copy()
     
-        # --- Build indicators and figure
-        feats = build_indicators(dff_for_indicators[["datetime","index"]].copy())
-        price = dff_for_indicators["index"].astype(float)
-        time = dff_for_indicators["datetime"]
-    
-        show_sma  = "sma"  in (indicators_selected or [])
-        show_ema  = "ema"  in (indicators_selected or [])
-        show_bb   = "bb"   in (indicators_selected or [])
-        show_rsi  = "rsi"  in (indicators_selected or [])
-        show_macd = "macd" in (indicators_selected or [])
-        show_vol  = "vol"  in (indicators_selected or [])
-        show_dd   = "dd"   in (indicators_selected or [])
-    
-        # Determine which rows to show
-        row1_needed = any([True, show_sma, show_ema, show_bb, show_vol, show_dd])  # price always shown
-        row2_needed = show_rsi
-        row3_needed = show_macd
-    
-        rows = (1 if row1_needed else 0) + (1 if row2_needed else 0) + (1 if row3_needed else 0)
-        if rows == 0:
-            rows = 1  # safety
-    
-        fig_ind = make_subplots(
-            rows=rows, cols=1, shared_xaxes=True,
-            row_heights=[0.5 if rows==3 else (0.65 if rows==2 else 1.0)] + ([0.25] if rows>=2 else []) + ([0.25] if rows==3 else []),
-            vertical_spacing=0.06,
-            specs=[[{"secondary_y": True}] for _ in range(rows)]
-        )
+        def build_indicator_outputs(dff_for_indicators):
+            # --- Build indicators and figure
+            # Only the features behind the ticked indicators are computed
+            feats = cached_indicators(dff_for_indicators[["datetime","index"]].copy(),
+                                      columns=indicator_columns_for(indicators_selected),
+                                      fingerprint=dataset_key,
+                                      date_range=(dff_for_indicators["datetime"].min(), dff_for_indicators["datetime"].max()),
+                                      base=append_base)
+            price = dff_for_indicators["index"].astype(float)
+            time = dff_for_indicators["datetime"]
+    
+            show_sma  = "sma"  in (indicators_selected or [])
+            show_ema  = "ema"  in (indicators_selected or [])
+            show_bb   = "bb"   in (indicators_selected or [])
+            show_rsi  = "rsi"  in (indicators_selected or [])
+            show_macd = "macd" in (indicators_selected or [])
+            show_vol  = "vol"  in (indicators_selected or [])
+            show_dd   = "dd"   in (indicators_selected or [])
+    
+            # Determine which rows to show
+            row1_needed = any([True, show_sma, show_ema, show_bb, show_vol, show_dd])  # price always shown
+            row2_needed = show_rsi
+            row3_needed = show_macd
+    
+            rows = (1 if row1_needed else 0) + (1 if row2_needed else 0) + (1 if row3_needed else 0)
+            if rows == 0:
+                rows = 1  # safety
+    
+            fig_ind = subplots.make_subplots(
+                rows=rows, cols=1, shared_xaxes=True,
+                row_heights=[0.5 if rows==3 else (0.65 if rows==2 else 1.0)] + ([0.25] if rows>=2 else []) + ([0.25] if rows==3 else []),
+                vertical_spacing=0.06,
+                specs=[[{"secondary_y": True}] for _ in range(rows)]
+            )
     
-        # helper to map logical row numbers
-        cur_row = 1
-        row_price = cur_row
-        # Row 1: Price + overlays
-        fig_ind.add_trace(go.Scatter(x=time, y=price, mode="lines", name="Price"), row=row_price, col=1, secondary_y=False)
-    
-        if show_sma:
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["sma_5"],  mode="lines", name="SMA 5"),  row=row_price, col=1, secondary_y=False)
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["sma_20"], mode="lines", name="SMA 20"), row=row_price, col=1, secondary_y=False)
-        if show_ema:
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["ema_12"], mode="lines", name="EMA 12"), row=row_price, col=1, secondary_y=False)
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["ema_26"], mode="lines", name="EMA 26"), row=row_price, col=1, secondary_y=False)
-        if show_bb:
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["bb_mid"], mode="lines", name="BB Mid"),   row=row_price, col=1, secondary_y=False)
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["bb_up"],  mode="lines", name="BB Upper"), row=row_price, col=1, secondary_y=False)
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["bb_lo"],  mode="lines", name="BB Lower"), row=row_price, col=1, secondary_y=False)
-        if show_vol:
-            # plot vol_20 on secondary y to keep scales tidy
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["vol_20"], mode="lines", name="Vol 20 (stdev)"),
-                              row=row_price, col=1, secondary_y=True)
-        if show_dd:
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["dd"], mode="lines", name="Drawdown"),
-                              row=row_price, col=1, secondary_y=True)
-    
-        fig_ind.update_yaxes(title_text="Price", row=row_price, col=1, secondary_y=False)
-        if show_vol or show_dd:
-            fig_ind.update_yaxes(title_text="Vol / DD", row=row_price, col=1, secondary_y=True)
-    
-        # Row 2: RSI (if needed)
-        if row2_needed:
-            cur_row += 1
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["rsi_14"], mode="lines", name="RSI (14)"),
-                              row=cur_row, col=1, secondary_y=False)
-            fig_ind.add_hline(y=70, line=dict(dash="dash"), row=cur_row, col=1)
-            fig_ind.add_hline(y=30, line=dict(dash="dash"), row=cur_row, col=1)
-            fig_ind.update_yaxes(title_text="RSI", range=[0, 100], row=cur_row, col=1)
-    
-        # Row 3: MACD (if needed)
-        if row3_needed:
-            cur_row += 1
-            fig_ind.add_trace(go.Bar(x=time, y=feats["macd_hist"], name="MACD Hist"),
-                              row=cur_row, col=1, secondary_y=False)
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["macd"],     mode="lines", name="MACD"),
-                              row=cur_row, col=1, secondary_y=False)
-            fig_ind.add_trace(go.Scatter(x=time, y=feats["macd_sig"], mode="lines", name="MACD Signal"),
-                              row=cur_row, col=1, secondary_y=False)
-            fig_ind.update_yaxes(title_text="MACD", row=cur_row, col=1)
-    
-        # Calculate proper margins to accommodate legend outside plotting area
-        # Legend will be positioned above the chart, so we need extra top margin
-        legend_height = 60  # Estimated height for horizontal legend
-        top_margin = 120 + legend_height  # Extra top margin for legend above chart
-        bottom_margin = 80  # Base bottom margin
+            # helper to map logical row numbers
+            cur_row = 1
+            row_price = cur_row
+            # Row 1: Price + overlays
+            fig_ind.add_trace(go.Scatter(x=time, y=price, mode="lines", name="Price"), row=row_price, col=1, secondary_y=False)
+    
+            if show_sma:
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["sma_5"],  mode="lines", name="SMA 5"),  row=row_price, col=1, secondary_y=False)
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["sma_20"], mode="lines", name="SMA 20"), row=row_price, col=1, secondary_y=False)
+            if show_ema:
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["ema_12"], mode="lines", name="EMA 12"), row=row_price, col=1, secondary_y=False)
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["ema_26"], mode="lines", name="EMA 26"), row=row_price, col=1, secondary_y=False)
+            if show_bb:
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["bb_mid"], mode="lines", name="BB Mid"),   row=row_price, col=1, secondary_y=False)
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["bb_up"],  mode="lines", name="BB Upper"), row=row_price, col=1, secondary_y=False)
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["bb_lo"],  mode="lines", name="BB Lower"), row=row_price, col=1, secondary_y=False)
+            if show_vol:
+                # plot vol_20 on secondary y to keep scales tidy
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["vol_20"], mode="lines", name="Vol 20 (stdev)"),
+                                  row=row_price, col=1, secondary_y=True)
+            if show_dd:
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["dd"], mode="lines", name="Drawdown"),
+                                  row=row_price, col=1, secondary_y=True)
+    
+            fig_ind.update_yaxes(title_text="Price", row=row_price, col=1, secondary_y=False)
+            if show_vol or show_dd:
+                fig_ind.update_yaxes(title_text="Vol / DD", row=row_price, col=1, secondary_y=True)
+    
+            # Row 2: RSI (if needed)
+            if row2_needed:
+                cur_row += 1
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["rsi_14"], mode="lines", name="RSI (14)"),
+                                  row=cur_row, col=1, secondary_y=False)
+                fig_ind.add_hline(y=70, line=dict(dash="dash"), row=cur_row, col=1)
+                fig_ind.add_hline(y=30, line=dict(dash="dash"), row=cur_row, col=1)
+                fig_ind.update_yaxes(title_text="RSI", range=[0, 100], row=cur_row, col=1)
+    
+            # Row 3: MACD (if needed)
+            if row3_needed:
+                cur_row += 1
+                fig_ind.add_trace(go.Bar(x=time, y=feats["macd_hist"], name="MACD Hist"),
+                                  row=cur_row, col=1, secondary_y=False)
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["macd"],     mode="lines", name="MACD"),
+                                  row=cur_row, col=1, secondary_y=False)
+                fig_ind.add_trace(go.Scatter(x=time, y=feats["macd_sig"], mode="lines", name="MACD Signal"),
+                                  row=cur_row, col=1, secondary_y=False)
+                fig_ind.update_yaxes(title_text="MACD", row=cur_row, col=1)
+    
+            # Calculate proper margins to accommodate legend outside plotting area
+            # Legend will be positioned above the chart, so we need extra top margin
+            legend_height = 60  # Estimated height for horizontal legend
+            top_margin = 120 + legend_height  # Extra top margin for legend above chart
+            bottom_margin = 80  # Base bottom margin
         
-        fig_ind.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(26,26,26,0.8)",
-            paper_bgcolor="rgba(10,10,10,0.8)",
-            font=dict(color="rgba(255,255,255,0.9)"),
-            margin=dict(t=top_margin, r=10, l=40, b=bottom_margin),  # Extra top margin for legend above
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.01,  # Position just above the chart (outside plotting area)
-                xanchor="center",
-                x=0.5,
-                itemwidth=30,
-                font=dict(size=10),
-                bgcolor="rgba(10,10,10,0.9)",
-                bordercolor="rgba(255,255,255,0.2)",
-                borderwidth=1,
-                tracegroupgap=10,  # Space between legend items
-                entrywidthmode="fraction",
-                entrywidth=0.15  # Control width of legend items
-            ),
-            title=dict(
-                text="Indicators (weekend-aware where applicable)",
-                x=0.5,
-                xanchor="center",
-                font=dict(size=16),
-                y=0.95,
-                yanchor="top"
-            ),
-            xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
-            yaxis=dict(gridcolor="rgba(255,255,255,0.1)")
-        )
+            fig_ind.update_layout(
+                template="plotly_dark",
+                plot_bgcolor="rgba(26,26,26,0.8)",
+                paper_bgcolor="rgba(10,10,10,0.8)",
+                font=dict(color="rgba(255,255,255,0.9)"),
+                margin=dict(t=top_margin, r=10, l=40, b=bottom_margin),  # Extra top margin for legend above
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.01,  # Position just above the chart (outside plotting area)
+                    xanchor="center",
+                    x=0.5,
+                    itemwidth=30,
+                    font=dict(size=10),
+                    bgcolor="rgba(10,10,10,0.9)",
+                    bordercolor="rgba(255,255,255,0.2)",
+                    borderwidth=1,
+                    tracegroupgap=10,  # Space between legend items
+                    entrywidthmode="fraction",
+                    entrywidth=0.15  # Control width of legend items
+                ),
+                title=dict(
+                    text="Indicators (weekend-aware where applicable)",
+                    x=0.5,
+                    xanchor="center",
+                    font=dict(size=16),
+                    y=0.95,
+                    yanchor="top"
+                ),
+                xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
+                yaxis=dict(gridcolor="rgba(255,255,255,0.1)")
+            )
         
-        # Update all subplot x-axes to have consistent styling and prevent overlap
-        for i in range(1, cur_row + 1):
-            fig_ind.update_xaxes(
-                showgrid=True,
-                gridcolor="rgba(255,255,255,0.1)",
-                row=i, col=1
-        )
+            # Update all subplot x-axes to have consistent styling and prevent overlap
+            for i in range(1, cur_row + 1):
+                fig_ind.update_xaxes(
+                    showgrid=True,
+                    gridcolor="rgba(255,255,255,0.1)",
+                    row=i, col=1
+            )
+    
+            # Wrap indicators figure in container
+            return html.Div([
+                html.H3("Indicator Charts", style={
+                    "fontSize":"28px", "fontWeight":700, "color":"inherit",
+                    "marginTop":"40px", "marginBottom":"20px"
+                }),
+                downsampled_graph(fig_ind, config={"displayModeBar": False}, style={"height":"540px"})
+            ], style={
+                "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
+                "padding":"20px", "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
+                "border":"1px solid rgba(255,255,255,0.1)"
+            })
+    
+        def compute_sections():
+            report_progress(set_progress, 2, 3, "Computing returns")
+            # Weekend-aware returns: one matrix pass per distinct date range, covering every
+            # window requested on that range (drop and gain usually share the range).
+            windows_by_range = {}
+            for sec in sections.values():
+                windows_by_range.setdefault((sec["start"], sec["end"]), []).append(sec["ws"])
+            returns = {}
+            for (start, end), windows in windows_by_range.items():
+                windows = sorted(set(windows))
+                dff = next(sec["dff"] for sec in sections.values() if (sec["start"], sec["end"]) == (start, end))
+                mat = cached_windowed_returns(dff, windows, dataset_key, (start, end), base=append_base)
+                for k, ws in enumerate(windows):
+                    returns[(start, end, ws)] = pd.Series(mat[:, k], index=pd.RangeIndex(len(mat)))
+    
+            def section_returns(sec):
+                return returns.get((sec["start"], sec["end"], sec["ws"]), pd.Series(dtype=float))
+    
+            # Drop, gain and indicators are independent sections: run them side by side so the
+            # latency is the slowest section, not the sum
+            report_progress(set_progress, 3, 3, "Building indicators and figures")
+            tasks = {"indicators": lambda: build_indicator_outputs(dff_for_indicators)}
+            if want_drop:
+                tasks["drop"] = lambda: build_outputs("drop", sections["drop"], section_returns(sections["drop"]))
+            if want_gain:
+                tasks["gain"] = lambda: build_outputs("gain", sections["gain"], section_returns(sections["gain"]))
+            return run_sections(tasks)
+    
+        # Identical requests (same dataset, same resolved ranges/windows/thresholds and
+        # indicators) arriving while this one runs wait for it and share its result; finished
+        # analyses are kept in the persistent result cache
+        flight_key = ("single", dataset_key,
+                      tuple((mode, sec["start"], sec["end"], sec["ws"], sec["th_pct"]) for mode, sec in sorted(sections.items())),
+                      tuple(sorted(indicators_selected or [])))
+        results = single_flight(flight_key, lambda: cached_result(flight_key, compute_sections, valid=stored_views_available),
+                                on_wait=lambda: report_progress(set_progress, 2, 3, "Waiting for an identical analysis"))
+        drop_out = results.get("drop", (html.Div("Drop disabled"), None, None, None, None))
+        gain_out = results.get("gain", (html.Div("Gain disabled"), None, None, None, None))
+        indicators_container = results["indicators"]
     
         # Unpack results for return
-        drop_card, drop_line, drop_bar, drop_stats, drop_table, _dff_drop = drop_out
-        gain_card, gain_line, gain_bar, gain_stats, gain_table, _dff_gain = gain_out
-        
-        # Wrap indicators figure in container
-        indicators_container = html.Div([
-            html.H3("Indicator Charts", style={
-                "fontSize":"28px", "fontWeight":700, "color":"inherit",
-                "marginTop":"40px", "marginBottom":"20px"
-            }),
-            dcc.Graph(figure=fig_ind, config={"displayModeBar": False}, style={"height":"540px"})
-        ], style={
-            "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
-            "padding":"20px", "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
-            "border":"1px solid rgba(255,255,255,0.1)"
-        })
+        drop_card, drop_line, drop_bar, drop_stats, drop_table = drop_out
+        gain_card, gain_line, gain_bar, gain_stats, gain_table = gain_out
         
         # Show results container
         results_style = {"display": "flex", "gap": "20px", "flexWrap": "wrap"}
@@ -710,18 +927,27 @@ def register_callbacks(app):
         Output("jump-month-cross", "value"),
     
         Input("uploader-a", "contents"),
+        Input("uploader-a-chunked", "data"),
         State("uploader-a", "filename"),
         Input("uploader-b", "contents"),
+        Input("uploader-b-chunked", "data"),
         State("uploader-b", "filename"),
+        State(STORE_A, "data"),
+        State(STORE_B, "data"),
         prevent_initial_call=True,
     )
-    def upload_cross(contents_a, filename_a, contents_b, filename_b):
+    def upload_cross(contents_a, chunked_a, filename_a, contents_b, chunked_b, filename_b, stored_a, stored_b):
         out = [no_update]*15
+        trigger = ctx.triggered_id
     
-        # Parse A
+        # Parse A (only the side that changed; the other one is already registered)
         dfA = warnsA = errA = None
-        if contents_a is not None:
-            dfA, warnsA, errA = parse_csv_flexible(contents_a, filename_a)
+        if trigger in ("uploader-a", "uploader-a-chunked"):
+            use_handle = trigger == "uploader-a-chunked"
+            if (chunked_a if use_handle else contents_a) is None:
+                return tuple(out)
+            dfA, warnsA, errA, filename_a, keyA = load_upload(contents_a, filename_a, chunked_a, use_handle)
+            switch_dataset((stored_a or {}).get("dataset_key"), keyA)
             if errA:
                 out[0] = html.Div(errA, style={"color":"crimson"})
                 out[1] = None
@@ -771,13 +997,19 @@ def register_callbacks(app):
                 out[2] = html.Div([html.H4("Preview A (first 10)"), tableA])
                 out[3] = {
                     "filename": filename_a,
-                    "csv_b64": base64.b64encode(dfA.to_csv(index=False).encode()).decode()
+                    "dataset_key": keyA
                 }
+        elif stored_a:
+            dfA = get_dataset(stored_a.get("dataset_key"))
     
         # Parse B
         dfB = warnsB = errB = None
-        if contents_b is not None:
-            dfB, warnsB, errB = parse_csv_flexible(contents_b, filename_b)
+        if trigger in ("uploader-b", "uploader-b-chunked"):
+            use_handle = trigger == "uploader-b-chunked"
+            if (chunked_b if use_handle else contents_b) is None:
+                return tuple(out)
+            dfB, warnsB, errB, filename_b, keyB = load_upload(contents_b, filename_b, chunked_b, use_handle)
+            switch_dataset((stored_b or {}).get("dataset_key"), keyB)
             if errB:
                 out[4] = html.Div(errB, style={"color":"crimson"})
                 out[5] = None
@@ -827,8 +1059,10 @@ def register_callbacks(app):
                 out[6] = html.Div([html.H4("Preview B (first 10)"), tableB])
                 out[7] = {
                     "filename": filename_b,
-                    "csv_b64": base64.b64encode(dfB.to_csv(index=False).encode()).decode()
+                    "dataset_key": keyB
                 }
+        elif stored_b:
+            dfB = get_dataset(stored_b.get("dataset_key"))
     
         # Set date bounds based on whichever is loaded; if both, use intersection
         if dfA is None and dfB is None:
@@ -906,8 +1140,13 @@ def register_callbacks(app):
         State("snap-month-cross", "value"),
         State("x-window", "value"),
         prevent_initial_call=True,
+        background=True,
+        running=[(Output("cross-job-status", "style"), JOB_STATUS_SHOWN, JOB_STATUS_HIDDEN)],
+        progress=[Output("cross-job-progress", "children")],
+        cancel=[Input("cross-job-cancel", "n_clicks")],
+        interval=JOB_POLL_INTERVAL_MS,
     )
-    def run_cross(n_clicks, rawA, rawB, preset, sd, ed, snap_val, win):
+    def run_cross(set_progress, n_clicks, rawA, rawB, preset, sd, ed, snap_val, win):
         if not n_clicks:
             return (no_update,) * 6
         if not rawA or not rawB:
@@ -915,21 +1154,16 @@ def register_callbacks(app):
             hidden_style = {"display": "none"}
             return None, None, None, None, None, hidden_style
     
-        # Load A & B
-        try:
-            dfA = pd.read_csv(io.BytesIO(base64.b64decode(rawA["csv_b64"].encode())))
-            dfB = pd.read_csv(io.BytesIO(base64.b64decode(rawB["csv_b64"].encode())))
-        except Exception as e:
-            # Hide all results on error
-            hidden_style = {"display": "none"}
-            return None, None, None, None, None, hidden_style
-    
-        for df in (dfA, dfB):
-            df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
-            df["index"] = pd.to_numeric(df["index"], errors="coerce")
-        dfA = dfA.dropna(subset=["datetime","index"]).sort_values("datetime").reset_index(drop=True)
-        dfB = dfB.dropna(subset=["datetime","index"]).sort_values("datetime").reset_index(drop=True)
+        # Load A & B from the server-side registry
+        report_progress(set_progress, 1, 4, "Loading datasets")
+        dfA = get_dataset(rawA.get("dataset_key"))
+        dfB = get_dataset(rawB.get("dataset_key"))
+        if dfA is None or dfB is None:
+            expired = html.Div("A dataset is no longer loaded on the server. Please upload both files again.",
+                               style={"color": "crimson"})
+            return expired, None, None, None, None, {"marginTop": "32px"}
     
+        # Registry datasets are already typed and sorted (normalized-dataset contract)
         # Determine overall range intersection
         data_min = max(dfA["datetime"].min(), dfB["datetime"].min())
         data_max = min(dfA["datetime"].max(), dfB["datetime"].max())
@@ -950,287 +1184,351 @@ def register_callbacks(app):
             hidden_style = {"display": "none"}
             return None, None, None, None, None, hidden_style
     
-        # -------- Chart 1: Dual Y-Axis - Index A (left) vs Index B (right) --------
-        fig_levels = go.Figure()
+        win = max(int(win or 1), 1)
+    
+        def cross_outputs():
+            # -------- Chart 1: Dual Y-Axis - Index A (left) vs Index B (right) --------
+            report_progress(set_progress, 2, 4, "Building level chart")
+            fig_levels = go.Figure()
         
-        # Index A on left y-axis (primary)
-        fig_levels.add_trace(go.Scatter(
-            x=levels["datetime"], 
-            y=levels["A"], 
-            mode="lines", 
-            name="Index A",
-            line=dict(color="#00c896", width=2),
-            yaxis="y"
-        ))
+            # Index A on left y-axis (primary)
+            fig_levels.add_trace(go.Scatter(
+                x=levels["datetime"], 
+                y=levels["A"], 
+                mode="lines", 
+                name="Index A",
+                line=dict(color="#00c896", width=2),
+                yaxis="y"
+            ))
         
-        # Index B on right y-axis (secondary)
-        fig_levels.add_trace(go.Scatter(
-            x=levels["datetime"], 
-            y=levels["B"], 
-            mode="lines", 
-            name="Index B",
-            line=dict(color="#888888", width=1.5),
-            yaxis="y2"
-        ))
+            # Index B on right y-axis (secondary)
+            fig_levels.add_trace(go.Scatter(
+                x=levels["datetime"], 
+                y=levels["B"], 
+                mode="lines", 
+                name="Index B",
+                line=dict(color="#888888", width=1.5),
+                yaxis="y2"
+            ))
         
-        fig_levels.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(26,26,26,0.8)",
-            paper_bgcolor="rgba(10,10,10,0.8)",
-            font=dict(color="rgba(255,255,255,0.9)"),
-            title=f"Both Indexes (Dual Axis) · {start.date()} → {end.date()}",
-            margin=dict(t=100, r=80, l=80, b=40),  # Increased margins for dual axes
-            xaxis_title="Date",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.01,
-                xanchor="center",
-                x=0.5,
-                bgcolor="rgba(10,10,10,0.9)",
-                bordercolor="rgba(255,255,255,0.2)",
-                borderwidth=1,
-                itemwidth=30,
-                font=dict(size=10)
-            ),
-            xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
-            yaxis=dict(
-                title=dict(text="Index A", font=dict(color="#00c896")),
-                tickfont=dict(color="#00c896"),
-                gridcolor="rgba(255,255,255,0.1)",
-                side="left"
-            ),
-            yaxis2=dict(
-                title=dict(text="Index B", font=dict(color="#888888")),
-                tickfont=dict(color="#888888"),
-                anchor="x",
-                overlaying="y",
-                side="right",
-                showgrid=False
+            fig_levels.update_layout(
+                template="plotly_dark",
+                plot_bgcolor="rgba(26,26,26,0.8)",
+                paper_bgcolor="rgba(10,10,10,0.8)",
+                font=dict(color="rgba(255,255,255,0.9)"),
+                title=f"Both Indexes (Dual Axis) · {start.date()} → {end.date()}",
+                margin=dict(t=100, r=80, l=80, b=40),  # Increased margins for dual axes
+                xaxis_title="Date",
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.01,
+                    xanchor="center",
+                    x=0.5,
+                    bgcolor="rgba(10,10,10,0.9)",
+                    bordercolor="rgba(255,255,255,0.2)",
+                    borderwidth=1,
+                    itemwidth=30,
+                    font=dict(size=10)
+                ),
+                xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
+                yaxis=dict(
+                    title=dict(text="Index A", font=dict(color="#00c896")),
+                    tickfont=dict(color="#00c896"),
+                    gridcolor="rgba(255,255,255,0.1)",
+                    side="left"
+                ),
+                yaxis2=dict(
+                    title=dict(text="Index B", font=dict(color="#888888")),
+                    tickfont=dict(color="#888888"),
+                    anchor="x",
+                    overlaying="y",
+                    side="right",
+                    showgrid=False
+                )
             )
-        )
     
-        # -------- Weekend-aware returns (window size in calendar days) --------
-        win = max(int(win or 1), 1)
-        retA_series = compute_windowed_returns_calendar(dfA, win)
-        retB_series = compute_windowed_returns_calendar(dfB, win)
-    
-        tmpA = dfA.assign(retA=retA_series)
-        tmpB = dfB.assign(retB=retB_series)
-        tmpA = tmpA[(tmpA["datetime"]>=start) & (tmpA["datetime"]<=end)]
-        tmpB = tmpB[(tmpB["datetime"]>=start) & (tmpB["datetime"]<=end)]
-    
-        rets = pd.merge(
-            tmpA[["datetime","retA"]],
-            tmpB[["datetime","retB"]],
-            on="datetime",
-            how="inner"
-        ).dropna(subset=["retA","retB"])
-    
-        if rets.empty:
-            # Hide all results when no returns data
-            hidden_style = {"display": "none"}
-            return None, None, None, None, None, hidden_style
-    
-        # -------- Chart 2: Correlation scatter (windowed returns) --------
-        # Use standardized returns (z-scores) for better visualization when scales differ vastly
-        # This preserves the Pearson correlation exactly while making the scatter interpretable
-        x_raw = rets["retB"].values * 100.0
-        y_raw = rets["retA"].values * 100.0
+            # -------- Weekend-aware returns (window size in calendar days) --------
+            report_progress(set_progress, 3, 4, "Computing returns")
+            retA_series = pd.Series(cached_windowed_returns(dfA, [win], rawA.get("dataset_key"),
+                                                            base=dataset_meta(rawA.get("dataset_key")).get("append_base"))[:, 0])
+            retB_series = pd.Series(cached_windowed_returns(dfB, [win], rawB.get("dataset_key"),
+                                                            base=dataset_meta(rawB.get("dataset_key")).get("append_base"))[:, 0])
+    
+            tmpA = dfA.assign(retA=retA_series)
+            tmpB = dfB.assign(retB=retB_series)
+            tmpA = tmpA[(tmpA["datetime"]>=start) & (tmpA["datetime"]<=end)]
+            tmpB = tmpB[(tmpB["datetime"]>=start) & (tmpB["datetime"]<=end)]
+    
+            rets = pd.merge(
+                tmpA[["datetime","retA"]],
+                tmpB[["datetime","retB"]],
+                on="datetime",
+                how="inner"
+            ).dropna(subset=["retA","retB"])
+    
+            if rets.empty:
+                # Hide all results when no returns data
+                hidden_style = {"display": "none"}
+                return None, None, None, None, None, hidden_style
+    
+            # -------- Chart 2: Correlation scatter (windowed returns) --------
+            report_progress(set_progress, 4, 4, "Building return charts")
+            # Use standardized returns (z-scores) for better visualization when scales differ vastly
+            # This preserves the Pearson correlation exactly while making the scatter interpretable
+            x_raw = rets["retB"].values * 100.0
+            y_raw = rets["retA"].values * 100.0
         
-        if len(x_raw) >= 2:
-            corr = float(np.corrcoef(x_raw, y_raw)[0,1])
-            # Standardize to z-scores: (x - mean) / std
-            x_mean, x_std = np.mean(x_raw), np.std(x_raw)
-            y_mean, y_std = np.mean(y_raw), np.std(y_raw)
-            # Avoid division by zero
-            x_std = x_std if x_std > 0 else 1
-            y_std = y_std if y_std > 0 else 1
-            x = (x_raw - x_mean) / x_std
-            y = (y_raw - y_mean) / y_std
-        else:
-            corr = float("nan")
-            x, y = x_raw, y_raw
-    
-        fig_scatter = go.Figure()
-        fig_scatter.add_trace(go.Scatter(
-            x=x, y=y, mode="markers", name=f"{win}-day returns",
-            hovertemplate="B (z): %{x:.2f}<br>A (z): %{y:.2f}<extra></extra>"
-        ))
-        if len(x) >= 2:
-            m, b = np.polyfit(x, y, 1)
-            xfit = np.linspace(x.min(), x.max(), 100)
-            yfit = m*xfit + b
-            fig_scatter.add_trace(go.Scatter(x=xfit, y=yfit, mode="lines", name="Fit", line=dict(dash="dash")))
-            # For standardized data, slope ≈ correlation (when both are z-scores)
-            subtitle = f"Pearson corr = {corr:.2f} · β (standardized) ≈ {m:.2f}"
-        else:
-            subtitle = "Pearson corr = n/a"
-        fig_scatter.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(26,26,26,0.8)",
-            paper_bgcolor="rgba(10,10,10,0.8)",
-            font=dict(color="rgba(255,255,255,0.9)"),
-            title=dict(
-                text=f"Correlation (standardized returns) — {subtitle}",
-                x=0.5,
-                xanchor="center",
-                y=0.98,
-                yanchor="top"
-            ),
-            margin=dict(t=100, r=10, l=50, b=50),  # Increased top margin for legend
-            xaxis_title=f"Index B {win}-day return (z-score)",
-            yaxis_title=f"Index A {win}-day return (z-score)",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.01,
-                xanchor="center",
-                x=0.5,
-                bgcolor="rgba(10,10,10,0.9)",
-                bordercolor="rgba(255,255,255,0.2)",
-                borderwidth=1,
-                itemwidth=30,
-                font=dict(size=10)
-            ),
-            xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
-            yaxis=dict(gridcolor="rgba(255,255,255,0.1)")
-        )
+            if len(x_raw) >= 2:
+                corr = float(np.corrcoef(x_raw, y_raw)[0,1])
+                # Standardize to z-scores: (x - mean) / std
+                x_mean, x_std = np.mean(x_raw), np.std(x_raw)
+                y_mean, y_std = np.mean(y_raw), np.std(y_raw)
+                # Avoid division by zero
+                x_std = x_std if x_std > 0 else 1
+                y_std = y_std if y_std > 0 else 1
+                x = (x_raw - x_mean) / x_std
+                y = (y_raw - y_mean) / y_std
+            else:
+                corr = float("nan")
+                x, y = x_raw, y_raw
+    
+            fig_scatter = go.Figure()
+            fig_scatter.add_trace(go.Scatter(
+                x=x, y=y, mode="markers", name=f"{win}-day returns",
+                hovertemplate="B (z): %{x:.2f}<br>A (z): %{y:.2f}<extra></extra>"
+            ))
+            if len(x) >= 2:
+                m, b = np.polyfit(x, y, 1)
+                xfit = np.linspace(x.min(), x.max(), 100)
+                yfit = m*xfit + b
+                fig_scatter.add_trace(go.Scatter(x=xfit, y=yfit, mode="lines", name="Fit", line=dict(dash="dash")))
+                # For standardized data, slope ≈ correlation (when both are z-scores)
+                subtitle = f"Pearson corr = {corr:.2f} · β (standardized) ≈ {m:.2f}"
+            else:
+                subtitle = "Pearson corr = n/a"
+            fig_scatter.update_layout(
+                template="plotly_dark",
+                plot_bgcolor="rgba(26,26,26,0.8)",
+                paper_bgcolor="rgba(10,10,10,0.8)",
+                font=dict(color="rgba(255,255,255,0.9)"),
+                title=dict(
+                    text=f"Correlation (standardized returns) — {subtitle}",
+                    x=0.5,
+                    xanchor="center",
+                    y=0.98,
+                    yanchor="top"
+                ),
+                margin=dict(t=100, r=10, l=50, b=50),  # Increased top margin for legend
+                xaxis_title=f"Index B {win}-day return (z-score)",
+                yaxis_title=f"Index A {win}-day return (z-score)",
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.01,
+                    xanchor="center",
+                    x=0.5,
+                    bgcolor="rgba(10,10,10,0.9)",
+                    bordercolor="rgba(255,255,255,0.2)",
+                    borderwidth=1,
+                    itemwidth=30,
+                    font=dict(size=10)
+                ),
+                xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
+                yaxis=dict(gridcolor="rgba(255,255,255,0.1)")
+            )
     
-        # -------- Chart 3: Windowed returns through time (Dual Y-Axis) --------
-        ret_time = rets.reset_index(drop=True)
-        fig_returns = go.Figure()
+            # -------- Chart 3: Windowed returns through time (Dual Y-Axis) --------
+            ret_time = rets.reset_index(drop=True)
+            fig_returns = go.Figure()
         
-        # Index A returns on left y-axis (primary)
-        fig_returns.add_trace(go.Scatter(
-            x=ret_time["datetime"], 
-            y=ret_time["retA"]*100.0, 
-            mode="lines", 
-            name=f"A {win}-day %",
-            line=dict(color="#00c896", width=2),
-            yaxis="y"
-        ))
+            # Index A returns on left y-axis (primary)
+            fig_returns.add_trace(go.Scatter(
+                x=ret_time["datetime"], 
+                y=ret_time["retA"]*100.0, 
+                mode="lines", 
+                name=f"A {win}-day %",
+                line=dict(color="#00c896", width=2),
+                yaxis="y"
+            ))
         
-        # Index B returns on right y-axis (secondary)
-        fig_returns.add_trace(go.Scatter(
-            x=ret_time["datetime"], 
-            y=ret_time["retB"]*100.0, 
-            mode="lines", 
-            name=f"B {win}-day %",
-            line=dict(color="#888888", width=1.5),
-            yaxis="y2"
-        ))
+            # Index B returns on right y-axis (secondary)
+            fig_returns.add_trace(go.Scatter(
+                x=ret_time["datetime"], 
+                y=ret_time["retB"]*100.0, 
+                mode="lines", 
+                name=f"B {win}-day %",
+                line=dict(color="#888888", width=1.5),
+                yaxis="y2"
+            ))
         
-        fig_returns.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(26,26,26,0.8)",
-            paper_bgcolor="rgba(10,10,10,0.8)",
-            font=dict(color="rgba(255,255,255,0.9)"),
-            title=f"{win}-day Returns Over Time (Dual Axis) · {start.date()} → {end.date()}",
-            margin=dict(t=100, r=80, l=80, b=40),  # Increased margins for dual axes
-            xaxis_title="Date",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.01,
-                xanchor="center",
-                x=0.5,
-                bgcolor="rgba(10,10,10,0.9)",
-                bordercolor="rgba(255,255,255,0.2)",
-                borderwidth=1,
-                itemwidth=30,
-                font=dict(size=10)
-            ),
-            xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
-            yaxis=dict(
-                title=dict(text=f"Index A {win}-day return (%)", font=dict(color="#00c896")),
-                tickfont=dict(color="#00c896"),
-                gridcolor="rgba(255,255,255,0.1)",
-                side="left"
-            ),
-            yaxis2=dict(
-                title=dict(text=f"Index B {win}-day return (%)", font=dict(color="#888888")),
-                tickfont=dict(color="#888888"),
-                anchor="x",
-                overlaying="y",
-                side="right",
-                showgrid=False
+            fig_returns.update_layout(
+                template="plotly_dark",
+                plot_bgcolor="rgba(26,26,26,0.8)",
+                paper_bgcolor="rgba(10,10,10,0.8)",
+                font=dict(color="rgba(255,255,255,0.9)"),
+                title=f"{win}-day Returns Over Time (Dual Axis) · {start.date()} → {end.date()}",
+                margin=dict(t=100, r=80, l=80, b=40),  # Increased margins for dual axes
+                xaxis_title="Date",
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.01,
+                    xanchor="center",
+                    x=0.5,
+                    bgcolor="rgba(10,10,10,0.9)",
+                    bordercolor="rgba(255,255,255,0.2)",
+                    borderwidth=1,
+                    itemwidth=30,
+                    font=dict(size=10)
+                ),
+                xaxis=dict(gridcolor="rgba(255,255,255,0.1)"),
+                yaxis=dict(
+                    title=dict(text=f"Index A {win}-day return (%)", font=dict(color="#00c896")),
+                    tickfont=dict(color="#00c896"),
+                    gridcolor="rgba(255,255,255,0.1)",
+                    side="left"
+                ),
+                yaxis2=dict(
+                    title=dict(text=f"Index B {win}-day return (%)", font=dict(color="#888888")),
+                    tickfont=dict(color="#888888"),
+                    anchor="x",
+                    overlaying="y",
+                    side="right",
+                    showgrid=False
+                )
             )
-        )
     
-        # -------- Stats card --------
-        def stats_block(name, s):
-            desc = s.describe()
-            items = [
-                ("Data points", f"{int(desc['count'])}"),
-                ("Average %",   f"{desc['mean']*100:.2f}%"),
-                ("Std dev %",   f"{desc['std']*100:.2f}%"),
-                ("Min %",       f"{desc['min']*100:.2f}%"),
-                ("25% %",       f"{desc['25%']*100:.2f}%"),
-                ("Median %",    f"{desc['50%']*100:.2f}%"),
-                ("75% %",       f"{desc['75%']*100:.2f}%"),
-                ("Max %",       f"{desc['max']*100:.2f}%"),
-            ]
-            return html.Div([
-                html.H4(name, style={"margin":"0 0 16px 0", "fontSize":"18px", "fontWeight":600, "color":"inherit"}),
-                html.Ul([html.Li(html.Span([html.Strong(k + ": ", style={"color":"inherit"}), v]), style={
-                    "marginBottom":"8px", "fontSize":"14px", "color":"inherit", "opacity":0.9
-                }) for k, v in items], style={"listStyle":"none", "padding":0})
-            ], style={"flex":1, "background":"rgba(255,255,255,0.05)","border":"1px solid rgba(255,255,255,0.1)",
+            # -------- Stats card --------
+            def stats_block(name, s):
+                desc = s.describe()
+                items = [
+                    ("Data points", f"{int(desc['count'])}"),
+                    ("Average %",   f"{desc['mean']*100:.2f}%"),
+                    ("Std dev %",   f"{desc['std']*100:.2f}%"),
+                    ("Min %",       f"{desc['min']*100:.2f}%"),
+                    ("25% %",       f"{desc['25%']*100:.2f}%"),
+                    ("Median %",    f"{desc['50%']*100:.2f}%"),
+                    ("75% %",       f"{desc['75%']*100:.2f}%"),
+                    ("Max %",       f"{desc['max']*100:.2f}%"),
+                ]
+                return html.Div([
+                    html.H4(name, style={"margin":"0 0 16px 0", "fontSize":"18px", "fontWeight":600, "color":"inherit"}),
+                    html.Ul([html.Li(html.Span([html.Strong(k + ": ", style={"color":"inherit"}), v]), style={
+                        "marginBottom":"8px", "fontSize":"14px", "color":"inherit", "opacity":0.9
+                    }) for k, v in items], style={"listStyle":"none", "padding":0})
+                ], style={"flex":1, "background":"rgba(255,255,255,0.05)","border":"1px solid rgba(255,255,255,0.1)",
+                          "borderRadius":"16px","padding":"24px", "boxShadow":"0 4px 12px rgba(0,0,0,0.3)"})
+    
+            corr_text = html.Div([
+                html.H4("Relationship", style={"margin":"0 0 12px 0", "fontSize":"18px", "fontWeight":600, "color":"inherit"}),
+                html.P(f"Pearson correlation (windowed returns): {corr:.2f}" if np.isfinite(corr) else
+                       "Pearson correlation (windowed returns): n/a", style={
+                           "fontSize":"16px", "color":"inherit", "opacity":0.9, "margin":0,
+                           "fontWeight":500 if np.isfinite(corr) else 400
+                       })
+            ], style={"flex":1, "background":"rgba(0,200,150,0.08)","border":"1px solid rgba(0,200,150,0.3)",
                       "borderRadius":"16px","padding":"24px", "boxShadow":"0 4px 12px rgba(0,0,0,0.3)"})
     
-        corr_text = html.Div([
-            html.H4("Relationship", style={"margin":"0 0 12px 0", "fontSize":"18px", "fontWeight":600, "color":"inherit"}),
-            html.P(f"Pearson correlation (windowed returns): {corr:.2f}" if np.isfinite(corr) else
-                   "Pearson correlation (windowed returns): n/a", style={
-                       "fontSize":"16px", "color":"inherit", "opacity":0.9, "margin":0,
-                       "fontWeight":500 if np.isfinite(corr) else 400
-                   })
-        ], style={"flex":1, "background":"rgba(0,200,150,0.08)","border":"1px solid rgba(0,200,150,0.3)",
-                  "borderRadius":"16px","padding":"24px", "boxShadow":"0 4px 12px rgba(0,0,0,0.3)"})
-    
-        stats_view = html.Div([
-            html.Div([
-                stats_block("Index A — Stats", rets["retA"]),
-                stats_block("Index B — Stats", rets["retB"]),
-                corr_text
-            ], style={"display":"flex","gap":"12px","flexWrap":"wrap"})
-        ])
+            stats_view = html.Div([
+                html.Div([
+                    stats_block("Index A — Stats", rets["retA"]),
+                    stats_block("Index B — Stats", rets["retB"]),
+                    corr_text
+                ], style={"display":"flex","gap":"12px","flexWrap":"wrap"})
+            ])
     
-        twin = html.Div()  # Empty placeholder
+            # Trade windows over the common trading days of A and B
+            twin = html.Div([
+                html.H4(f"Trade windows (first and last day) · {win}-day window", style={
+                    "fontSize":"20px", "fontWeight":600, "color":"inherit",
+                    "marginTop":"8px", "marginBottom":"16px"
+                }),
+                build_trade_window_table(levels.rename(columns={"A": "index"})[["datetime","index"]], win)
+            ], style={
+                "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
+                "padding":"20px", "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
+                "border":"1px solid rgba(255,255,255,0.1)"
+            })
         
-        # Wrap graphs in containers
-        levels_container = html.Div([
-            dcc.Graph(figure=fig_levels, config={"displayModeBar": False}, style={"height":"360px"})
-        ], style={
-            "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
-            "padding":"20px", "marginBottom":"24px",
-            "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
-            "border":"1px solid rgba(255,255,255,0.1)"
-        })
+            # Wrap graphs in containers
+            levels_container = html.Div([
+                downsampled_graph(fig_levels, config={"displayModeBar": False}, style={"height":"360px"})
+            ], style={
+                "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
+                "padding":"20px", "marginBottom":"24px",
+                "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
+                "border":"1px solid rgba(255,255,255,0.1)"
+            })
         
-        scatter_container = html.Div([
-            dcc.Graph(figure=fig_scatter, config={"displayModeBar": False}, style={"height":"360px"})
-        ], style={
-            "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
-            "padding":"20px", "marginBottom":"24px",
-            "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
-            "border":"1px solid rgba(255,255,255,0.1)"
-        })
+            scatter_container = html.Div([
+                dcc.Graph(figure=fig_scatter, config={"displayModeBar": False}, style={"height":"360px"})
+            ], style={
+                "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
+                "padding":"20px", "marginBottom":"24px",
+                "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
+                "border":"1px solid rgba(255,255,255,0.1)"
+            })
         
-        returns_container = html.Div([
-            dcc.Graph(figure=fig_returns, config={"displayModeBar": False}, style={"height":"360px"})
-        ], style={
-            "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
-            "padding":"20px", "marginBottom":"24px",
-            "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
-            "border":"1px solid rgba(255,255,255,0.1)"
-        })
+            returns_container = html.Div([
+                downsampled_graph(fig_returns, config={"displayModeBar": False}, style={"height":"360px"})
+            ], style={
+                "background":"rgba(255,255,255,0.05)", "borderRadius":"16px",
+                "padding":"20px", "marginBottom":"24px",
+                "boxShadow":"0 4px 12px rgba(0,0,0,0.3)",
+                "border":"1px solid rgba(255,255,255,0.1)"
+            })
         
-        # Show results container
-        results_style = {"marginTop": "32px"}
+            # Show results container
+            results_style = {"marginTop": "32px"}
     
-        return levels_container, scatter_container, returns_container, stats_view, twin, results_style
+            return levels_container, scatter_container, returns_container, stats_view, twin, results_style
+    
+        # Identical requests (same pair of datasets, range and window) arriving while this one
+        # runs wait for it and share its result; finished analyses are kept in the result cache
+        flight_key = ("cross", rawA.get("dataset_key"), rawB.get("dataset_key"), start, end, win)
+        return single_flight(flight_key, lambda: cached_result(flight_key, cross_outputs, valid=stored_views_available),
+                             on_wait=lambda: report_progress(set_progress, 2, 4, "Waiting for an identical analysis"))
+    
+    
+    # -----------------------------
+    # Trade-window tables (server-side paging, sorting & filtering)
+    # -----------------------------
+    @app.callback(
+        Output({"type": "trade-window-table", "key": MATCH}, "data"),
+        Output({"type": "trade-window-table", "key": MATCH}, "page_count"),
+        Input({"type": "trade-window-table", "key": MATCH}, "page_current"),
+        Input({"type": "trade-window-table", "key": MATCH}, "page_size"),
+        Input({"type": "trade-window-table", "key": MATCH}, "sort_by"),
+        Input({"type": "trade-window-table", "key": MATCH}, "filter_query"),
+        prevent_initial_call=True,
+    )
+    def page_trade_window_table(page_current, page_size, sort_by, filter_query):
+        frame = get_trade_windows(ctx.outputs_list[0]["id"]["key"])
+        if frame is None:
+            # Expired (VIEW_DATA_TTL_SECONDS) or evicted from the shared result store, which every
+            # worker reads - the user needs to re-run the analysis
+            return [], 1
+        return page_trade_windows(frame, page_current, page_size, sort_by, filter_query)
+    
+    
+    # -----------------------------
+    # Downsampled graphs: re-render the visible window on zoom
+    # -----------------------------
+    @app.callback(
+        Output({"type": "downsampled-graph", "key": MATCH}, "figure"),
+        Input({"type": "downsampled-graph", "key": MATCH}, "relayoutData"),
+        prevent_initial_call=True,
+    )
+    def zoom_downsampled_graph(relayout):
+        updates = zoom_downsampled_traces(ctx.outputs_list["id"]["key"], relayout)
+        if not updates:
+            return no_update
+        patched = Patch()
+        for i, (x, y) in updates.items():
+            patched["data"][i]["x"] = x
+            patched["data"][i]["y"] = y
+        return patched
     
     
     # -----------------------------
@@ -1252,18 +1550,27 @@ def register_callbacks(app):
         State(STORE_RAW, "data"),
         State("drawdown-filter", "value"),
         State("drawdown-custom-input", "value"),
-        prevent_initial_call=True
+        prevent_initial_call=True,
+        background=True,
+        running=[(Output("drawdown-job-status", "style"), JOB_STATUS_SHOWN, JOB_STATUS_HIDDEN)],
+        progress=[Output("drawdown-job-progress", "children")],
+        cancel=[Input("drawdown-job-cancel", "n_clicks")],
+        interval=JOB_POLL_INTERVAL_MS,
     )
-    def analyze_drawdowns(n_clicks, stored_data, min_drawdown_pct, custom_value):
+    def analyze_drawdowns(set_progress, n_clicks, stored_data, min_drawdown_pct, custom_value):
         if not stored_data or n_clicks == 0:
             return html.Div()
         
         try:
-            # Check if stored_data is the metadata format (with csv_b64)
-            if isinstance(stored_data, dict) and "csv_b64" in stored_data:
-                # Decode base64 CSV data
-                csv_bytes = base64.b64decode(stored_data["csv_b64"])
-                df = pd.read_csv(io.BytesIO(csv_bytes))
+            report_progress(set_progress, 1, 3, "Loading dataset")
+            # Check if stored_data is the metadata format (with a registry key)
+            fingerprint = None
+            if isinstance(stored_data, dict) and "dataset_key" in stored_data:
+                fingerprint = stored_data["dataset_key"]
+                df = get_dataset(fingerprint)
+                if df is None:
+                    return html.Div("This dataset is no longer loaded on the server. Please upload the file again.",
+                                    style={"color":"#ef4444", "padding":"20px"})
             else:
                 # Try as direct DataFrame
                 df = pd.DataFrame(stored_data)
@@ -1271,30 +1578,32 @@ def register_callbacks(app):
             if df.empty:
                 return html.Div("No data available", style={"color":"rgba(255,255,255,0.7)"})
             
-            # Auto-detect date and numeric columns
             date_col = None
             numeric_col = None
             
-            # Find date column
-            for col in df.columns:
-                try:
-                    pd.to_datetime(df[col], errors='coerce')
-                    if pd.to_datetime(df[col], errors='coerce').notna().sum() > len(df) * 0.5:
-                        date_col = col
-                        break
-                except:
-                    continue
-            
-            # Find numeric column (excluding the date column)
-            for col in df.columns:
-                if col != date_col:
+            if is_normalized(df):
+                # Validated, typed and sorted at upload: nothing to detect
+                date_col, numeric_col = "datetime", "index"
+            else:
+                # Auto-detect date and numeric columns
+                # Find date column
+                for col in df.columns:
                     try:
-                        pd.to_numeric(df[col], errors='coerce')
-                        if pd.to_numeric(df[col], errors='coerce').notna().sum() > len(df) * 0.5:
-                            numeric_col = col
+                        if pd.to_datetime(df[col], errors='coerce').notna().sum() > len(df) * 0.5:
+                            date_col = col
                             break
                     except:
                         continue
+                
+                # Find numeric column (excluding the date column)
+                for col in df.columns:
+                    if col != date_col:
+                        try:
+                            if pd.to_numeric(df[col], errors='coerce').notna().sum() > len(df) * 0.5:
+                                numeric_col = col
+                                break
+                        except:
+                            continue
             
             if not date_col or not numeric_col:
                 available_cols = ", ".join(df.columns.tolist())
@@ -1305,316 +1614,326 @@ def register_callbacks(app):
                           style={"fontSize":"13px", "opacity":"0.8"})
                 ], style={"color":"#ef4444", "padding":"20px"})
             
-            # Compute drawdown episodes
-            events_df, annotated = compute_drawdown_recovery(df, date_col, numeric_col)
+            def drawdown_outputs():
+                # Compute drawdown episodes
+                report_progress(set_progress, 2, 3, "Finding drawdown episodes")
+                if fingerprint:
+                    # Registry dataset: running max / episodes are cached (and extended after an append)
+                    events_df, annotated = cached_drawdown_recovery(df, date_col, numeric_col, fingerprint=fingerprint,
+                                                                    base=dataset_meta(fingerprint).get("append_base"))
+                else:
+                    events_df, annotated = compute_drawdown_recovery(df, date_col, numeric_col)
             
-            if events_df.empty:
-                return html.Div("No drawdown episodes found in the data", 
-                              style={"color":"rgba(255,255,255,0.7)", "padding":"20px"})
+                if events_df.empty:
+                    return html.Div("No drawdown episodes found in the data", 
+                                  style={"color":"rgba(255,255,255,0.7)", "padding":"20px"})
             
-            # Determine the actual filter value to use
-            if min_drawdown_pct == -1:  # Custom option selected
-                if custom_value is not None and custom_value >= 0:
-                    filter_threshold = custom_value
+                # Determine the actual filter value to use
+                if min_drawdown_pct == -1:  # Custom option selected
+                    if custom_value is not None and custom_value >= 0:
+                        filter_threshold = custom_value
+                    else:
+                        return html.Div("Please enter a valid custom drawdown percentage (≥0)", 
+                                      style={"color":"#ef4444", "padding":"20px"})
                 else:
-                    return html.Div("Please enter a valid custom drawdown percentage (≥0)", 
-                                  style={"color":"#ef4444", "padding":"20px"})
-            else:
-                filter_threshold = min_drawdown_pct
+                    filter_threshold = min_drawdown_pct
             
-            # Filter by minimum drawdown percentage
-            # drawdown_pct is negative, so we use abs
-            if filter_threshold > 0:
-                events_df = events_df[events_df["drawdown_pct"].abs() * 100 >= filter_threshold]
+                # Filter by minimum drawdown percentage
+                # drawdown_pct is negative, so we use abs
+                if filter_threshold > 0:
+                    events_df = events_df[events_df["drawdown_pct"].abs() * 100 >= filter_threshold]
             
-            if events_df.empty:
-                return html.Div(f"No drawdowns found with magnitude ≥{filter_threshold}%", 
-                              style={"color":"rgba(255,255,255,0.7)", "padding":"20px"})
+                if events_df.empty:
+                    return html.Div(f"No drawdowns found with magnitude ≥{filter_threshold}%", 
+                                  style={"color":"rgba(255,255,255,0.7)", "padding":"20px"})
             
-            # Format the data for display
-            display_df = events_df.copy()
-            display_df["peak_date"] = pd.to_datetime(display_df["peak_date"]).dt.strftime("%Y-%m-%d")
-            display_df["trough_date"] = pd.to_datetime(display_df["trough_date"]).dt.strftime("%Y-%m-%d")
-            display_df["recovery_date"] = pd.to_datetime(display_df["recovery_date"]).dt.strftime("%Y-%m-%d")
-            display_df["drawdown_pct"] = (display_df["drawdown_pct"] * 100).round(2)
-            display_df = display_df.rename(columns={
-                "peak_date": "Peak Date",
-                "peak_value": "Peak Value",
-                "trough_date": "Trough Date",
-                "trough_value": "Trough Value",
-                "recovery_date": "Recovery Date",
-                "recovery_value": "Recovery Value",
-                "drawdown_pct": "Drawdown %",
-                "days_to_trough": "Days to Trough",
-                "days_to_recovery": "Days to Recovery"
-            })
+                # Format the data for display
+                display_df = events_df.copy()
+                display_df["peak_date"] = pd.to_datetime(display_df["peak_date"]).dt.strftime("%Y-%m-%d")
+                display_df["trough_date"] = pd.to_datetime(display_df["trough_date"]).dt.strftime("%Y-%m-%d")
+                display_df["recovery_date"] = pd.to_datetime(display_df["recovery_date"]).dt.strftime("%Y-%m-%d")
+                display_df["drawdown_pct"] = (display_df["drawdown_pct"] * 100).round(2)
+                display_df = display_df.rename(columns={
+                    "peak_date": "Peak Date",
+                    "peak_value": "Peak Value",
+                    "trough_date": "Trough Date",
+                    "trough_value": "Trough Value",
+                    "recovery_date": "Recovery Date",
+                    "recovery_value": "Recovery Value",
+                    "drawdown_pct": "Drawdown %",
+                    "days_to_trough": "Days to Trough",
+                    "days_to_recovery": "Days to Recovery"
+                })
             
-            # Store for download
-            dcc.Store(id="drawdown-data-store", data=display_df.to_dict("records"))
+                # Store for download
+                dcc.Store(id="drawdown-data-store", data=display_df.to_dict("records"))
             
-            # Summary statistics
-            total_episodes = len(display_df)
-            avg_drawdown = display_df["Drawdown %"].mean()
-            max_drawdown = display_df["Drawdown %"].min()
-            avg_recovery = display_df["Days to Recovery"].dropna().mean()
+                # Summary statistics
+                total_episodes = len(display_df)
+                avg_drawdown = display_df["Drawdown %"].mean()
+                max_drawdown = display_df["Drawdown %"].min()
+                avg_recovery = display_df["Days to Recovery"].dropna().mean()
             
-            # Info banner showing detected columns
-            info_banner = html.Div([
-                html.Span("✓ ", style={"marginRight":"6px", "fontSize":"16px"}),
-                html.Span(f"Analyzed using: ", style={"fontWeight":"500"}),
-                html.Span(f"Date column: '{date_col}' | Value column: '{numeric_col}'", 
-                         style={"opacity":"0.8"})
-            ], style={
-                "padding":"12px 16px", "background":"rgba(0,200,150,0.1)", 
-                "borderRadius":"8px", "border":"1px solid rgba(0,200,150,0.3)",
-                "fontSize":"14px", "color":"rgba(255,255,255,0.9)", "marginBottom":"24px"
-            })
+                # Info banner showing detected columns
+                info_banner = html.Div([
+                    html.Span("✓ ", style={"marginRight":"6px", "fontSize":"16px"}),
+                    html.Span(f"Analyzed using: ", style={"fontWeight":"500"}),
+                    html.Span(f"Date column: '{date_col}' | Value column: '{numeric_col}'", 
+                             style={"opacity":"0.8"})
+                ], style={
+                    "padding":"12px 16px", "background":"rgba(0,200,150,0.1)", 
+                    "borderRadius":"8px", "border":"1px solid rgba(0,200,150,0.3)",
+                    "fontSize":"14px", "color":"rgba(255,255,255,0.9)", "marginBottom":"24px"
+                })
             
-            summary = html.Div([
-                html.H4("📊 Summary Statistics", style={
-                    "fontSize":"18px", "fontWeight":600, "color":"rgba(255,255,255,0.95)",
-                    "marginBottom":"16px"
-                }),
-                html.Div([
+                summary = html.Div([
+                    html.H4("📊 Summary Statistics", style={
+                        "fontSize":"18px", "fontWeight":600, "color":"rgba(255,255,255,0.95)",
+                        "marginBottom":"16px"
+                    }),
                     html.Div([
-                        html.Div("Total Episodes", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
-                        html.Div(str(total_episodes), style={"fontSize":"24px", "fontWeight":700, "color":"#ef4444"})
-                    ], style={"flex":"1", "padding":"16px", "background":"rgba(239,68,68,0.1)", 
-                             "borderRadius":"12px", "border":"1px solid rgba(239,68,68,0.2)"}),
+                        html.Div([
+                            html.Div("Total Episodes", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
+                            html.Div(str(total_episodes), style={"fontSize":"24px", "fontWeight":700, "color":"#ef4444"})
+                        ], style={"flex":"1", "padding":"16px", "background":"rgba(239,68,68,0.1)", 
+                                 "borderRadius":"12px", "border":"1px solid rgba(239,68,68,0.2)"}),
                     
-                    html.Div([
-                        html.Div("Avg Drawdown", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
-                        html.Div(f"{avg_drawdown:.2f}%", style={"fontSize":"24px", "fontWeight":700, "color":"#f97316"})
-                    ], style={"flex":"1", "padding":"16px", "background":"rgba(249,115,22,0.1)", 
-                             "borderRadius":"12px", "border":"1px solid rgba(249,115,22,0.2)"}),
+                        html.Div([
+                            html.Div("Avg Drawdown", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
+                            html.Div(f"{avg_drawdown:.2f}%", style={"fontSize":"24px", "fontWeight":700, "color":"#f97316"})
+                        ], style={"flex":"1", "padding":"16px", "background":"rgba(249,115,22,0.1)", 
+                                 "borderRadius":"12px", "border":"1px solid rgba(249,115,22,0.2)"}),
                     
-                    html.Div([
-                        html.Div("Max Drawdown", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
-                        html.Div(f"{max_drawdown:.2f}%", style={"fontSize":"24px", "fontWeight":700, "color":"#dc2626"})
-                    ], style={"flex":"1", "padding":"16px", "background":"rgba(220,38,38,0.1)", 
-                             "borderRadius":"12px", "border":"1px solid rgba(220,38,38,0.2)"}),
+                        html.Div([
+                            html.Div("Max Drawdown", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
+                            html.Div(f"{max_drawdown:.2f}%", style={"fontSize":"24px", "fontWeight":700, "color":"#dc2626"})
+                        ], style={"flex":"1", "padding":"16px", "background":"rgba(220,38,38,0.1)", 
+                                 "borderRadius":"12px", "border":"1px solid rgba(220,38,38,0.2)"}),
                     
-                    html.Div([
-                        html.Div("Avg Recovery Days", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
-                        html.Div(f"{avg_recovery:.0f}" if not pd.isna(avg_recovery) else "N/A", 
-                               style={"fontSize":"24px", "fontWeight":700, "color":"#3b82f6"})
-                    ], style={"flex":"1", "padding":"16px", "background":"rgba(59,130,246,0.1)", 
-                             "borderRadius":"12px", "border":"1px solid rgba(59,130,246,0.2)"}),
-                ], style={"display":"flex", "gap":"12px", "flexWrap":"wrap", "marginBottom":"32px"})
-            ])
+                        html.Div([
+                            html.Div("Avg Recovery Days", style={"fontSize":"13px", "color":"rgba(255,255,255,0.6)", "marginBottom":"4px"}),
+                            html.Div(f"{avg_recovery:.0f}" if not pd.isna(avg_recovery) else "N/A", 
+                                   style={"fontSize":"24px", "fontWeight":700, "color":"#3b82f6"})
+                        ], style={"flex":"1", "padding":"16px", "background":"rgba(59,130,246,0.1)", 
+                                 "borderRadius":"12px", "border":"1px solid rgba(59,130,246,0.2)"}),
+                    ], style={"display":"flex", "gap":"12px", "flexWrap":"wrap", "marginBottom":"32px"})
+                ])
             
-            # DataTable with better column widths
-            table = dash_table.DataTable(
-                data=display_df.to_dict("records"),
-                columns=[{"name": c, "id": c} for c in display_df.columns],
-                page_size=10,
-                page_action="native",
-                page_current=0,
-                sort_action="native",
-                style_table={
-                    "overflowX": "auto",
-                    "backgroundColor": "#1a1a1a",
-                    "borderRadius": "12px",
-                    "overflow": "hidden",
-                    "minWidth": "100%"
-                },
-                style_cell={
-                    "textAlign": "left",
-                    "padding": "12px 16px",
-                    "backgroundColor": "#1a1a1a",
-                    "color": "rgba(255,255,255,0.9)",
-                    "border": "1px solid rgba(255,255,255,0.1)",
-                    "fontFamily": "system-ui, -apple-system, Segoe UI, Roboto, sans-serif",
-                    "fontSize": "14px",
-                    "minWidth": "100px",
-                    "maxWidth": "180px",
-                    "whiteSpace": "normal"
-                },
-                style_cell_conditional=[
-                    {"if": {"column_id": "Peak Date"}, "minWidth": "120px", "maxWidth": "140px"},
-                    {"if": {"column_id": "Peak Value"}, "minWidth": "110px", "maxWidth": "130px"},
-                    {"if": {"column_id": "Trough Date"}, "minWidth": "120px", "maxWidth": "140px"},
-                    {"if": {"column_id": "Trough Value"}, "minWidth": "110px", "maxWidth": "130px"},
-                    {"if": {"column_id": "Recovery Date"}, "minWidth": "120px", "maxWidth": "140px"},
-                    {"if": {"column_id": "Recovery Value"}, "minWidth": "110px", "maxWidth": "130px"},
-                    {"if": {"column_id": "Drawdown %"}, "minWidth": "120px", "maxWidth": "140px"},
-                    {"if": {"column_id": "Days to Trough"}, "minWidth": "130px", "maxWidth": "150px"},
-                    {"if": {"column_id": "Days to Recovery"}, "minWidth": "140px", "maxWidth": "160px"},
-                ],
-                style_header={
-                    "backgroundColor": "#252525",
-                    "color": "rgba(255,255,255,0.95)",
-                    "fontWeight": "600",
-                    "border": "1px solid rgba(255,255,255,0.2)",
-                    "textAlign": "left",
-                    "padding": "14px 16px"
-                },
-                style_data={
-                    "backgroundColor": "#1a1a1a",
-                    "color": "rgba(255,255,255,0.9)",
-                    "border": "1px solid rgba(255,255,255,0.1)"
-                },
-                style_data_conditional=[
-                    {
-                        "if": {"row_index": "even"},
-                        "backgroundColor": "#222222",
+                # DataTable with better column widths
+                table = dash_table.DataTable(
+                    data=display_df.to_dict("records"),
+                    columns=[{"name": c, "id": c} for c in display_df.columns],
+                    page_size=10,
+                    page_action="native",
+                    page_current=0,
+                    sort_action="native",
+                    style_table={
+                        "overflowX": "auto",
+                        "backgroundColor": "#1a1a1a",
+                        "borderRadius": "12px",
+                        "overflow": "hidden",
+                        "minWidth": "100%"
                     },
-                    {
-                        "if": {"state": "selected"},
-                        "backgroundColor": "rgba(239,68,68,0.2)",
-                        "border": "1px solid rgba(239,68,68,0.5)"
+                    style_cell={
+                        "textAlign": "left",
+                        "padding": "12px 16px",
+                        "backgroundColor": "#1a1a1a",
+                        "color": "rgba(255,255,255,0.9)",
+                        "border": "1px solid rgba(255,255,255,0.1)",
+                        "fontFamily": "system-ui, -apple-system, Segoe UI, Roboto, sans-serif",
+                        "fontSize": "14px",
+                        "minWidth": "100px",
+                        "maxWidth": "180px",
+                        "whiteSpace": "normal"
                     },
-                    {
-                        "if": {"column_id": "Drawdown %"},
-                        "color": "#ef4444",
-                        "fontWeight": "600"
+                    style_cell_conditional=[
+                        {"if": {"column_id": "Peak Date"}, "minWidth": "120px", "maxWidth": "140px"},
+                        {"if": {"column_id": "Peak Value"}, "minWidth": "110px", "maxWidth": "130px"},
+                        {"if": {"column_id": "Trough Date"}, "minWidth": "120px", "maxWidth": "140px"},
+                        {"if": {"column_id": "Trough Value"}, "minWidth": "110px", "maxWidth": "130px"},
+                        {"if": {"column_id": "Recovery Date"}, "minWidth": "120px", "maxWidth": "140px"},
+                        {"if": {"column_id": "Recovery Value"}, "minWidth": "110px", "maxWidth": "130px"},
+                        {"if": {"column_id": "Drawdown %"}, "minWidth": "120px", "maxWidth": "140px"},
+                        {"if": {"column_id": "Days to Trough"}, "minWidth": "130px", "maxWidth": "150px"},
+                        {"if": {"column_id": "Days to Recovery"}, "minWidth": "140px", "maxWidth": "160px"},
+                    ],
+                    style_header={
+                        "backgroundColor": "#252525",
+                        "color": "rgba(255,255,255,0.95)",
+                        "fontWeight": "600",
+                        "border": "1px solid rgba(255,255,255,0.2)",
+                        "textAlign": "left",
+                        "padding": "14px 16px"
                     },
-                    {
-                        "if": {"column_id": "Days to Recovery"},
-                        "color": "#3b82f6",
-                        "fontWeight": "500"
-                    }
-                ],
-            )
+                    style_data={
+                        "backgroundColor": "#1a1a1a",
+                        "color": "rgba(255,255,255,0.9)",
+                        "border": "1px solid rgba(255,255,255,0.1)"
+                    },
+                    style_data_conditional=[
+                        {
+                            "if": {"row_index": "even"},
+                            "backgroundColor": "#222222",
+                        },
+                        {
+                            "if": {"state": "selected"},
+                            "backgroundColor": "rgba(239,68,68,0.2)",
+                            "border": "1px solid rgba(239,68,68,0.5)"
+                        },
+                        {
+                            "if": {"column_id": "Drawdown %"},
+                            "color": "#ef4444",
+                            "fontWeight": "600"
+                        },
+                        {
+                            "if": {"column_id": "Days to Recovery"},
+                            "color": "#3b82f6",
+                            "fontWeight": "500"
+                        }
+                    ],
+                )
             
-            # Create drawdown visualization graph with secondary y-axis
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
+                # Create drawdown visualization graph with secondary y-axis
+                report_progress(set_progress, 3, 3, "Building figures")
+                fig = subplots.make_subplots(specs=[[{"secondary_y": True}]])
             
-            # Add price line (primary y-axis) - no markers
-            fig.add_trace(go.Scatter(
-                x=annotated[date_col],
-                y=annotated[numeric_col],
-                mode='lines',
-                name='Price',
-                line=dict(color='#667eea', width=2),
-                marker=dict(size=0),  # Explicitly no markers
-                hovertemplate='<b>Price:</b> %{y:.2f}<extra></extra>'
-            ), secondary_y=False)
+                # Add price line (primary y-axis) - no markers
+                fig.add_trace(go.Scatter(
+                    x=annotated[date_col],
+                    y=annotated[numeric_col],
+                    mode='lines',
+                    name='Price',
+                    line=dict(color='#667eea', width=2),
+                    marker=dict(size=0),  # Explicitly no markers
+                    hovertemplate='<b>Price:</b> %{y:.2f}<extra></extra>'
+                ), secondary_y=False)
             
-            # Add cumulative max line (peaks) - primary y-axis
-            fig.add_trace(go.Scatter(
-                x=annotated[date_col],
-                y=annotated['cum_max'],
-                mode='lines',
-                name='Peak Level',
-                line=dict(color='#00c896', width=1, dash='dash'),
-                marker=dict(size=0),  # Explicitly no markers
-                hovertemplate='<b>Peak:</b> %{y:.2f}<extra></extra>'
-            ), secondary_y=False)
+                # Add cumulative max line (peaks) - primary y-axis
+                fig.add_trace(go.Scatter(
+                    x=annotated[date_col],
+                    y=annotated['cum_max'],
+                    mode='lines',
+                    name='Peak Level',
+                    line=dict(color='#00c896', width=1, dash='dash'),
+                    marker=dict(size=0),  # Explicitly no markers
+                    hovertemplate='<b>Peak:</b> %{y:.2f}<extra></extra>'
+                ), secondary_y=False)
             
-            # Add drawdown percentage line (secondary y-axis) - ONLY for filtered episodes
-            # Create a masked version that only shows drawdowns meeting the threshold
-            drawdown_pct_display = annotated['drawdown_pct'] * 100  # Convert to percentage
-            # Mask: only show drawdown when it meets or exceeds the threshold
-            drawdown_display_masked = drawdown_pct_display.copy()
-            drawdown_display_masked[drawdown_pct_display.abs() < filter_threshold] = 0  # Set small drawdowns to 0
+                # Add drawdown percentage line (secondary y-axis) - ONLY for filtered episodes
+                # Create a masked version that only shows drawdowns meeting the threshold
+                drawdown_pct_display = annotated['drawdown_pct'] * 100  # Convert to percentage
+                # Mask: only show drawdown when it meets or exceeds the threshold
+                drawdown_display_masked = drawdown_pct_display.copy()
+                drawdown_display_masked[drawdown_pct_display.abs() < filter_threshold] = 0  # Set small drawdowns to 0
             
-            fig.add_trace(go.Scatter(
-                x=annotated[date_col],
-                y=drawdown_display_masked,
-                mode='lines',
-                name='Drawdown %',
-                line=dict(color='#ef4444', width=2, dash='dot'),
-                fill='tozeroy',
-                fillcolor='rgba(239,68,68,0.15)',
-                marker=dict(size=0),  # Explicitly no markers
-                hovertemplate='<b>Drawdown:</b> %{y:.2f}%<extra></extra>'
-            ), secondary_y=True)
+                fig.add_trace(go.Scatter(
+                    x=annotated[date_col],
+                    y=drawdown_display_masked,
+                    mode='lines',
+                    name='Drawdown %',
+                    line=dict(color='#ef4444', width=2, dash='dot'),
+                    fill='tozeroy',
+                    fillcolor='rgba(239,68,68,0.15)',
+                    marker=dict(size=0),  # Explicitly no markers
+                    hovertemplate='<b>Drawdown:</b> %{y:.2f}%<extra></extra>'
+                ), secondary_y=True)
             
-            # Add shaded regions for each filtered drawdown episode (primary y-axis)
-            for _, episode in events_df.iterrows():
-                # Get the data for this episode
-                episode_mask = (annotated[date_col] >= pd.to_datetime(episode['peak_date'])) & \
-                              (annotated[date_col] <= pd.to_datetime(episode['recovery_date'] if pd.notna(episode['recovery_date']) else annotated[date_col].max()))
-                episode_data = annotated[episode_mask]
-                
-                if not episode_data.empty:
-                    # Add shaded region
-                    fig.add_trace(go.Scatter(
-                        x=episode_data[date_col],
-                        y=episode_data[numeric_col],
-                        fill='tonexty',
-                        fillcolor='rgba(239,68,68,0.25)',
-                        line=dict(width=0),
-                        showlegend=False,
-                        hoverinfo='skip'
-                    ), secondary_y=False)
+                # Shade the filtered episodes (primary y-axis): one trace, episodes separated by gaps
+                shade_x, shade_y = drawdown_shading(annotated, events_df, date_col, numeric_col)
+                fig.add_trace(go.Scatter(
+                    x=shade_x,
+                    y=shade_y,
+                    mode='none',
+                    fill='toself',
+                    fillcolor='rgba(239,68,68,0.25)',
+                    showlegend=False,
+                    hoverinfo='skip'
+                ), secondary_y=False)
             
-            # Update layout
-            fig.update_layout(
-                title={
-                    'text': f'📈 Price History with Drawdown Episodes (≥{filter_threshold}%)',
-                    'font': {'size': 18, 'color': 'rgba(255,255,255,0.95)', 'family': 'system-ui'},
-                    'x': 0.5,
-                    'xanchor': 'center'
-                },
-                xaxis=dict(
-                    title='Date',
+                # Update layout
+                fig.update_layout(
+                    title={
+                        'text': f'📈 Price History with Drawdown Episodes (≥{filter_threshold}%)',
+                        'font': {'size': 18, 'color': 'rgba(255,255,255,0.95)', 'family': 'system-ui'},
+                        'x': 0.5,
+                        'xanchor': 'center'
+                    },
+                    xaxis=dict(
+                        title='Date',
+                        gridcolor='rgba(255,255,255,0.1)',
+                        color='rgba(255,255,255,0.9)',
+                        showgrid=True
+                    ),
+                    plot_bgcolor='#1a1a1a',
+                    paper_bgcolor='#1a1a1a',
+                    font=dict(color='rgba(255,255,255,0.9)', family='system-ui'),
+                    hovermode='x unified',
+                    legend=dict(
+                        bgcolor='rgba(37,37,37,0.9)',
+                        bordercolor='rgba(255,255,255,0.2)',
+                        borderwidth=1,
+                        font=dict(size=12),
+                        orientation='h',
+                        yanchor='bottom',
+                        y=1.02,
+                        xanchor='center',
+                        x=0.5
+                    ),
+                    height=550,
+                    margin=dict(l=60, r=80, t=80, b=60)
+                )
+            
+                # Set y-axes titles
+                fig.update_yaxes(
+                    title_text=numeric_col.title(),
                     gridcolor='rgba(255,255,255,0.1)',
                     color='rgba(255,255,255,0.9)',
-                    showgrid=True
-                ),
-                plot_bgcolor='#1a1a1a',
-                paper_bgcolor='#1a1a1a',
-                font=dict(color='rgba(255,255,255,0.9)', family='system-ui'),
-                hovermode='x unified',
-                legend=dict(
-                    bgcolor='rgba(37,37,37,0.9)',
-                    bordercolor='rgba(255,255,255,0.2)',
-                    borderwidth=1,
-                    font=dict(size=12),
-                    orientation='h',
-                    yanchor='bottom',
-                    y=1.02,
-                    xanchor='center',
-                    x=0.5
-                ),
-                height=550,
-                margin=dict(l=60, r=80, t=80, b=60)
-            )
-            
-            # Set y-axes titles
-            fig.update_yaxes(
-                title_text=numeric_col.title(),
-                gridcolor='rgba(255,255,255,0.1)',
-                color='rgba(255,255,255,0.9)',
-                showgrid=True,
-                secondary_y=False
-            )
+                    showgrid=True,
+                    secondary_y=False
+                )
             
-            fig.update_yaxes(
-                title_text="Drawdown %",
-                gridcolor='rgba(239,68,68,0.1)',
-                color='#ef4444',
-                showgrid=False,
-                zeroline=True,
-                zerolinecolor='rgba(255,255,255,0.3)',
-                zerolinewidth=1,
-                secondary_y=True
-            )
+                fig.update_yaxes(
+                    title_text="Drawdown %",
+                    gridcolor='rgba(239,68,68,0.1)',
+                    color='#ef4444',
+                    showgrid=False,
+                    zeroline=True,
+                    zerolinecolor='rgba(255,255,255,0.3)',
+                    zerolinewidth=1,
+                    secondary_y=True
+                )
             
-            graph_component = dcc.Graph(
-                figure=fig,
-                config={'displayModeBar': True, 'displaylogo': False},
-                style={"borderRadius": "12px", "overflow": "hidden", "marginBottom": "32px"}
-            )
+                graph_component = downsampled_graph(
+                    fig,
+                    config={'displayModeBar': True, 'displaylogo': False},
+                    style={"borderRadius": "12px", "overflow": "hidden", "marginBottom": "32px"}
+                )
             
-            return html.Div([
-                info_banner,
-                summary,
-                html.Div([
-                    html.H4("📋 Drawdown Episodes Table", style={
-                        "fontSize":"18px", "fontWeight":600, "color":"rgba(255,255,255,0.95)",
-                        "marginBottom":"16px", "marginTop":"24px"
-                    }),
-                    html.P(f"Showing {len(display_df)} episode(s) with drawdown ≥{filter_threshold}%", style={
-                        "fontSize":"14px", "color":"rgba(255,255,255,0.6)", "marginBottom":"16px"
-                    }),
-                    table,
-                    # Store data for download
-                    dcc.Store(id="drawdown-data-store", data=display_df.to_dict("records"))
+                return html.Div([
+                    info_banner,
+                    summary,
+                    graph_component,
+                    html.Div([
+                        html.H4("📋 Drawdown Episodes Table", style={
+                            "fontSize":"18px", "fontWeight":600, "color":"rgba(255,255,255,0.95)",
+                            "marginBottom":"16px", "marginTop":"24px"
+                        }),
+                        html.P(f"Showing {len(display_df)} episode(s) with drawdown ≥{filter_threshold}%", style={
+                            "fontSize":"14px", "color":"rgba(255,255,255,0.6)", "marginBottom":"16px"
+                        }),
+                        table,
+                        # Store data for download
+                        dcc.Store(id="drawdown-data-store", data=display_df.to_dict("records"))
+                    ])
                 ])
-            ])
+            
+            if not fingerprint:
+                return drawdown_outputs()
+            # Identical requests (same dataset and minimum drawdown) arriving while this one
+            # runs wait for it and share its result; finished analyses are kept in the result cache
+            flight_key = ("drawdown", fingerprint, min_drawdown_pct, custom_value if min_drawdown_pct == -1 else None)
+            return single_flight(flight_key, lambda: cached_result(flight_key, drawdown_outputs, valid=stored_views_available),
+                                 on_wait=lambda: report_progress(set_progress, 2, 3, "Waiting for an identical analysis"))
             
         except Exception as e:
             return html.Div(f"Error analyzing drawdowns: {str(e)}", 
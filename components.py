@@ -4,6 +4,8 @@ Reusable UI components for the Index Data Analysis app.
 
 from dash import html, dcc
 
+from config import UPLOAD_ACCEPT, UPLOAD_ROUTE
+
 
 def PageContainer(children, **kwargs):
     """Consistent page container with max-width and responsive padding"""
@@ -266,7 +268,7 @@ def DateRangePicker(id, label, preset_id=None, preset_options=None, preset_value
     ], style={"marginBottom": "20px"})
 
 
-def FileDropzone(id, label, accept=".csv", filename=None, on_replace_id=None, on_remove_id=None, **kwargs):
+def FileDropzone(id, label, accept=UPLOAD_ACCEPT, filename=None, on_replace_id=None, on_remove_id=None, multiple=False, **kwargs):
     """Reusable file dropzone component with drag/drop and click support"""
     if filename:
         # Show file info with replace/remove actions
@@ -343,7 +345,7 @@ def FileDropzone(id, label, accept=".csv", filename=None, on_replace_id=None, on
                         "fontSize": "15px",
                         "color": "rgba(255,255,255,0.7)"
                     }),
-                    html.A("Select CSV File", style={
+                    html.A("Select File", style={
                         "fontSize": "15px",
                         "color": "#00c896",
                         "fontWeight": "600",
@@ -381,13 +383,50 @@ def FileDropzone(id, label, accept=".csv", filename=None, on_replace_id=None, on
                 "justifyContent": "center",
                 "alignItems": "center"
             },
-            multiple=False,
+            multiple=multiple,
             accept=accept,
             **kwargs
         )
     ], style={"marginBottom": "20px"})
 
 
+def ChunkedUploader(id, label="Large file? Upload it in resumable chunks:", accept=UPLOAD_ACCEPT):
+    """
+    File picker for very large files: assets/chunked_upload.js streams the file to the
+    uploads.py routes in binary chunks and polls while the server parses it; dcc.Store `id`
+    receives only the resulting dataset handle ({"dataset_key", "filename", "rows", "warnings"} or {"error"}).
+    """
+    return html.Div([
+        dcc.Store(id=id),
+        html.Span(label, style={
+            "fontSize": "13px",
+            "color": "rgba(255,255,255,0.6)",
+            "marginRight": "8px"
+        }),
+        # Dash has no file input component: the button opens the browser's file picker from JS
+        html.Button(
+            "Choose file",
+            className="chunked-upload-button",
+            style={
+                "fontSize": "13px",
+                "padding": "4px 12px",
+                "borderRadius": "6px",
+                "border": "1px solid rgba(255,255,255,0.2)",
+                "background": "rgba(255,255,255,0.1)",
+                "color": "rgba(255,255,255,0.8)",
+                "cursor": "pointer"
+            },
+            **{"data-store-id": id, "data-status-id": f"{id}-status", "data-upload-url": UPLOAD_ROUTE,
+               "data-accept": accept}
+        ),
+        html.Div(id=f"{id}-status", style={
+            "fontSize": "13px",
+            "color": "#00c896",
+            "marginTop": "6px"
+        })
+    ], style={"marginTop": "-8px", "marginBottom": "16px"})
+
+
 def Button(id, label, variant="primary", disabled=False, loading=False, full_width=False, **kwargs):
     """Reusable button component with variants and states"""
     base_style = {
@@ -428,6 +467,25 @@ def Button(id, label, variant="primary", disabled=False, loading=False, full_wid
     )
 
 
+JOB_STATUS_SHOWN = {"display": "flex", "alignItems": "center", "justifyContent": "flex-end", "gap": "12px", "marginTop": "12px"}
+JOB_STATUS_HIDDEN = {**JOB_STATUS_SHOWN, "display": "none"}
+
+
+def JobStatus(id):
+    """
+    Progress line and Cancel button of a background callback (see jobs.py); hidden until a job
+    runs. The callback drives `{id}-status` (running), `{id}-progress` (progress) and
+    cancels on `{id}-cancel`.
+    """
+    return html.Div([
+        html.Span(id=f"{id}-progress", style={
+            "fontSize": "14px",
+            "color": "rgba(255,255,255,0.8)"
+        }),
+        Button(f"{id}-cancel", "Cancel", variant="secondary", style={"padding": "6px 14px", "fontSize": "13px"})
+    ], id=f"{id}-status", style=JOB_STATUS_HIDDEN)
+
+
 def feature_card(icon, title, description, features, gradient_bg, href):
     """Reusable feature card component with consistent styling and layout"""
     return dcc.Link(
@@ -3,12 +3,83 @@ Configuration file for Index Data Analysis app.
 Contains app setup, CSS styles, and constants.
 """
 
+import os
+import tempfile
+
 # Store IDs
 STORE_RAW = "store_raw_df"
 STORE_META = "store_meta"
 STORE_A = "store_raw_a"
 STORE_B = "store_raw_b"
 
+# Server-side dataset registry (stores above hold only the dataset key)
+DATASET_MEMORY_BUDGET_MB = int(os.environ.get("DATASET_MEMORY_BUDGET_MB", 1024))
+DATASET_TTL_SECONDS = int(os.environ.get("DATASET_TTL_SECONDS", 6 * 60 * 60))
+# Memory-mapped dataset files (datasets.py); workers on one host share them through the page cache,
+# along with the index of already-parsed uploads. Session reference counts stay per worker.
+# Set to an empty string to keep datasets (and the upload index) in process memory only.
+DATASET_DIR = os.environ.get("DATASET_DIR", os.path.join(tempfile.gettempdir(), "index-data-datasets"))
+
+# File types accepted by the upload dropzones (utils.parse_upload)
+UPLOAD_ACCEPT = ".csv,.gz,.bz2,.xz,.zip,.parquet,.pq,.feather,.arrow,.ipc,.arrows"
+
+# Resumable chunked uploads (uploads.py routes, assets/chunked_upload.js)
+UPLOAD_ROUTE = "/upload"
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 4 * 1024 ** 3))
+UPLOAD_TMP_DIR = os.environ.get("UPLOAD_TMP_DIR", os.path.join(tempfile.gettempdir(), "index-data-uploads"))
+UPLOAD_PARTIAL_TTL_SECONDS = int(os.environ.get("UPLOAD_PARTIAL_TTL_SECONDS", 24 * 60 * 60))
+
+# Worker processes parsing multi-file batch uploads (batch_upload.py)
+BATCH_UPLOAD_WORKERS = int(os.environ.get("BATCH_UPLOAD_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Background callbacks (jobs.py): diskcache/SQLite job store shared by every worker process on the host
+JOB_CACHE_DIR = os.environ.get("JOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "index-data-jobs"))
+# How long job results, progress and the results jobs leave for later requests are kept
+JOB_RESULT_TTL_SECONDS = int(os.environ.get("JOB_RESULT_TTL_SECONDS", 60 * 60))
+# Poll interval of a running background callback (progress updates arrive this often)
+JOB_POLL_INTERVAL_MS = int(os.environ.get("JOB_POLL_INTERVAL_MS", 500))
+
+# Identical analyses requested while one is running wait for it and share its result (jobs.single_flight).
+# Each job is its own process, so coalescing across jobs and gunicorn workers uses a file lock in
+# JOB_CACHE_DIR (POSIX only; "0" limits it to threads of one process)
+SINGLE_FLIGHT_FILE_LOCK = os.environ.get("SINGLE_FLIGHT_FILE_LOCK", "1") == "1"
+# How long a finished result stays in the job store for the requests that waited on it
+SINGLE_FLIGHT_SHARE_SECONDS = int(os.environ.get("SINGLE_FLIGHT_SHARE_SECONDS", 30))
+
+# Persistent result cache (result_cache.py): computed columns and finished analyses, kept across
+# worker restarts and deploys in a size-bounded diskcache (SQLite) store; least recently used go first
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "index-data-results"))
+RESULT_CACHE_SIZE_MB = int(os.environ.get("RESULT_CACHE_SIZE_MB", 1024))
+# Salt of every result key. Empty: a hash of the app's source and library versions, so results
+# computed by different code are never served (set it, e.g. to the release tag, to control it)
+RESULT_CACHE_SALT = os.environ.get("RESULT_CACHE_SALT", "")
+# How long the server-side data behind an analysis' zoomable graphs and paged trade-window
+# tables is kept; a stored analysis whose data has expired is recomputed
+VIEW_DATA_TTL_SECONDS = int(os.environ.get("VIEW_DATA_TTL_SECONDS", 24 * 60 * 60))
+
+# Threads (per process) running the drop, gain and indicator sections of a single-page analysis side by side
+ANALYSIS_SECTION_WORKERS = int(os.environ.get("ANALYSIS_SECTION_WORKERS", min(3, os.cpu_count() or 1)))
+
+# Rows read to detect the date/numeric columns (and the date format) of an uploaded CSV
+CSV_SAMPLE_ROWS = int(os.environ.get("CSV_SAMPLE_ROWS", 2000))
+# Rows per chunk when streaming the chosen columns of an upload into typed arrays
+CSV_CHUNK_ROWS = int(os.environ.get("CSV_CHUNK_ROWS", 100_000))
+
+# In-process memo of computed returns / indicator columns (utils.COMPUTE_CACHE)
+COMPUTE_CACHE_BUDGET_MB = int(os.environ.get("COMPUTE_CACHE_BUDGET_MB", 256))
+# Indicator columns and drawdown episodes that took at least this long to compute and are at least
+# this large are also written (off the request thread) to the persistent result cache, so later
+# background jobs reuse them; returns and sorted returns are always written
+COMPUTE_PERSIST_MIN_MS = int(os.environ.get("COMPUTE_PERSIST_MIN_MS", 20))
+COMPUTE_PERSIST_MIN_KB = int(os.environ.get("COMPUTE_PERSIST_MIN_KB", 64))
+
+# Max points per line trace sent to the browser (LTTB downsampling; zooming re-renders at full detail)
+PLOT_MAX_POINTS = int(os.environ.get("PLOT_MAX_POINTS", 2000))
+
+# Print the boot phases and the background import of numpy/pandas/plotly to stderr (startup.py)
+STARTUP_REPORT = os.environ.get("STARTUP_REPORT", "1") == "1"
+
 # Month options for date pickers
 MONTH_OPTIONS = [{"label": m, "value": i} for i, m in enumerate(
     ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"], start=1
@@ -0,0 +1,366 @@
+"""
+Server-side dataset registry.
+Parsed uploads live here as typed numpy columns; dcc.Store components only carry the key.
+With DATASET_DIR set, each series is written once to a compact file and memory-mapped, so
+worker processes share it through the page cache and can open datasets other workers registered.
+Raw uploads are content-addressed too, so a file that was already parsed (by any session)
+maps straight to its dataset; with DATASET_DIR that index is kept on disk as well, so it holds
+across the workers on the host. Reference counts (sessions using a dataset) are per process:
+they only order this worker's memory eviction, while files on disk expire by idle time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from config import DATASET_MEMORY_BUDGET_MB, DATASET_TTL_SECONDS, DATASET_DIR
+from startup import lazy_import
+from utils import mark_normalized
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Series file: 32-byte header (magic, row count, timestamp unit, reserved), then the int64
+# timestamps and the float64 values, little-endian and 8-byte aligned for numpy.memmap.
+SERIES_MAGIC = b"IDXSER1\0"
+_SERIES_HEADER = struct.Struct("<8sq8sq")
+
+
+def dataset_fingerprint(datetimes: np.ndarray, values: np.ndarray) -> str:
+    """Content hash of a normalized ['datetime','index'] series."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(datetimes, dtype="datetime64[ns]").view("int64").tobytes())
+    h.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def write_series_file(path: str, datetimes: np.ndarray, values: np.ndarray):
+    """Write a sorted series as a series file (ns timestamps); atomic, so concurrent writers are safe."""
+    datetimes = np.ascontiguousarray(datetimes, dtype="datetime64[ns]").view("<i8")
+    values = np.ascontiguousarray(values, dtype="<f8")
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_SERIES_HEADER.pack(SERIES_MAGIC, len(values), b"ns", 0))
+            datetimes.tofile(f)
+            values.tofile(f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def open_series_file(path: str):
+    """(datetimes, values) of a series file as read-only memmaps (datetime64 and float64)."""
+    with open(path, "rb") as f:
+        magic, rows, unit, _ = _SERIES_HEADER.unpack(f.read(_SERIES_HEADER.size))
+    if magic != SERIES_MAGIC:
+        raise ValueError(f"{path} is not a series file")
+    unit = unit.rstrip(b"\0").decode()
+    if rows == 0:
+        # mmap cannot map an empty range
+        return np.empty(0, dtype=f"datetime64[{unit}]"), np.empty(0, dtype=float)
+    datetimes = np.memmap(path, dtype="<i8", mode="r", offset=_SERIES_HEADER.size, shape=(rows,))
+    values = np.memmap(path, dtype="<f8", mode="r", offset=_SERIES_HEADER.size + 8 * rows, shape=(rows,))
+    return datetimes.view(f"datetime64[{unit}]"), values
+
+
+def _upload_hasher(filename: str):
+    # The extension selects the parser, so it is part of an upload's identity
+    h = hashlib.blake2b(digest_size=16)
+    name = (filename or "").lower()
+    h.update(name[name.find("."):].encode() if "." in name else b"")
+    return h
+
+
+def upload_fingerprint(contents: str, filename: str) -> str:
+    """Content hash of a raw dcc.Upload payload (plus the extension, which selects the parser)."""
+    h = _upload_hasher(filename)
+    # Hash in slices: encoding the whole (possibly huge) string at once would copy it
+    step = 1 << 20
+    for i in range(0, len(contents), step):
+        h.update(contents[i:i + step].encode())
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str, filename: str) -> str:
+    """Content hash of an upload assembled on disk (chunked uploads), plus the extension."""
+    h = _upload_hasher(filename)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DatasetRegistry:
+    """
+    In-process store of normalized series keyed by content hash.
+    Entries expire after `ttl_seconds` without access; when the total size exceeds
+    `budget_bytes` the least recently used entries are evicted first, unreferenced
+    ones (no session of this process holds them, see acquire/release) before referenced ones.
+    With a `directory`, series files and the upload index are shared by every process using it.
+    """
+
+    def __init__(self, budget_bytes: int, ttl_seconds: float, directory: str = None):
+        self.budget_bytes = budget_bytes
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory or None
+        self._entries = OrderedDict()
+        self._uploads = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def register(self, df: pd.DataFrame, upload_hash: str = None, **meta) -> str:
+        """
+        Store df[['datetime','index']] (already normalized by the parser) and return its key.
+        `upload_hash` (upload_fingerprint / file_fingerprint of the raw file) lets find_upload skip re-parsing it.
+        """
+        datetimes = df["datetime"].to_numpy(dtype="datetime64[ns]")
+        values = df["index"].to_numpy(dtype=float)
+        key = dataset_fingerprint(datetimes, values)
+
+        with self._lock:
+            if key in self._entries:
+                self._touch(key)
+            elif not self._load(key):
+                mapped = self._write(key, datetimes, values, meta)
+                if mapped is None:
+                    datetimes, values = datetimes.copy(), values.copy()
+                    # Shared between requests: never let a consumer modify them in place
+                    datetimes.flags.writeable = False
+                    values.flags.writeable = False
+                else:
+                    datetimes, values = mapped
+                self._add(key, datetimes, values, meta)
+            if upload_hash:
+                self._uploads[upload_hash] = key
+                self._entries[key]["uploads"].add(upload_hash)
+                self._write_upload(upload_hash, key)
+            self._evict(keep=key)
+        return key
+
+    def find_upload(self, upload_hash: str):
+        """Key of the dataset already parsed from this raw upload (by any worker with a directory), or None."""
+        with self._lock:
+            self._evict()
+            key = self._uploads.get(upload_hash) or self._load_upload(upload_hash)
+            if key is None:
+                return None
+            self._touch(key)
+            return key
+
+    def acquire(self, key: str):
+        """A session of this process started using key."""
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]["refs"] += 1
+
+    def release(self, key: str):
+        """A session stopped using key (replaced it with another upload)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["refs"] > 0:
+                entry["refs"] -= 1
+
+    def get(self, key: str):
+        """
+        DataFrame ['datetime','index'] for key (read-only columns), or None if unknown/evicted.
+        Flagged with utils.mark_normalized: it was validated, typed and sorted at upload.
+        """
+        with self._lock:
+            self._evict()
+            if not key or (key not in self._entries and not self._load(key)):
+                return None
+            entry = self._entries[key]
+            self._touch(key)
+        return mark_normalized(pd.DataFrame({"datetime": entry["datetime"], "index": entry["index"]}, copy=False))
+
+    def meta(self, key: str) -> dict:
+        with self._lock:
+            if not key or (key not in self._entries and not self._load(key)):
+                return {}
+            return dict(self._entries[key]["meta"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"datasets": len(self._entries), "bytes": self._nbytes, "budget_bytes": self.budget_bytes,
+                    "referenced": sum(1 for e in self._entries.values() if e["refs"] > 0),
+                    "uploads": len(self._uploads)}
+
+    def _add(self, key, datetimes, values, meta):
+        self._entries[key] = {
+            "datetime": datetimes,
+            "index": values,
+            "nbytes": datetimes.nbytes + values.nbytes,
+            "meta": meta,
+            "last_access": time.monotonic(),
+            "refs": 0,
+            "uploads": set(),
+        }
+        self._nbytes += self._entries[key]["nbytes"]
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def _write(self, key, datetimes, values, meta):
+        """Write key's series file (+ meta) and return its memmaps, or None without a usable directory."""
+        if not self.directory:
+            return None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._sweep_files()
+            tmp = self._path(key, f"json.{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(meta, f, default=str)
+            os.replace(tmp, self._path(key, "json"))
+            write_series_file(self._path(key, "series"), datetimes, values)
+            return open_series_file(self._path(key, "series"))
+        except OSError:
+            # Read-only or full disk: keep this dataset in memory instead
+            return None
+
+    def _write_upload(self, upload_hash, key):
+        # Upload index entry: a small file naming the dataset, next to its series file
+        if not self.directory or not upload_hash.isalnum():
+            return
+        try:
+            tmp = self._path(upload_hash, f"upload.{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                f.write(key)
+            os.replace(tmp, self._path(upload_hash, "upload"))
+        except OSError:
+            pass
+
+    def _load_upload(self, upload_hash):
+        """Key from the upload index on disk (written by this or another worker) once its dataset is loaded, or None."""
+        if not self.directory or not upload_hash or not upload_hash.isalnum():
+            return None
+        try:
+            with open(self._path(upload_hash, "upload")) as f:
+                key = f.read().strip()
+        except OSError:
+            return None
+        if key not in self._entries and not self._load(key):
+            return None
+        self._uploads[upload_hash] = key
+        self._entries[key]["uploads"].add(upload_hash)
+        return key
+
+    def _load(self, key) -> bool:
+        """Map key's series file (written by this or another worker) into the registry, if there is one."""
+        if not self.directory or not key or not key.isalnum():
+            return False
+        try:
+            datetimes, values = open_series_file(self._path(key, "series"))
+            with open(self._path(key, "json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self._add(key, datetimes, values, meta)
+        self._evict(keep=key)
+        return True
+
+    def _sweep_files(self):
+        # Files are touched on every access, so an old mtime means no worker has used the dataset
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.directory):
+            try:
+                if os.path.getmtime(os.path.join(self.directory, name)) < cutoff:
+                    os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+
+    def _touch(self, key):
+        self._entries[key]["last_access"] = time.monotonic()
+        self._entries.move_to_end(key)
+        if self.directory:
+            paths = [self._path(key, ext) for ext in ("series", "json")]
+            paths += [self._path(h, "upload") for h in self._entries[key]["uploads"]]
+            for path in paths:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._nbytes -= entry["nbytes"]
+        for upload_hash in entry["uploads"]:
+            self._uploads.pop(upload_hash, None)
+
+    def _evict(self, keep=None):
+        # TTL first (sessions can vanish without releasing), then LRU down to the memory
+        # budget - unreferenced entries before referenced ones; the entry just added always stays
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if now - e["last_access"] > self.ttl_seconds and k != keep]:
+            self._drop(key)
+        for referenced in (False, True):
+            for key in [k for k, e in self._entries.items() if (e["refs"] > 0) == referenced]:
+                if self._nbytes <= self.budget_bytes:
+                    return
+                if key != keep:
+                    self._drop(key)
+
+
+REGISTRY = DatasetRegistry(DATASET_MEMORY_BUDGET_MB * 1024 * 1024, DATASET_TTL_SECONDS, DATASET_DIR)
+
+
+def register_dataset(df: pd.DataFrame, upload_hash: str = None, **meta) -> str:
+    """Register a parsed ['datetime','index'] frame in the process-wide registry."""
+    return REGISTRY.register(df, upload_hash=upload_hash, **meta)
+
+
+def find_uploaded_dataset(upload_hash: str):
+    """Dataset key previously registered for this upload_fingerprint, or None."""
+    return REGISTRY.find_upload(upload_hash)
+
+
+def switch_dataset(old_key: str, new_key: str):
+    """Move a session's reference from old_key to new_key (either may be None)."""
+    if old_key == new_key:
+        return
+    if new_key:
+        REGISTRY.acquire(new_key)
+    if old_key:
+        REGISTRY.release(old_key)
+
+
+def append_dataset(key: str, new_rows: pd.DataFrame, **meta):
+    """
+    Register key's series with new_rows merged in and return (new key, rows kept from key),
+    or (None, 0) if key is no longer loaded.
+    new_rows supersede the stored rows from their first datetime on, so an append file may
+    repeat (and correct) the last few days. The new entry records its parent as
+    meta["append_base"], which lets the cached_* kernels recompute only the tail.
+    """
+    base = REGISTRY.get(key)
+    if base is None:
+        return None, 0
+    changed_at = new_rows["datetime"].min()
+    kept = int(np.searchsorted(base["datetime"].to_numpy(), np.datetime64(changed_at), side="left"))
+    merged = pd.DataFrame({
+        "datetime": np.concatenate([base["datetime"].to_numpy()[:kept], new_rows["datetime"].to_numpy(dtype="datetime64[ns]")]),
+        "index": np.concatenate([base["index"].to_numpy()[:kept], new_rows["index"].to_numpy(dtype=float)]),
+    }, copy=False)
+    meta["append_base"] = {
+        "parent": key,
+        "changed_at": pd.Timestamp(changed_at).isoformat(),
+        "parent_last": pd.Timestamp(base["datetime"].iloc[-1]).isoformat(),
+    }
+    return register_dataset(merged, **meta), kept
+
+
+def get_dataset(key: str):
+    """Frame for a key from register_dataset, or None if it expired or was evicted."""
+    return REGISTRY.get(key)
+
+
+def dataset_meta(key: str) -> dict:
+    """Metadata passed to register_dataset for key (filename, warnings, ...), or {} if unknown."""
+    return REGISTRY.meta(key)
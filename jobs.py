@@ -0,0 +1,201 @@
+"""
+Background jobs for the heavy analyses.
+run_analysis_single, run_cross and analyze_drawdowns run as Dash background callbacks: each
+click starts a job process managed through a diskcache (SQLite) store in JOB_CACHE_DIR, the
+browser polls it for progress and the result, and Cancel or a newer click terminates the job.
+Results a job leaves for later requests (trade-window tables, full-resolution plot traces,
+computed columns) go through SharedStore so the web worker serving the next request finds them.
+Within a job, independent sections of an analysis can run side by side with run_sections, and
+single_flight lets identical concurrent analyses share one computation.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import threading
+
+import diskcache
+from dash import DiskcacheManager
+
+from config import (JOB_CACHE_DIR, JOB_RESULT_TTL_SECONDS, SINGLE_FLIGHT_FILE_LOCK, SINGLE_FLIGHT_SHARE_SECONDS,
+                    ANALYSIS_SECTION_WORKERS)
+from startup import wait_for_warm_up
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: single_flight only coalesces threads of one process
+    fcntl = None
+
+
+
+class _JobManager(DiskcacheManager):
+    """DiskcacheManager that forks a job only once startup.warm_up has finished its imports."""
+
+    def call_job_fn(self, key, job_fn, args, context):
+        # A child forked while the warm-up thread holds an import lock can deadlock on import;
+        # the job needs those modules anyway, so only job starts wait (other requests never do)
+        wait_for_warm_up()
+        return super().call_job_fn(key, job_fn, args, context)
+
+
+JOB_CACHE = diskcache.Cache(JOB_CACHE_DIR)
+BACKGROUND_MANAGER = _JobManager(JOB_CACHE, expire=JOB_RESULT_TTL_SECONDS)
+
+
+class SharedStore:
+    """
+    Small in-process LRU in front of a diskcache store (JOB_CACHE by default): a value set in
+    one process (e.g. a background job) can be read by any other process on the host until it
+    expires (never with expire=None; the store's size limit evicts it instead).
+    """
+
+    def __init__(self, namespace: str, max_local: int, expire: float = JOB_RESULT_TTL_SECONDS, cache=None):
+        self.namespace = namespace
+        self.max_local = max_local
+        self.expire = expire
+        self.cache = JOB_CACHE if cache is None else cache
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                return self._local[key]
+        value = self.cache.get((self.namespace, key))
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def __contains__(self, key):
+        # Asks the shared store: the local copy outlives an expired entry other processes need
+        return (self.namespace, key) in self.cache
+
+    def set(self, key, value):
+        self._remember(key, value)
+        self.cache.set((self.namespace, key), value, expire=self.expire)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+
+def report_progress(set_progress, step: int, total: int, label: str):
+    """Show `label` as stage step/total on a background callback's progress output."""
+    set_progress((f"Step {step}/{total} · {label}…",))
+
+
+# One section pool per process (ANALYSIS_SECTION_WORKERS threads), made on first use
+_section_pool = None
+_section_pool_pid = None
+_section_pool_lock = threading.Lock()
+
+
+def _get_section_pool() -> ThreadPoolExecutor:
+    global _section_pool, _section_pool_pid
+    with _section_pool_lock:
+        # A forked job process inherits the pool object but none of its threads: start its own
+        if _section_pool is None or _section_pool_pid != os.getpid():
+            _section_pool = ThreadPoolExecutor(max_workers=ANALYSIS_SECTION_WORKERS, thread_name_prefix="section")
+            _section_pool_pid = os.getpid()
+        return _section_pool
+
+
+def run_sections(tasks: dict) -> dict:
+    """
+    Run independent zero-argument callables side by side and return {name: result}.
+    They run on the process's section thread pool, so concurrent analyses share a fixed
+    number of threads and no process is forked. The numpy/pandas parts release the GIL;
+    plotly figure assembly does not. Inline with ANALYSIS_SECTION_WORKERS <= 1.
+    Sections must not call run_sections themselves (the pool could run out of threads).
+    """
+    if ANALYSIS_SECTION_WORKERS <= 1 or len(tasks) <= 1:
+        return {name: fn() for name, fn in tasks.items()}
+    pool = _get_section_pool()
+    futures = {name: pool.submit(fn) for name, fn in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+# In-flight single_flight calls of this process: key -> {"done": Event, "result" | "error"}
+_FLIGHTS = {}
+_flights_lock = threading.Lock()
+_MISSING = object()
+
+
+def single_flight(key, compute, on_wait=None):
+    """
+    compute() once for concurrent calls with the same key: callers arriving while it runs wait
+    for it and share its result (or its exception). `key` is a hashable of the dataset hash and
+    the normalized parameters; `on_wait` is called before a caller starts waiting.
+    Threads of one process share an in-flight table; with SINGLE_FLIGHT_FILE_LOCK, job processes
+    and gunicorn workers also serialize on a lock file and read the result from the job store.
+    """
+    with _flights_lock:
+        flight = _FLIGHTS.get(key)
+        leader = flight is None
+        if leader:
+            flight = _FLIGHTS[key] = {"done": threading.Event()}
+    if not leader:
+        if on_wait is not None:
+            on_wait()
+        flight["done"].wait()
+        if "error" in flight:
+            raise flight["error"]
+        return flight["result"]
+
+    try:
+        if SINGLE_FLIGHT_FILE_LOCK and fcntl is not None:
+            flight["result"] = _shared_flight(key, compute, on_wait)
+        else:
+            flight["result"] = compute()
+        return flight["result"]
+    except BaseException as exc:
+        flight["error"] = exc
+        raise
+    finally:
+        with _flights_lock:
+            _FLIGHTS.pop(key, None)
+        flight["done"].set()
+
+
+def _shared_flight(key, compute, on_wait):
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+    lock_dir = os.path.join(JOB_CACHE_DIR, "flights")
+    os.makedirs(lock_dir, exist_ok=True)
+    path = os.path.join(lock_dir, f"{digest}.lock")
+    waited = False
+    while True:
+        lock_file = open(path, "a")
+        # flock is dropped by the kernel if the holder dies (e.g. a cancelled job), so a waiter
+        # then finds no result and computes it itself
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if on_wait is not None and not waited:
+                on_wait()
+            waited = True
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # The holder before us may have removed the file: then wait on the current one
+            if os.stat(path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+    try:
+        result = JOB_CACHE.get(("flight", digest), default=_MISSING)
+        if result is _MISSING:
+            result = compute()
+            JOB_CACHE.set(("flight", digest), result, expire=SINGLE_FLIGHT_SHARE_SECONDS)
+        return result
+    finally:
+        # One lock file per key: removed while still held, so the directory does not fill up
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        lock_file.close()
@@ -1,16 +1,20 @@
 """
 Layout functions for the Index Data Analysis app.
 Contains navbar, home, single index, cross index, and documentation layouts.
+The layouts are static, so each is built once per process (app.py prebuilds them at boot).
 """
 
+from functools import lru_cache
+
 from dash import html, dcc
 from components import (
     PageContainer, Card, Field, RadioGroup, CheckboxGroup,
-    DateRangePicker, FileDropzone, Button, feature_card
+    DateRangePicker, FileDropzone, ChunkedUploader, Button, JobStatus, feature_card
 )
 from config import STORE_RAW, STORE_META, STORE_A, STORE_B, MONTH_OPTIONS
 
 
+@lru_cache(maxsize=None)
 def navbar():
     # Always dark theme
     bg_color = "#0a0a0a"
@@ -77,6 +81,7 @@ def navbar():
         }
     )
 
+@lru_cache(maxsize=None)
 def home_layout():
     return html.Div(
         [
@@ -187,6 +192,7 @@ def home_layout():
     )
 
 # ---------- Single Index (FULL) ----------
+@lru_cache(maxsize=None)
 def single_layout():
     return PageContainer([
         # Header
@@ -218,13 +224,32 @@ def single_layout():
             children=html.Div([
                 FileDropzone(
                     id="uploader",
-                    label="Upload CSV File"
+                    label="Upload Data File (CSV, Parquet, Feather)"
+                ),
+                ChunkedUploader(id="uploader-chunked"),
+                FileDropzone(
+                    id="uploader-append",
+                    label="Append New Rows (merged into the loaded dataset)"
                 ),
                 html.Div(id="file-msg", style={"marginBottom": "8px", "fontSize": "14px"}),
                 html.Div(id="warn-msg", style={"marginBottom": "8px", "fontSize": "14px"}),
             ])
         ),
 
+        # Batch upload (many files parsed in parallel; outside the Loading wrapper so polling doesn't flash it)
+        html.Div([
+            FileDropzone(
+                id="batch-uploader",
+                label="Batch Upload (drop many files at once)",
+                multiple=True
+            ),
+            dcc.Store(id="batch-id"),
+            dcc.Interval(id="batch-poll", interval=500, disabled=True),
+            html.Div(id="batch-progress", style={"marginBottom": "8px", "fontSize": "14px"}),
+            dcc.Dropdown(id="batch-dataset-select", options=[], placeholder="Analyze a dataset from the batch...",
+                         style={"marginBottom": "16px"}),
+        ]),
+
         # Analysis Types
         Card([
             html.Div([
@@ -527,7 +552,8 @@ def single_layout():
                     "textAlign": "right",
                     "width": "100%"
                 }, className="card-footer")
-            )
+            ),
+            JobStatus("analysis-job")
         ], style={
             "textAlign": "right",
             "width": "100%"
@@ -685,6 +711,7 @@ def single_layout():
                 "display":"flex", "alignItems":"center", "justifyContent":"space-between",
                 "flexWrap":"wrap", "gap":"20px", "marginBottom":"24px"
             }),
+            JobStatus("drawdown-job"),
             
             # Results container with loading spinner
             dcc.Loading(
@@ -717,6 +744,7 @@ def single_layout():
     ])
 
 # ---------- Cross Index ----------
+@lru_cache(maxsize=None)
 def cross_layout():
     return PageContainer([
         # Header
@@ -750,8 +778,9 @@ def cross_layout():
                         children=html.Div([
                         FileDropzone(
                             id="uploader-a",
-                            label="Upload Index A (CSV)"
+                            label="Upload Index A (CSV, Parquet, Feather)"
                         ),
+                        ChunkedUploader(id="uploader-a-chunked"),
                         html.Div(id="file-msg-a", style={"marginBottom": "8px", "fontSize": "14px"}),
                         html.Div(id="warn-msg-a", style={"marginBottom": "8px", "fontSize": "14px"}),
                         html.Div(id="preview-a")
@@ -766,8 +795,9 @@ def cross_layout():
                         children=html.Div([
                         FileDropzone(
                             id="uploader-b",
-                            label="Upload Index B (CSV)"
+                            label="Upload Index B (CSV, Parquet, Feather)"
                         ),
+                        ChunkedUploader(id="uploader-b-chunked"),
                         html.Div(id="file-msg-b", style={"marginBottom": "8px", "fontSize": "14px"}),
                         html.Div(id="warn-msg-b", style={"marginBottom": "8px", "fontSize": "14px"}),
                         html.Div(id="preview-b")
@@ -863,7 +893,8 @@ def cross_layout():
                     "textAlign": "right",
                     "width": "100%"
                 }, className="card-footer")
-            )
+            ),
+            JobStatus("cross-job")
         ], style={
             "textAlign": "right",
             "width": "100%"
@@ -894,6 +925,7 @@ def cross_layout():
     ])
 
 # ---------- Documentation Page ----------
+@lru_cache(maxsize=None)
 def docs_layout():
     return PageContainer([
         # Header
@@ -973,7 +1005,10 @@ def docs_layout():
                     html.Li("Column headers can have any name - the app automatically detects which is the date and which is numeric"),
                     html.Li("The app handles common date formats automatically (YYYY-MM-DD, MM/DD/YYYY, etc.)"),
                     html.Li("Rows with missing or invalid data will be automatically removed"),
+                    html.Li("Parquet, Feather and Arrow IPC files are accepted too; columns stored as dates/numbers are used directly"),
+                    html.Li("Compressed CSVs (.csv.gz, .csv.bz2, .csv.xz or a .zip) can be uploaded as-is - smaller files upload faster"),
                     html.Li("Data will be automatically sorted by date"),
+                    html.Li("To add new days, use Append New Rows with a file holding just the latest rows - they replace the loaded data from their first date on, and only the affected tail is recomputed"),
                 ], style={"fontSize":"14px", "lineHeight":"1.8", "color":"rgba(255,255,255,0.8)", "marginLeft":"20px"})
             ], style={"marginTop":"20px", "padding":"16px", "background":"rgba(0,200,150,0.08)", "borderRadius":"8px", "border":"1px solid rgba(0,200,150,0.3)"})
         ], style={"marginBottom":"32px"}),
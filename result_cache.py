@@ -0,0 +1,54 @@
+"""
+Persistent result cache.
+Computed columns (returns, sorted returns, indicators, drawdown episodes) and finished analyses
+(the figures and tables a callback returns) are kept in a size-bounded diskcache (SQLite) store
+in RESULT_CACHE_DIR, so worker recycling and deploys do not send the next users back to a cold
+start. Keys are the dataset content hash plus the parameters, prefixed with CODE_VERSION.
+"""
+
+import glob
+import hashlib
+from importlib import metadata
+import os
+
+import diskcache
+
+from config import RESULT_CACHE_DIR, RESULT_CACHE_SIZE_MB, RESULT_CACHE_SALT, PLOT_MAX_POINTS
+
+_MISSING = object()
+
+
+def _code_version() -> str:
+    """Hash of this app's source, the libraries that shape results, and the plot point limit."""
+    h = hashlib.blake2b(digest_size=8)
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    # Installed versions from package metadata: importing the libraries here would slow boot
+    for package in ("numpy", "pandas", "plotly", "dash"):
+        h.update(f"{package}=={metadata.version(package)};".encode())
+    h.update(str(PLOT_MAX_POINTS).encode())
+    return h.hexdigest()
+
+
+CODE_VERSION = RESULT_CACHE_SALT or _code_version()
+RESULT_CACHE = diskcache.Cache(RESULT_CACHE_DIR, size_limit=RESULT_CACHE_SIZE_MB * 1024 * 1024,
+                               eviction_policy="least-recently-used")
+
+
+def result_key(*parts) -> tuple:
+    """Cache key for parts (content hash first, then parameters), salted with CODE_VERSION."""
+    return (CODE_VERSION,) + parts
+
+
+def cached_result(key: tuple, compute, valid=None):
+    """
+    compute() memoized under result_key(*key). `valid(result)` can reject a stored result,
+    e.g. one whose server-side table/zoom data was evicted; it is then computed again.
+    """
+    stored = RESULT_CACHE.get(result_key(*key), default=_MISSING)
+    if stored is not _MISSING and (valid is None or valid(stored)):
+        return stored
+    result = compute()
+    RESULT_CACHE.set(result_key(*key), result)
+    return result
@@ -0,0 +1,82 @@
+"""
+Cold-start helpers.
+numpy, pandas and plotly account for most of a worker's import time but are only needed once a
+callback computes something, so the app modules bind them with lazy_import. warm_up() loads them
+in a background thread right after boot, and the startup report says where boot time went.
+"""
+
+import importlib
+import sys
+import threading
+import time
+import types
+
+from config import STARTUP_REPORT
+
+# Libraries the app binds lazily, in the order warm_up loads them
+HEAVY_MODULES = ("numpy", "pandas", "plotly.graph_objects", "plotly.subplots")
+
+_started = time.perf_counter()
+_last_mark = _started
+_phases = []
+_warm_thread = None
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access, then mirrors it."""
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # Copy the real namespace so later lookups no longer go through __getattr__
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str):
+    """Module `name` if already imported, else a stand-in that imports it when first used."""
+    return sys.modules.get(name) or _LazyModule(name)
+
+
+def mark(phase: str):
+    """Record the time since the previous mark (or since startup was imported) as `phase`."""
+    global _last_mark
+    now = time.perf_counter()
+    _phases.append((phase, now - _last_mark))
+    _last_mark = now
+
+
+def _report(line: str):
+    if STARTUP_REPORT:
+        print(f"[startup] {line}", file=sys.stderr, flush=True)
+
+
+def startup_report():
+    """Print the boot phases recorded with mark (STARTUP_REPORT)."""
+    phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in _phases)
+    _report(f"ready in {(_last_mark - _started) * 1000:.0f}ms ({phases})")
+
+
+def _load_heavy_modules():
+    timings = []
+    for name in HEAVY_MODULES:
+        t0 = time.perf_counter()
+        importlib.import_module(name)
+        timings.append(f"{name} {(time.perf_counter() - t0) * 1000:.0f}ms")
+    _report("warm-up imported " + ", ".join(timings))
+
+
+def warm_up():
+    """Import HEAVY_MODULES in a background thread, so the first analysis does not pay for them."""
+    global _warm_thread
+    if _warm_thread is None:
+        _warm_thread = threading.Thread(target=_load_heavy_modules, name="warm-up", daemon=True)
+        _warm_thread.start()
+
+
+def wait_for_warm_up():
+    """
+    Block until warm_up has finished. Called before a background job is forked (jobs._JobManager):
+    a child forked while another thread holds an import lock can deadlock on import.
+    """
+    if _warm_thread is not None:
+        _warm_thread.join()
@@ -0,0 +1,270 @@
+"""
+Reference implementations the kernels in utils.py replaced, kept as they were before the
+rewrites (row loops, quadratic scans, whole-file parsing) so tests can compare against them.
+"""
+
+import base64
+import io
+
+import numpy as np
+import pandas as pd
+
+
+def end_trade_day_with_buffer(start, window_size_days, buffer_minus=1, buffer_plus=1):
+    if pd.isna(start):
+        return pd.NaT
+    start = (start if isinstance(start, pd.Timestamp) else pd.Timestamp(start)).normalize()
+    tentative = start + pd.Timedelta(days=max(int(window_size_days) - 1, 0))
+    weekday = tentative.weekday()
+    if weekday == 5:
+        return tentative - pd.Timedelta(days=buffer_minus)
+    elif weekday == 6:
+        return tentative + pd.Timedelta(days=buffer_plus)
+    return tentative
+
+
+def _normalized_days(df):
+    df = df.copy()
+    df["datetime"] = pd.to_datetime(df["datetime"]).dt.normalize()
+    # Stable, like the kernels: the original quicksort left rows with equal keys in arbitrary order
+    return df.dropna(subset=["datetime", "index"]).sort_values("datetime", kind="stable").reset_index(drop=True)
+
+
+def _last_pos_leq(dates):
+    """pos_leq_day of the original: last row whose day is <= target_day (binary search), or None."""
+    date_to_lastpos = {}
+    for pos, day in enumerate(dates):
+        date_to_lastpos[day] = pos
+    unique_days = dates.drop_duplicates().reset_index(drop=True)
+
+    def pos_leq_day(target_day):
+        left, right = 0, len(unique_days) - 1
+        ans = -1
+        while left <= right:
+            mid = (left + right) // 2
+            if unique_days[mid] <= target_day:
+                ans = mid
+                left = mid + 1
+            else:
+                right = mid - 1
+        if ans == -1:
+            return None
+        return date_to_lastpos[unique_days[ans]]
+
+    return pos_leq_day
+
+
+def compute_windowed_returns_calendar(df, window_size_days):
+    if df.empty:
+        return pd.Series(dtype=float)
+    df = _normalized_days(df)
+    ws = max(int(window_size_days or 1), 1)
+    vals = pd.to_numeric(df["index"], errors="coerce")
+    if ws == 1:
+        return pd.Series(vals.pct_change(1).values, index=df.index, name="ret_1d_cal")
+
+    dates = df["datetime"]
+    pos_leq_day = _last_pos_leq(dates)
+    rets = np.full(len(df), np.nan, dtype=float)
+    vals_arr = vals.values
+    for i in range(len(df)):
+        j = pos_leq_day(end_trade_day_with_buffer(dates.iloc[i], ws))
+        if j is None or j <= i:
+            continue
+        if np.isfinite(vals_arr[i]) and np.isfinite(vals_arr[j]) and vals_arr[i] != 0:
+            rets[i] = (vals_arr[j] / vals_arr[i]) - 1.0
+    return pd.Series(rets, index=df.index, name=f"ret_{ws}d_cal")
+
+
+def build_indicators(df, price_col="index"):
+    out = pd.DataFrame(index=df.index)
+    p = pd.to_numeric(df[price_col], errors="coerce").astype(float)
+
+    out["ret_1"] = p.pct_change(1)
+    out["ret_5"] = compute_windowed_returns_calendar(df[["datetime", "index"]].copy(), 5)
+    out["ret_10"] = compute_windowed_returns_calendar(df[["datetime", "index"]].copy(), 10)
+    out["mom_10"] = out["ret_10"]
+    out["vol_20"] = out["ret_1"].rolling(20).std()
+    out["vol_60"] = out["ret_1"].rolling(60).std()
+
+    out["sma_5"] = p.rolling(5).mean()
+    out["sma_20"] = p.rolling(20).mean()
+    out["ema_12"] = p.ewm(span=12, adjust=False).mean()
+    out["ema_26"] = p.ewm(span=26, adjust=False).mean()
+
+    macd_line = out["ema_12"] - out["ema_26"]
+    macd_sig = macd_line.ewm(span=9, adjust=False).mean()
+    out["macd"] = macd_line
+    out["macd_sig"] = macd_sig
+    out["macd_hist"] = macd_line - macd_sig
+
+    delta = p.diff()
+    up = (delta.clip(lower=0)).rolling(14).mean()
+    down = (-delta.clip(upper=0)).rolling(14).mean()
+    out["rsi_14"] = 100 - (100 / (1 + up / (down.replace(0, np.nan))))
+
+    mid = p.rolling(20).mean()
+    std = p.rolling(20).std()
+    up, lo = mid + 2.0 * std, mid - 2.0 * std
+    out["bb_mid"] = mid
+    out["bb_up"] = up
+    out["bb_lo"] = lo
+    out["bb_width"] = (up - lo) / mid
+    out["bb_pos"] = (p - mid) / (up - lo)
+
+    drawdown = p / p.cummax() - 1.0
+    out["dd"] = drawdown
+    out["dd_20"] = (p / p.rolling(20).max() - 1.0)
+    out["dd_speed"] = drawdown.diff()
+
+    out["sma_gap_5_20"] = out["sma_5"] / out["sma_20"] - 1.0
+    out["ema_gap_12_26"] = out["ema_12"] / out["ema_26"] - 1.0
+    return out
+
+
+def drop_event_analysis(df, minimum_per_drop, windows_size):
+    ret = compute_windowed_returns_calendar(df, windows_size).dropna()
+    total_events = int((ret <= -minimum_per_drop).sum())
+    prob = total_events / max(len(ret), 1)
+    key = f"{windows_size} days and {minimum_per_drop * 100:.0f}% minimum percentage drop"
+    return {key: {"events": total_events, "probability": f"{prob:.2%}"}}
+
+
+def gain_event_analysis(df, minimum_per_gain, windows_size):
+    ret = compute_windowed_returns_calendar(df, windows_size).dropna()
+    total_events = int((ret >= minimum_per_gain).sum())
+    prob = total_events / max(len(ret), 1)
+    key = f"{windows_size} days and {minimum_per_gain * 100:.0f}% minimum percentage gain"
+    return {key: {"events": total_events, "probability": f"{prob:.2%}"}}
+
+
+def trade_windows(df, window_size_days):
+    """Rows of the original build_trade_window_table (as Timestamps, without the row limit)."""
+    df = _normalized_days(df)
+    dates = df["datetime"]
+    pos_leq_day = _last_pos_leq(dates)
+    ws = max(int(window_size_days or 1), 1)
+    rows = []
+    for i in range(len(df)):
+        start_day = dates.iloc[i]
+        last_trade_day = end_trade_day_with_buffer(start_day, ws)
+        j = pos_leq_day(last_trade_day)
+        actual_end = dates.iloc[j] if (j is not None and j > i) else pd.NaT
+        rows.append({"start": start_day, "last_trade_day": last_trade_day, "actual_end": actual_end})
+    return pd.DataFrame(rows, columns=["start", "last_trade_day", "actual_end"])
+
+
+def compute_drawdown_recovery(df, date_col="datetime", price_col="index"):
+    data = df[[date_col, price_col]].copy()
+    data[date_col] = pd.to_datetime(data[date_col], errors="coerce")
+    data = data.dropna(subset=[date_col, price_col])
+    data[price_col] = pd.to_numeric(data[price_col], errors="coerce")
+    data = data.dropna(subset=[price_col])
+    # Stable, like the kernel: the original quicksort left rows with equal keys in arbitrary order
+    data = data.sort_values(date_col, kind="stable").reset_index(drop=True)
+    if data.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    data["cum_max"] = data[price_col].cummax()
+    data["drawdown"] = data[price_col] - data["cum_max"]
+    data["drawdown_pct"] = data["drawdown"] / data["cum_max"]
+
+    dates = data[date_col].to_list()
+    prices = data[price_col].to_list()
+    n = len(data)
+    episodes = []
+    i = 0
+    while i < n and (i == 0 or prices[i] < data.loc[i, "cum_max"]):
+        if i == 0 and prices[i] == max(prices[: i + 1]):
+            break
+        i += 1
+
+    while i < n:
+        peak_idx = i
+        peak_val = prices[peak_idx]
+        j = peak_idx + 1
+        trough_idx = peak_idx
+        trough_val = peak_val
+        while j < n and prices[j] < peak_val:
+            if prices[j] < trough_val:
+                trough_val = prices[j]
+                trough_idx = j
+            j += 1
+
+        episode = {
+            "peak_date": dates[peak_idx],
+            "peak_value": float(peak_val),
+            "trough_date": dates[trough_idx],
+            "trough_value": float(trough_val),
+            "recovery_date": pd.NaT,
+            "recovery_value": pd.NA,
+            "drawdown_pct": float((trough_val - peak_val) / peak_val),
+            "days_to_trough": int(trough_idx - peak_idx),
+            "days_to_recovery": pd.NA,
+        }
+        if j < n and prices[j] >= peak_val:
+            episode.update(recovery_date=dates[j], recovery_value=float(prices[j]),
+                           days_to_recovery=int(j - peak_idx))
+            episodes.append(episode)
+            i = j + 1
+            while i < n and prices[i] < max(prices[: i + 1]):
+                i += 1
+        else:
+            episodes.append(episode)
+            break
+
+    return pd.DataFrame(episodes), data.copy()
+
+
+def parse_csv_flexible(contents, filename):
+    """The original whole-file parser (infer_datetime_format dropped: pandas 2 always infers)."""
+    _, content_string = contents.split(",")
+    df0 = pd.read_csv(io.BytesIO(base64.b64decode(content_string)))
+
+    date_col = None
+    for c in df0.columns:
+        if pd.to_datetime(df0[c], errors="coerce").notna().mean() >= 0.5:
+            date_col = c
+            break
+    num_col = None
+    for c in df0.columns:
+        if c != date_col and pd.to_numeric(df0[c], errors="coerce").notna().mean() >= 0.5:
+            num_col = c
+            break
+
+    df = pd.DataFrame({
+        "datetime": pd.to_datetime(df0[date_col], errors="coerce"),
+        "index": pd.to_numeric(df0[num_col], errors="coerce"),
+    })
+    before = len(df)
+    # Stable, like the streaming parser: the original quicksort left rows with equal keys in arbitrary order
+    df = df.dropna(subset=["datetime", "index"]).sort_values("datetime", kind="stable").reset_index(drop=True)
+    warnings = [f"Dropped {before - len(df)} rows with invalid/missing values."] if len(df) < before else []
+    return df, warnings, None
+
+
+def lttb_indices(x, y, n_out):
+    """Textbook Largest-Triangle-Three-Buckets (Steinarsson), one bucket at a time."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    out = [0]
+    a = 0
+    for i in range(n_out - 2):
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = np.mean(x[avg_start:avg_end])
+        avg_y = np.mean(y[avg_start:avg_end])
+
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) * 0.5
+            if area > best_area:
+                best, best_area = j, area
+        out.append(best)
+        a = best
+    out.append(n - 1)
+    return np.array(out)
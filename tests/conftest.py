@@ -0,0 +1,50 @@
+"""
+Test setup. The stores the app writes to (job store, result cache, dataset files, partial
+uploads) go to a temporary directory, set before any app module reads config, and the boot
+report is off.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="index-data-tests-")
+for _name in ("JOB_CACHE_DIR", "RESULT_CACHE_DIR", "DATASET_DIR", "UPLOAD_TMP_DIR"):
+    os.environ[_name] = os.path.join(_TMP, _name.lower())
+os.environ["STARTUP_REPORT"] = "0"
+atexit.register(shutil.rmtree, _TMP, ignore_errors=True)
+
+SERIES_KINDS = ["daily", "calendar", "duplicate_days", "intraday"]
+
+
+def make_series(kind: str, seed: int = 0) -> pd.DataFrame:
+    """
+    Sorted ['datetime','index'] random walk:
+    daily (business days), calendar (weekends included), duplicate_days (1-3 rows with
+    the same timestamp per day) or intraday (hourly bars, several per day).
+    """
+    rng = np.random.default_rng(seed)
+    if kind == "daily":
+        stamps = pd.bdate_range("2015-01-01", periods=1000)
+    elif kind == "calendar":
+        stamps = pd.date_range("2015-01-01", periods=1000, freq="D")
+    elif kind == "duplicate_days":
+        days = pd.bdate_range("2015-01-01", periods=500)
+        stamps = days.repeat(rng.integers(1, 4, len(days)))
+    elif kind == "intraday":
+        days = pd.bdate_range("2015-01-01", periods=120)
+        stamps = pd.DatetimeIndex((days.values[:, None] + np.arange(9, 17) * np.timedelta64(1, "h")).ravel())
+    else:
+        raise ValueError(kind)
+    prices = 1000.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, len(stamps))))
+    return pd.DataFrame({"datetime": stamps.values.astype("datetime64[ns]"), "index": prices})
+
+
+@pytest.fixture(params=SERIES_KINDS)
+def series(request) -> pd.DataFrame:
+    return make_series(request.param)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.conftest import make_series, SERIES_KINDS
+from datasets import register_dataset, append_dataset, get_dataset, dataset_meta
+from utils import (
+    compute_windowed_returns_matrix, build_indicators, drawdown_episodes, compute_drawdown_recovery,
+    extend_windowed_returns, extend_indicators, extend_drawdown_episodes,
+    cached_windowed_returns, cached_indicators, cached_drawdown_recovery,
+    INDICATOR_COLUMNS, mark_normalized,
+)
+
+WINDOWS = [1, 5, 10, 21]
+
+
+def _appended(kind, corrected_rows=3, new_rows=40):
+    """(parent, child, changed_at): child repeats parent's last rows with corrected prices and adds new ones."""
+    full = make_series(kind, seed=7)
+    m = len(full) - new_rows
+    changed_at = full["datetime"].iloc[m - corrected_rows]
+    kept = int(np.searchsorted(full["datetime"].to_numpy(), changed_at.to_datetime64(), side="left"))
+    parent = full.iloc[:m].copy()
+    parent.loc[parent.index[kept:], "index"] *= 1.02
+    return mark_normalized(parent.reset_index(drop=True)), mark_normalized(full), changed_at
+
+
+@pytest.mark.parametrize("kind", SERIES_KINDS)
+def test_extended_returns_match_full_recompute(kind):
+    parent, child, changed_at = _appended(kind)
+    got = extend_windowed_returns(child, WINDOWS, compute_windowed_returns_matrix(parent, WINDOWS), changed_at)
+    np.testing.assert_array_equal(got, compute_windowed_returns_matrix(child, WINDOWS))
+
+
+@pytest.mark.parametrize("kind", SERIES_KINDS)
+def test_extended_indicators_match_full_recompute(kind):
+    parent, child, changed_at = _appended(kind)
+    prev_frame = build_indicators(parent)
+    prev = {c: prev_frame[c].to_numpy() for c in INDICATOR_COLUMNS}
+    got = extend_indicators(child, prev, changed_at, INDICATOR_COLUMNS)
+    # Rolling windows restarted further along the series differ in the last bits
+    pd.testing.assert_frame_equal(got, build_indicators(child), check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("kind", SERIES_KINDS)
+def test_extended_drawdown_episodes_match_full_recompute(kind):
+    parent, child, changed_at = _appended(kind)
+    prev_prices = parent["index"].to_numpy()
+    prev_cum_max = np.maximum.accumulate(prev_prices)
+    k = int(np.searchsorted(child["datetime"].to_numpy(), changed_at.to_datetime64(), side="left"))
+    prices = child["index"].to_numpy()
+    cum_max, episodes = extend_drawdown_episodes(prices, prev_cum_max, drawdown_episodes(prev_prices, prev_cum_max), k)
+    np.testing.assert_array_equal(cum_max, np.maximum.accumulate(prices))
+    for got, expected in zip(episodes, drawdown_episodes(prices, np.maximum.accumulate(prices))):
+        np.testing.assert_array_equal(got, expected)
+
+
+@pytest.mark.parametrize("kind", ["daily", "intraday"])
+def test_cached_kernels_reuse_the_parent_after_append_dataset(kind):
+    full = make_series(kind, seed=8)
+    parent_key = register_dataset(full.iloc[:-30].reset_index(drop=True), filename="parent.csv")
+    parent = get_dataset(parent_key)
+    cached_windowed_returns(parent, WINDOWS, fingerprint=parent_key)
+    cached_indicators(parent, fingerprint=parent_key)
+    cached_drawdown_recovery(parent, fingerprint=parent_key)
+
+    child_key, kept = append_dataset(parent_key, full.iloc[-35:].reset_index(drop=True), filename="append.csv")
+    assert kept == len(full) - 35
+    child = get_dataset(child_key)
+    base = dataset_meta(child_key)["append_base"]
+    assert base["parent"] == parent_key
+
+    np.testing.assert_array_equal(cached_windowed_returns(child, WINDOWS, fingerprint=child_key, base=base),
+                                  compute_windowed_returns_matrix(full, WINDOWS))
+    pd.testing.assert_frame_equal(cached_indicators(child, fingerprint=child_key, base=base), build_indicators(full),
+                                  check_exact=False, rtol=1e-9)
+    events, _ = cached_drawdown_recovery(child, fingerprint=child_key, base=base)
+    pd.testing.assert_frame_equal(events.astype(object), compute_drawdown_recovery(full)[0].astype(object))
@@ -0,0 +1,35 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+from batch_upload import submit_batch, batch_status
+from datasets import get_dataset
+from tests.conftest import make_series
+
+
+def test_batch_status_follows_the_files():
+    df = make_series("daily")
+    csv = df.rename(columns={"datetime": "Date", "index": "Close"}).to_csv(index=False).encode()
+    contents = ["data:text/csv;base64," + base64.b64encode(csv).decode(),
+                "data:text/csv;base64," + base64.b64encode(b"only one column\n1\n").decode()]
+    batch_id = submit_batch(contents, ["good.csv", "bad.csv"])
+
+    deadline = time.monotonic() + 60
+    while any(f["state"] == "pending" for f in batch_status(batch_id)):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+    good, bad = batch_status(batch_id)
+    assert good["state"] == "done" and good["rows"] == len(df)
+    assert len(get_dataset(good["dataset_key"])) == len(df)
+    assert bad["state"] == "error" and "two columns" in bad["error"]
+    assert batch_status(uuid.uuid4().hex) is None
+
+    # Another gunicorn worker polling the same batch reads it from the job store
+    code = f"import json, batch_upload; print(json.dumps(batch_upload.batch_status({batch_id!r})))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout) == batch_status(batch_id)
@@ -0,0 +1,31 @@
+import json
+
+from benchmarks.__main__ import main
+from benchmarks.kernels import KERNELS
+from benchmarks.runner import compare_reports, run_suite
+
+
+def _report(seconds):
+    return {"results": [{"kernel": "compute_drawdown_recovery", "rows": 1000, "window": None, "seconds_min": seconds}]}
+
+
+def test_compare_reports_flags_only_slowdowns_beyond_tolerance():
+    assert compare_reports(_report(1.2), _report(1.0), tolerance=0.25) == []
+    (regression,) = compare_reports(_report(1.3), _report(1.0), tolerance=0.25)
+    assert regression["baseline_seconds_min"] == 1.0 and round(regression["ratio"], 6) == 1.3
+    assert compare_reports(_report(5.0), {"results": []}) == []
+
+
+def test_suite_runs_every_kernel_and_compares_to_a_stored_report(tmp_path):
+    report = run_suite([300], [5], repeat=1, log=lambda line: None)
+    assert {e["kernel"] for e in report["results"]} == set(KERNELS)
+    assert all(e["seconds_min"] >= 0 and e["peak_mb"] >= 0 for e in report["results"])
+
+    path = tmp_path / "report.json"
+    assert main(["--sizes", "300", "--windows", "5", "--kernels", "compute_drawdown_recovery", "--repeat", "1",
+                 "--output", str(path)]) == 0
+    slow = json.loads(path.read_text())
+    for entry in slow["results"]:
+        entry["seconds_min"] *= 1000
+    path.write_text(json.dumps(slow))
+    assert main(["--sizes", "300", "--kernels", "compute_drawdown_recovery", "--repeat", "1", "--baseline", str(path)]) == 0
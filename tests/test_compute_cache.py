@@ -0,0 +1,89 @@
+import time
+
+import diskcache
+import numpy as np
+import pandas as pd
+import pytest
+
+from result_cache import result_key
+from tests.conftest import make_series
+from utils import (COMPUTE_CACHE, ComputationCache, build_indicators, cached_indicators,
+                   cached_sorted_returns, cached_windowed_returns, compute_windowed_returns_matrix,
+                   sorted_returns)
+
+
+def test_computation_cache_evicts_least_recently_used():
+    cache = ComputationCache(3 * 800)
+    for name in "abc":
+        cache.put((name,), np.zeros(100))
+    cache.get(("a",))
+    cache.put(("d",), np.zeros(100))
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None
+    assert not cache.get(("a",)).flags.writeable
+    assert cache.stats()["bytes"] == 3 * 800
+
+
+@pytest.fixture
+def shared(tmp_path):
+    with diskcache.Cache(str(tmp_path / "shared")) as cache:
+        yield cache
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_computation_cache_persists_only_when_asked(shared):
+    cache = ComputationCache(1 << 20, shared=shared, persist_min_seconds=0.02, persist_min_bytes=1024)
+    cache.put(("cheap",), np.zeros(10))
+    cache.put(("costly",), np.ones(1000), persist=True)
+    _wait_for(lambda: result_key("compute", "costly") in shared)
+    assert result_key("compute", "cheap") not in shared
+
+    assert not cache.worth_persisting(0.5, 100)
+    assert not cache.worth_persisting(0.001, 1 << 20)
+    assert cache.worth_persisting(0.5, 1 << 20)
+
+    # Another process (a fresh cache over the same store) reads the persisted entry
+    other = ComputationCache(1 << 20, shared=shared)
+    np.testing.assert_array_equal(other.get(("costly",)), np.ones(1000))
+    assert other.get(("cheap",)) is None
+
+
+def test_cached_returns_match_the_kernels_and_compute_only_missing_windows(series):
+    fingerprint = f"returns-{len(series)}-{series['datetime'].iloc[-1]:%Y%m%d%H}"
+    first = cached_windowed_returns(series, [5, 21], fingerprint)
+    misses = COMPUTE_CACHE.stats()["misses"]
+    both = cached_windowed_returns(series, [21, 7, 5], fingerprint)
+    assert COMPUTE_CACHE.stats()["misses"] == misses + 1
+    np.testing.assert_array_equal(both, compute_windowed_returns_matrix(series, [21, 7, 5]))
+    np.testing.assert_array_equal(both[:, [2, 0]], first)
+
+    ordered = cached_sorted_returns(first[:, 0], 5, fingerprint)
+    assert cached_sorted_returns(first[:, 0], 5, fingerprint) is ordered
+    np.testing.assert_array_equal(ordered, sorted_returns(first[:, 0]))
+
+
+def test_cached_indicators_match_build_indicators(series):
+    fingerprint = f"indicators-{len(series)}-{series['datetime'].iloc[-1]:%Y%m%d%H}"
+    cached_indicators(series, ["rsi_14"], fingerprint)
+    out = cached_indicators(series, ["rsi_14", "macd_hist", "bb_pos"], fingerprint)
+    pd.testing.assert_frame_equal(out, build_indicators(series, columns=["rsi_14", "macd_hist", "bb_pos"]))
+
+
+def test_small_returns_are_persisted_for_the_next_job(monkeypatch, shared):
+    # Tiny arrays, computed in no time: still written, since the next job process starts cold
+    cache = ComputationCache(1 << 20, shared=shared, persist_min_seconds=10.0, persist_min_bytes=1 << 30)
+    monkeypatch.setattr("utils.COMPUTE_CACHE", cache)
+    series = make_series("daily").iloc[:50]
+    returns = cached_windowed_returns(series, [5], "small-returns")
+    ordered = cached_sorted_returns(returns[:, 0], 5, "small-returns")
+    _wait_for(lambda: result_key("compute", "sorted_returns", "small-returns", None, 5) in shared)
+
+    next_job = ComputationCache(1 << 20, shared=shared)
+    np.testing.assert_array_equal(next_job.get(("returns", "small-returns", None, 5)), returns[:, 0])
+    np.testing.assert_array_equal(next_job.get(("sorted_returns", "small-returns", None, 5)), ordered)
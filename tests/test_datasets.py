@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+import pytest
+
+from datasets import DatasetRegistry, upload_fingerprint, write_series_file, open_series_file, dataset_fingerprint
+from tests.conftest import make_series
+from utils import compute_windowed_returns_matrix, windowed_returns_from_arrays, is_normalized
+
+
+def test_register_returns_a_content_key_for_read_only_columns():
+    registry = DatasetRegistry(1 << 30, 3600)
+    df = make_series("intraday")
+    key = registry.register(df, filename="prices.csv")
+    assert registry.register(df.copy()) == key
+    stored = registry.get(key)
+    assert is_normalized(stored)
+    np.testing.assert_array_equal(stored["index"].to_numpy(), df["index"].to_numpy())
+    with pytest.raises(ValueError):
+        stored["index"].to_numpy()[0] = 1.0
+    assert registry.meta(key)["filename"] == "prices.csv"
+    assert registry.get("unknown") is None and registry.meta("unknown") == {}
+
+
+def test_least_recently_used_datasets_are_evicted_over_budget():
+    registry = DatasetRegistry(2 * 16 * 1000, 3600)
+    first, second = (registry.register(make_series("daily", seed=s)) for s in range(2))
+    registry.get(first)
+    third = registry.register(make_series("daily", seed=2))
+    assert registry.get(second) is None
+    assert registry.get(first) is not None and registry.get(third) is not None
+
+
+def test_idle_datasets_expire():
+    registry = DatasetRegistry(1 << 30, 0.05)
+    key = registry.register(make_series("daily"))
+    time.sleep(0.1)
+    assert registry.get(key) is None
+
+
+def test_uploads_are_found_by_content_hash_until_evicted():
+    contents = "data:text/csv;base64," + "QQ==" * 1000
+    assert upload_fingerprint(contents, "a.csv") == upload_fingerprint(contents, "b.CSV")
+    assert upload_fingerprint(contents, "a.csv") != upload_fingerprint(contents, "a.csv.gz")
+
+    registry = DatasetRegistry(16 * 1000, 3600)
+    key = registry.register(make_series("daily"), upload_hash="abc123")
+    assert registry.find_upload("abc123") == key
+    registry.register(make_series("daily", seed=1))
+    assert registry.find_upload("abc123") is None
+
+
+def test_unreferenced_datasets_are_evicted_first():
+    registry = DatasetRegistry(2 * 16 * 1000, 3600)
+    keys = [registry.register(make_series("daily", seed=s)) for s in range(2)]
+    registry.acquire(keys[0])
+    newest = registry.register(make_series("daily", seed=2))
+    assert registry.get(keys[0]) is not None
+    assert registry.get(keys[1]) is None
+    assert registry.get(newest) is not None
+
+    registry.release(keys[0])
+    registry.register(make_series("daily", seed=3))
+    assert registry.get(keys[0]) is None
+
+
+def test_series_file_round_trip(tmp_path):
+    df = make_series("intraday")
+    datetimes, values = df["datetime"].to_numpy(), df["index"].to_numpy()
+    write_series_file(str(tmp_path / "s.series"), datetimes, values)
+    mapped_dt, mapped_values = open_series_file(str(tmp_path / "s.series"))
+    np.testing.assert_array_equal(mapped_dt, datetimes)
+    np.testing.assert_array_equal(mapped_values, values)
+    assert dataset_fingerprint(mapped_dt, mapped_values) == dataset_fingerprint(datetimes, values)
+
+
+def test_returns_from_mapped_arrays_match_the_frame_kernel(tmp_path):
+    df = make_series("calendar")
+    write_series_file(str(tmp_path / "s.series"), df["datetime"].to_numpy(), df["index"].to_numpy())
+    np.testing.assert_array_equal(windowed_returns_from_arrays(*open_series_file(str(tmp_path / "s.series")), [1, 5, 21]),
+                                  compute_windowed_returns_matrix(df, [1, 5, 21]))
+
+
+def test_workers_share_datasets_and_the_upload_index(tmp_path):
+    # Two registries over one directory stand in for two gunicorn workers
+    first = DatasetRegistry(1 << 30, 3600, str(tmp_path))
+    second = DatasetRegistry(1 << 30, 3600, str(tmp_path))
+    df = make_series("daily")
+    key = first.register(df, upload_hash="abc123", filename="prices.csv")
+
+    assert second.find_upload("abc123") == key
+    shared = second.get(key)
+    assert is_normalized(shared)
+    np.testing.assert_array_equal(shared["index"].to_numpy(), df["index"].to_numpy())
+    assert second.meta(key)["filename"] == "prices.csv"
+    assert second.find_upload("unknown") is None
+    assert second.get("0" * 32) is None
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from tests import baseline
+from utils import lttb_indices, downsample_xy, downsampled_graph, zoom_downsampled_traces, stored_views_available
+
+
+@pytest.mark.parametrize("n, n_out", [(10, 3), (1000, 100), (5003, 2000), (20000, 777)])
+def test_lttb_matches_reference(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.uniform(0.5, 1.5, n))
+    y = np.cumsum(rng.normal(size=n))
+    np.testing.assert_array_equal(lttb_indices(x, y, n_out), baseline.lttb_indices(x, y, n_out))
+
+
+def test_lttb_keeps_everything_when_small():
+    x = np.arange(5.0)
+    np.testing.assert_array_equal(lttb_indices(x, x, 5), np.arange(5))
+    np.testing.assert_array_equal(lttb_indices(x, x, 2), np.arange(5))
+
+
+def test_downsample_datetimes_drops_non_finite():
+    x = pd.date_range("2020-01-01", periods=5000, freq="h").values
+    y = np.sin(np.arange(5000) / 50.0)
+    y[::100] = np.nan
+    xs, ys = downsample_xy(x, y, 500)
+    assert len(xs) == 500 and np.isfinite(ys).all()
+    assert xs[0] == x[1] and xs[-1] == x[-1]
+    assert np.all(np.diff(xs.astype("int64")) > 0)
+
+
+def _figure(n):
+    x = pd.date_range("2020-01-01", periods=n, freq="D")
+    return go.Figure([go.Scatter(x=x, y=np.arange(n, dtype=float), mode="lines")])
+
+
+def test_small_figure_gets_a_plain_graph():
+    graph = downsampled_graph(_figure(100), max_points=500)
+    assert getattr(graph, "id", None) is None
+    assert stored_views_available(graph)
+
+
+def test_large_figure_is_reduced_and_zoomable():
+    graph = downsampled_graph(_figure(3000), max_points=500)
+    assert graph.id["type"] == "downsampled-graph"
+    assert len(graph.figure.data[0].x) == 500
+    assert stored_views_available([graph])
+
+    updates = zoom_downsampled_traces(graph.id["key"], {"xaxis.range[0]": "2021-01-01", "xaxis.range[1]": "2021-03-01"})
+    x, y = updates[0]
+    # Zoomed in past max_points: the visible window at full resolution, one point beyond each edge
+    assert len(x) == 62
+    np.testing.assert_array_equal(np.diff(y), np.ones(61))
+    assert len(zoom_downsampled_traces(graph.id["key"], {"xaxis.autorange": True})[0][0]) == 500
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests import baseline
+from tests.conftest import make_series
+from utils import compute_drawdown_recovery, drawdown_episodes, drawdown_shading, mark_normalized
+
+
+def _assert_same_drawdowns(got, expected):
+    events, annotated = got
+    expected_events, expected_annotated = expected
+    # Open episodes carry pd.NA recovery fields: compare as objects
+    pd.testing.assert_frame_equal(events.astype(object), expected_events.astype(object))
+    pd.testing.assert_frame_equal(annotated, expected_annotated)
+
+
+def test_drawdowns_match_baseline(series):
+    _assert_same_drawdowns(compute_drawdown_recovery(series), baseline.compute_drawdown_recovery(series))
+
+
+def test_drawdowns_of_normalized_frame_match_baseline(series):
+    _assert_same_drawdowns(compute_drawdown_recovery(mark_normalized(series.copy())),
+                           baseline.compute_drawdown_recovery(series))
+
+
+@pytest.mark.parametrize("kind", ["daily", "duplicate_days", "intraday"])
+def test_drawdowns_with_ties_and_gaps_match_baseline(kind):
+    df = make_series(kind, seed=4)
+    # Rounded prices repeat record highs and troughs exactly
+    df["index"] = df["index"].round(-1)
+    df.loc[df.index[::37], "index"] = np.nan
+    df = df.sample(frac=1.0, random_state=5).reset_index(drop=True)
+    _assert_same_drawdowns(compute_drawdown_recovery(df), baseline.compute_drawdown_recovery(df))
+
+
+def test_open_and_recovered_episodes():
+    prices = np.array([10.0, 8.0, 9.0, 10.0, 11.0, 7.0, 7.0, 9.0])
+    peaks, troughs, recoveries = drawdown_episodes(prices, np.maximum.accumulate(prices))
+    assert peaks.tolist() == [0, 4]
+    assert troughs.tolist() == [1, 5]
+    assert recoveries.tolist() == [3, -1]
+
+
+def test_custom_columns_and_missing_column():
+    df = make_series("daily").rename(columns={"datetime": "Date", "index": "Close"})
+    events, _ = compute_drawdown_recovery(df, date_col="Date", price_col="Close")
+    expected, _ = baseline.compute_drawdown_recovery(df, date_col="Date", price_col="Close")
+    pd.testing.assert_frame_equal(events.astype(object), expected.astype(object))
+    with pytest.raises(ValueError):
+        compute_drawdown_recovery(df, date_col="datetime")
+
+
+def test_shading_covers_only_the_filtered_episodes():
+    df = pd.DataFrame({"datetime": pd.date_range("2020-01-01", periods=8),
+                       "index": [10.0, 8.0, 9.0, 10.0, 11.0, 7.0, 7.0, 9.0]})
+    events, annotated = compute_drawdown_recovery(df)
+    x, y = drawdown_shading(annotated, events[events["drawdown_pct"] < -0.3])
+    # Only the open episode: price from the peak to the end, then back along the peak level
+    assert x == [*df["datetime"][4:], *df["datetime"][4:][::-1], None]
+    assert y == [11.0, 7.0, 7.0, 9.0, 11.0, 11.0, 11.0, 11.0, None]
+
+    big = make_series("daily", seed=2)
+    events, annotated = compute_drawdown_recovery(big)
+    x, y = drawdown_shading(annotated, events, max_points=200)
+    assert x.count(None) == len(events) and len(x) <= 200 + 4 * len(events)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from tests import baseline
+from utils import (
+    compute_windowed_returns_calendar, sorted_returns, count_exceedances, exceedance_curve,
+    drop_event_analysis, gain_event_analysis,
+)
+
+THRESHOLDS = [0.0, 0.01, 0.05, 0.5]
+
+
+@pytest.mark.parametrize("ws", [1, 5, 21])
+def test_drop_and_gain_counts_match_baseline(series, ws):
+    ret = compute_windowed_returns_calendar(series, ws)
+    exceedance = sorted_returns(ret)
+    for th in THRESHOLDS:
+        expected_drop = baseline.drop_event_analysis(series, th, ws)
+        expected_gain = baseline.gain_event_analysis(series, th, ws)
+        assert drop_event_analysis(series, th, ws) == expected_drop
+        assert gain_event_analysis(series, th, ws) == expected_gain
+        assert drop_event_analysis(series, th, ws, returns=ret) == expected_drop
+        assert gain_event_analysis(series, th, ws, exceedance=exceedance) == expected_gain
+
+
+def test_thresholds_equal_to_a_return_are_counted(series):
+    ret = compute_windowed_returns_calendar(series, 5).dropna().to_numpy()
+    exceedance = sorted_returns(ret)
+    # Thresholds landing exactly on observed returns: <= -th and >= th are inclusive
+    drops = -exceedance[exceedance < 0][::7]
+    gains = exceedance[exceedance > 0][::7]
+    np.testing.assert_array_equal(count_exceedances(exceedance, drops, "drop"), [(ret <= -t).sum() for t in drops])
+    np.testing.assert_array_equal(count_exceedances(exceedance, gains, "gain"), [(ret >= t).sum() for t in gains])
+
+
+@pytest.mark.parametrize("mode", ["drop", "gain"])
+def test_exceedance_curve_matches_direct_counts(series, mode):
+    ret = compute_windowed_returns_calendar(series, 10).dropna().to_numpy()
+    thresholds_pct, counts, probs_pct = exceedance_curve(sorted_returns(ret), mode, step_pct=0.5, max_pct=20.0)
+    assert len(thresholds_pct) == 40
+    th = thresholds_pct / 100.0
+    expected = [(ret <= -t).sum() for t in th] if mode == "drop" else [(ret >= t).sum() for t in th]
+    np.testing.assert_array_equal(counts, expected)
+    np.testing.assert_allclose(probs_pct, np.asarray(expected) / len(ret) * 100.0)
+
+
+def test_exceedance_of_no_returns():
+    _, counts, probs_pct = exceedance_curve(sorted_returns([np.nan, np.nan]), "drop")
+    assert not counts.any() and not probs_pct.any()
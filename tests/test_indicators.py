@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from tests import baseline
+from utils import build_indicators, INDICATOR_COLUMNS, INDICATOR_GROUPS, indicator_columns_for, mark_normalized
+
+
+def test_all_indicators_match_baseline(series):
+    expected = baseline.build_indicators(series)
+    got = build_indicators(series)
+    assert list(got.columns) == INDICATOR_COLUMNS
+    pd.testing.assert_frame_equal(got, expected[INDICATOR_COLUMNS])
+
+
+def test_normalized_frame_matches_baseline(series):
+    got = build_indicators(mark_normalized(series.copy()))
+    pd.testing.assert_frame_equal(got, baseline.build_indicators(series)[INDICATOR_COLUMNS])
+
+
+def test_selected_columns_match_baseline(series):
+    expected = baseline.build_indicators(series)
+    for group in INDICATOR_GROUPS:
+        columns = indicator_columns_for([group])
+        got = build_indicators(series, columns=columns)
+        assert list(got.columns) == [c for c in INDICATOR_COLUMNS if c in columns]
+        pd.testing.assert_frame_equal(got, expected[list(got.columns)])
+
+
+def test_unknown_column_is_rejected(series):
+    with pytest.raises(ValueError):
+        build_indicators(series, columns=["sma_5", "sma_7"])
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+import jobs
+from jobs import single_flight, run_sections, SharedStore
+
+
+def test_shared_store_is_read_through_the_job_store():
+    writer = SharedStore("test-views", max_local=2)
+    reader = SharedStore("test-views", max_local=2)
+    writer.set("k1", {"rows": 1})
+    assert "k1" in reader and reader.get("k1") == {"rows": 1}
+    assert "missing" not in reader and reader.get("missing") is None
+    # Dropped from the small local LRU, still served from the job store
+    for k in ("k2", "k3"):
+        writer.set(k, {"rows": 0})
+    assert writer.get("k1") == {"rows": 1}
+
+
+def test_expired_entry_is_gone_even_if_held_locally():
+    store = SharedStore("test-expiring", max_local=2, expire=0.05)
+    store.set("k", {"rows": 1})
+    time.sleep(0.1)
+    assert "k" not in store
+
+
+def test_single_flight_shares_one_computation():
+    key = ("single", uuid.uuid4().hex)
+    calls, results, waited = [], [], []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return {"answer": 42}
+
+    def caller():
+        results.append(single_flight(key, compute, on_wait=lambda: waited.append(1)))
+
+    threads = [threading.Thread(target=caller) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert len(calls) == 1
+    assert results == [{"answer": 42}] * 4
+    assert len(waited) == 3
+
+
+def test_single_flight_shares_the_error():
+    key = ("single-error", uuid.uuid4().hex)
+    started = threading.Event()
+    errors = []
+
+    def compute():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("bad input")
+
+    def caller():
+        try:
+            single_flight(key, compute)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert errors == ["bad input"] * 3
+    # A failed flight is not remembered: the next call computes again
+    assert single_flight(key, lambda: "ok") == "ok"
+
+
+@pytest.mark.skipif(jobs.fcntl is None, reason="needs flock")
+def test_shared_flight_waits_on_the_lock_file_and_removes_it():
+    key = ("shared", uuid.uuid4().hex)
+    lock_dir = os.path.join(jobs.JOB_CACHE_DIR, "flights")
+    started = threading.Event()
+    calls, results, waited = [], [], []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return "done"
+
+    # Direct calls stand in for two processes: each has its own in-flight table
+    first = threading.Thread(target=lambda: results.append(jobs._shared_flight(key, compute, None)))
+    first.start()
+    started.wait(5)
+    results.append(jobs._shared_flight(key, compute, lambda: waited.append(1)))
+    first.join(10)
+    assert results == ["done", "done"] and len(calls) == 1 and waited == [1]
+    # No lock file is left behind per key
+    assert os.listdir(lock_dir) == []
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_run_sections_returns_every_result(monkeypatch, workers):
+    monkeypatch.setattr(jobs, "ANALYSIS_SECTION_WORKERS", workers)
+    results = run_sections({"drop": lambda: 1, "gain": lambda: 2, "indicators": lambda: 3})
+    assert results == {"drop": 1, "gain": 2, "indicators": 3}
+    with pytest.raises(ZeroDivisionError):
+        run_sections({"ok": lambda: 1, "broken": lambda: 1 / 0})
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_run_sections_in_a_forked_job(monkeypatch):
+    monkeypatch.setattr(jobs, "ANALYSIS_SECTION_WORKERS", 2)
+    run_sections({"a": lambda: 1, "b": lambda: 2})
+    # A background job forks with the parent's pool object but none of its threads
+    pid = os.fork()
+    if pid == 0:
+        ok = False
+        try:
+            ok = run_sections({"a": lambda: 1, "b": lambda: 2}) == {"a": 1, "b": 2}
+        finally:
+            os._exit(0 if ok else 1)
+    assert os.waitpid(pid, 0)[1] == 0
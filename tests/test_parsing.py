@@ -0,0 +1,136 @@
+import base64
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+from tests import baseline
+from tests.conftest import make_series
+from utils import parse_csv_flexible, parse_upload, parse_upload_file, is_normalized, mark_normalized
+
+
+def _data_url(payload: bytes, mime="text/csv") -> str:
+    return f"data:{mime};base64," + base64.b64encode(payload).decode()
+
+
+def _csv(df: pd.DataFrame, date_format=None) -> bytes:
+    out = df.rename(columns={"datetime": "Date", "index": "Close"})
+    return out.to_csv(index=False, date_format=date_format).encode()
+
+
+def _assert_same_parse(got, expected):
+    df, warnings, err = got
+    expected_df, expected_warnings, _ = expected
+    assert err is None
+    pd.testing.assert_frame_equal(df, expected_df)
+    assert warnings == expected_warnings
+    assert is_normalized(df)
+
+
+def test_csv_matches_baseline(series):
+    contents = _data_url(_csv(series))
+    _assert_same_parse(parse_csv_flexible(contents, "x.csv"), baseline.parse_csv_flexible(contents, "x.csv"))
+
+
+@pytest.mark.parametrize("chunk_rows", [None, 97])
+def test_messy_unsorted_csv_matches_baseline(monkeypatch, chunk_rows):
+    if chunk_rows:
+        monkeypatch.setattr(utils, "CSV_CHUNK_ROWS", chunk_rows)
+    df = make_series("duplicate_days", seed=3)
+    df = df.sample(frac=1.0, random_state=1).reset_index(drop=True)
+    df.insert(0, "Ticker", "IDX")
+    df = df.astype({"index": object})
+    df.loc[df.index[::50], "index"] = "n/a"
+    df.loc[df.index[7::61], "datetime"] = None
+    contents = _data_url(_csv(df))
+    _assert_same_parse(parse_csv_flexible(contents, "x.csv"), baseline.parse_csv_flexible(contents, "x.csv"))
+
+
+@pytest.mark.parametrize("date_format", ["%Y/%m/%d", "%m/%d/%Y %H:%M", "%d %b %Y"])
+def test_date_formats_match_baseline(date_format):
+    df = make_series("daily" if "%H" not in date_format else "intraday")
+    contents = _data_url(_csv(df, date_format=date_format))
+    _assert_same_parse(parse_csv_flexible(contents, "x.csv"), baseline.parse_csv_flexible(contents, "x.csv"))
+
+
+def test_rows_in_another_format_past_the_sample_are_kept(monkeypatch):
+    monkeypatch.setattr(utils, "CSV_SAMPLE_ROWS", 100)
+    monkeypatch.setattr(utils, "CSV_CHUNK_ROWS", 250)
+    df = make_series("daily")
+    text = "Date,Close\n" + "\n".join(
+        f"{d:%Y-%m-%d},{v}" if i < 500 else f"{d:%m/%d/%Y},{v}"
+        for i, (d, v) in enumerate(zip(df["datetime"], df["index"])))
+    parsed, warnings, err = parse_csv_flexible(_data_url(text.encode()), "x.csv")
+    assert err is None and warnings == []
+    pd.testing.assert_series_equal(parsed["datetime"], df["datetime"])
+
+
+@pytest.mark.parametrize("filename, pack", [
+    ("x.csv.gz", gzip.compress),
+    ("x.csv.bz2", bz2.compress),
+    ("x.csv.xz", lzma.compress),
+    ("x.zip", None),
+])
+def test_compressed_csv_matches_plain(series, filename, pack):
+    raw = _csv(series)
+    if pack is None:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("data.csv", raw)
+        packed = buf.getvalue()
+    else:
+        packed = pack(raw)
+    plain = parse_upload(_data_url(raw), "x.csv")
+    _assert_same_parse(parse_upload(_data_url(packed, "application/octet-stream"), filename), plain)
+
+
+@pytest.mark.parametrize("filename", ["x.parquet", "x.feather"])
+def test_columnar_upload_matches_csv(series, tmp_path, filename):
+    path = tmp_path / filename
+    renamed = series.rename(columns={"datetime": "Date", "index": "Close"})
+    renamed.to_parquet(path) if filename.endswith(".parquet") else renamed.to_feather(path)
+    plain = parse_upload(_data_url(_csv(series)), "x.csv")
+    _assert_same_parse(parse_upload_file(str(path), filename), plain)
+    _assert_same_parse(parse_upload(_data_url(path.read_bytes(), "application/octet-stream"), filename), plain)
+
+
+def test_rejected_uploads():
+    assert parse_csv_flexible(_data_url(b"a,b\n"), "x.txt")[2].startswith("Please upload")
+    assert parse_csv_flexible(_data_url(b"Date\n2020-01-01\n"), "x.csv")[2].startswith("CSV must have")
+    assert parse_csv_flexible(_data_url(b"a,b\nx,y\nz,w\n"), "x.csv")[2] is not None
+
+
+def test_is_normalized_rechecks_the_contract(series):
+    df = mark_normalized(series.copy())
+    assert is_normalized(df) and is_normalized(df.iloc[10:20])
+    assert not is_normalized(series)
+    assert not is_normalized(df.astype({"index": "float32"}))
+    shuffled = df.iloc[::-1].reset_index(drop=True)
+    shuffled.attrs.update(df.attrs)
+    assert not is_normalized(shuffled)
+    with_nan = df.copy()
+    with_nan.loc[3, "index"] = np.nan
+    assert not is_normalized(with_nan)
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_chunks_past_the_size_estimate_are_joined_in_order(tmp_path, shuffle):
+    df = make_series("duplicate_days", seed=3)
+    if shuffle:
+        df = df.sample(frac=1.0, random_state=1).reset_index(drop=True)
+    plain, packed = tmp_path / "x.csv", tmp_path / "x.csv.gz"
+    plain.write_bytes(_csv(df))
+    packed.write_bytes(gzip.compress(_csv(df)))
+    # The compressed size makes the preallocated estimate far too small: most chunks overflow it
+    got = utils._stream_columns(utils._FileSource(str(packed)), "x.csv.gz", 0, 1, None, chunk_rows=50)
+    expected = utils._stream_columns(utils._FileSource(str(plain)), "x.csv", 0, 1, None)
+    assert got[2] == expected[2] == len(df)
+    np.testing.assert_array_equal(got[0], expected[0])
+    np.testing.assert_array_equal(got[1], expected[1])
+    assert (np.diff(got[0].view("int64")) >= 0).all()
@@ -0,0 +1,50 @@
+import result_cache
+from result_cache import cached_result, result_key, RESULT_CACHE
+
+
+def _counter():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"figure": len(calls)}
+    return compute, calls
+
+
+def test_cached_result_is_computed_once():
+    compute, calls = _counter()
+    assert cached_result(("hash-a", 5, 0.05), compute) == {"figure": 1}
+    assert cached_result(("hash-a", 5, 0.05), compute) == {"figure": 1}
+    assert cached_result(("hash-a", 5, 0.10), compute) == {"figure": 2}
+    assert len(calls) == 2
+
+
+def test_code_version_change_invalidates_stored_results(monkeypatch):
+    compute, calls = _counter()
+    key = ("hash-b", 21)
+    cached_result(key, compute)
+    old_version = result_cache.CODE_VERSION
+
+    # A deploy with other code (or library versions) must not serve the old results
+    monkeypatch.setattr(result_cache, "CODE_VERSION", old_version + "-next")
+    assert result_key(*key) != (old_version,) + key
+    assert cached_result(key, compute) == {"figure": 2}
+    assert cached_result(key, compute) == {"figure": 2}
+
+    monkeypatch.setattr(result_cache, "CODE_VERSION", old_version)
+    assert cached_result(key, compute) == {"figure": 1}
+    assert len(calls) == 2
+
+
+def test_code_version_covers_the_plot_point_limit(monkeypatch):
+    version = result_cache._code_version()
+    assert result_cache._code_version() == version
+    monkeypatch.setattr(result_cache, "PLOT_MAX_POINTS", result_cache.PLOT_MAX_POINTS + 1)
+    assert result_cache._code_version() != version
+
+
+def test_rejected_result_is_recomputed():
+    compute, calls = _counter()
+    cached_result(("hash-c",), compute)
+    assert cached_result(("hash-c",), compute, valid=lambda r: r["figure"] > 1) == {"figure": 2}
+    assert RESULT_CACHE.get(result_key("hash-c")) == {"figure": 2}
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests import baseline
+from tests.conftest import make_series
+from utils import (
+    end_trade_day_with_buffer, end_trade_days_with_buffer, window_end_positions,
+    compute_windowed_returns_calendar, compute_windowed_returns_matrix, mark_normalized,
+)
+
+WINDOWS = [1, 2, 3, 5, 7, 10, 21, 63]
+
+
+def test_end_trade_days_match_scalar():
+    days = pd.date_range("2023-12-25", periods=21, freq="D")
+    for ws in range(1, 12):
+        expected = [end_trade_day_with_buffer(d, ws) for d in days]
+        got = end_trade_days_with_buffer(days.values, ws)
+        assert list(pd.DatetimeIndex(got)) == expected
+
+
+def test_end_trade_days_keep_nat():
+    days = np.array(["2024-01-05", "NaT"], dtype="datetime64[ns]")
+    got = end_trade_days_with_buffer(days, 5)
+    assert np.isnat(got[1]) and not np.isnat(got[0])
+
+
+def test_window_end_positions_use_last_row_of_a_day():
+    days = np.array(["2024-01-01", "2024-01-02", "2024-01-02", "2024-01-03"], dtype="datetime64[D]")
+    assert window_end_positions(days, 2).tolist() == [2, 3, 3, 3]
+    assert window_end_positions(days, 1).tolist() == [0, 2, 2, 3]
+
+
+@pytest.mark.parametrize("ws", WINDOWS)
+def test_calendar_returns_match_baseline(series, ws):
+    expected = baseline.compute_windowed_returns_calendar(series, ws)
+    got = compute_windowed_returns_calendar(series, ws)
+    np.testing.assert_array_equal(got.to_numpy(), expected.to_numpy())
+    assert got.name == expected.name
+
+
+@pytest.mark.parametrize("ws", WINDOWS)
+def test_calendar_returns_of_normalized_frame_match_baseline(series, ws):
+    expected = baseline.compute_windowed_returns_calendar(series, ws)
+    got = compute_windowed_returns_calendar(mark_normalized(series.copy()), ws)
+    np.testing.assert_array_equal(got.to_numpy(), expected.to_numpy())
+
+
+def test_returns_matrix_columns_match_single_windows(series):
+    matrix = compute_windowed_returns_matrix(series, WINDOWS)
+    assert matrix.shape == (len(series), len(WINDOWS))
+    for k, ws in enumerate(WINDOWS):
+        np.testing.assert_array_equal(matrix[:, k], compute_windowed_returns_calendar(series, ws).to_numpy())
+
+
+@pytest.mark.parametrize("kind", ["daily", "duplicate_days", "intraday"])
+def test_unsorted_input_with_gaps_matches_baseline(kind):
+    df = make_series(kind, seed=1)
+    rng = np.random.default_rng(2)
+    df.loc[rng.choice(len(df), 20, replace=False), "index"] = np.nan
+    df.loc[rng.choice(len(df), 5, replace=False), "index"] = 0.0
+    df = df.sample(frac=1.0, random_state=3).reset_index(drop=True)
+    for ws in (1, 5, 21):
+        np.testing.assert_array_equal(compute_windowed_returns_calendar(df, ws).to_numpy(),
+                                      baseline.compute_windowed_returns_calendar(df, ws).to_numpy())
+
+
+def test_empty_frame():
+    empty = pd.DataFrame({"datetime": pd.Series(dtype="datetime64[ns]"), "index": pd.Series(dtype=float)})
+    assert compute_windowed_returns_calendar(empty, 5).empty
+    assert compute_windowed_returns_matrix(empty, [1, 5]).shape == (0, 2)
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from startup import lazy_import
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lazy_import_loads_the_module_on_first_use():
+    sys.modules.pop("colorsys", None)
+    colorsys = lazy_import("colorsys")
+    assert "colorsys" not in sys.modules
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
+    assert lazy_import("colorsys") is sys.modules["colorsys"]
+
+
+def test_importing_the_app_loads_no_heavy_library():
+    # Warm-up off: it would import them in the background on purpose
+    code = ("import startup; startup.warm_up = lambda: None; import app, sys; "
+            "print(' '.join(m for m in ('numpy', 'pandas', 'plotly.graph_objects', 'pyarrow') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from tests import baseline
+from utils import (compute_trade_windows, page_trade_windows, build_trade_window_table, get_trade_windows,
+                   mark_normalized, stored_views_available)
+
+
+@pytest.mark.parametrize("ws", [1, 2, 5, 7, 21])
+def test_trade_windows_match_baseline(series, ws):
+    pd.testing.assert_frame_equal(compute_trade_windows(series, ws), baseline.trade_windows(series, ws))
+
+
+def test_trade_windows_of_normalized_frame_match_baseline(series):
+    pd.testing.assert_frame_equal(compute_trade_windows(mark_normalized(series.copy()), 5),
+                                  baseline.trade_windows(series, 5))
+
+
+def test_trade_windows_of_unsorted_input_match_baseline(series):
+    shuffled = series.sample(frac=1.0, random_state=0).reset_index(drop=True)
+    pd.testing.assert_frame_equal(compute_trade_windows(shuffled, 5), baseline.trade_windows(shuffled, 5))
+
+
+def test_pages_are_filtered_sorted_and_sliced(series):
+    frame = compute_trade_windows(series, 5)
+    rows, page_count = page_trade_windows(frame, 1, 10, sort_by=[{"column_id": "start", "direction": "desc"}],
+                                          filter_query="{start} datestartswith 2015-03")
+    in_march = frame[frame["start"].dt.strftime("%Y-%m") == "2015-03"]
+    in_march = in_march.sort_values("start", ascending=False, kind="stable")
+    assert page_count == -(-len(in_march) // 10)
+    assert [r["start"] for r in rows] == in_march["start"].dt.strftime("%Y-%m-%d").tolist()[10:20]
+
+    # Out-of-range pages clamp to the last page; a bad date in the filter matches nothing
+    assert page_trade_windows(frame, 10 ** 6, 10)[0] == page_trade_windows(frame, page_count - 1 + 10 ** 6, 10)[0]
+    assert page_trade_windows(frame, 0, 10, filter_query="{start} > not-a-date") == ([], 1)
+
+
+def test_table_pages_come_from_the_stored_frame(series):
+    table = build_trade_window_table(series, 5, page_size=20)
+    frame = get_trade_windows(table.id["key"])
+    pd.testing.assert_frame_equal(frame, compute_trade_windows(series, 5))
+    assert table.data == page_trade_windows(frame, 0, 20)[0]
+    assert table.page_count == -(-len(series) // 20)
+    assert stored_views_available({"table": table})
@@ -0,0 +1,186 @@
+import base64
+import io
+import os
+import threading
+import time
+
+import flask
+import pandas as pd
+import pytest
+
+import uploads
+from config import UPLOAD_ROUTE, UPLOAD_TMP_DIR
+from datasets import get_dataset, file_fingerprint, find_uploaded_dataset
+from tests.conftest import make_series
+from utils import parse_upload
+
+
+@pytest.fixture
+def client():
+    server = flask.Flask(__name__)
+    uploads.register_upload_routes(server)
+    return server.test_client()
+
+
+@pytest.fixture
+def payload():
+    df = make_series("intraday")
+    return df, df.rename(columns={"datetime": "Date", "index": "Close"}).to_csv(index=False).encode()
+
+
+def _init(client, size, filename="prices.csv", fingerprint="f1"):
+    return client.post(f"{UPLOAD_ROUTE}/init", json={"filename": filename, "size": size, "fingerprint": fingerprint})
+
+
+def _put(client, upload_id, offset, chunk):
+    return client.put(f"{UPLOAD_ROUTE}/{upload_id}?offset={offset}", data=chunk,
+                      content_type="application/octet-stream")
+
+
+def _upload(client, raw, fingerprint, filename="prices.csv"):
+    upload_id = _init(client, len(raw), filename=filename, fingerprint=fingerprint).get_json()["upload_id"]
+    assert _put(client, upload_id, 0, raw).get_json()["received"] == len(raw)
+    return upload_id
+
+
+def _complete(client, upload_id):
+    """Complete the upload and poll the parse in the batch pool until it has finished."""
+    resp = client.post(f"{UPLOAD_ROUTE}/{upload_id}/complete")
+    assert resp.status_code == 202
+    deadline = time.monotonic() + 60
+    while True:
+        result = client.get(f"{UPLOAD_ROUTE}/batch/{resp.get_json()['batch_id']}").get_json()
+        if result["state"] != "pending":
+            return result
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_chunked_upload_registers_the_dataset(client, payload):
+    df, raw = payload
+    init = _init(client, len(raw)).get_json()
+    assert init["received"] == 0
+    offset = 0
+    for start in range(0, len(raw), 10_000):
+        resp = _put(client, init["upload_id"], offset, raw[start:start + 10_000])
+        assert resp.status_code == 200
+        offset = resp.get_json()["received"]
+    assert offset == len(raw)
+
+    done = _complete(client, init["upload_id"])
+    assert done["state"] == "done" and done["rows"] == len(df) and done["filename"] == "prices.csv"
+    # Same series as a one-shot dcc.Upload of the file
+    expected, _, _ = parse_upload("data:text/csv;base64," + base64.b64encode(raw).decode(), "prices.csv")
+    pd.testing.assert_frame_equal(get_dataset(done["dataset_key"]), expected)
+    # The partial file, its lock file and the copy handed to the parser are gone once parsed
+    assert client.get(f"{UPLOAD_ROUTE}/{init['upload_id']}").status_code == 404
+    assert not any(name.startswith(init["upload_id"]) for name in os.listdir(UPLOAD_TMP_DIR))
+
+
+def test_same_bytes_reuse_the_parsed_dataset(client, payload):
+    _, raw = payload
+    first = _complete(client, _upload(client, raw, "copy-1", filename="a.csv"))
+    # Another upload (other name and fingerprint) of the same bytes is found by content hash
+    second = _complete(client, _upload(client, raw, "copy-2", filename="b.csv"))
+    assert second["state"] == "done" and second["dataset_key"] == first["dataset_key"]
+    assert second["rows"] == first["rows"]
+
+    path = os.path.join(UPLOAD_TMP_DIR, "hash-check.csv")
+    with open(path, "wb") as f:
+        f.write(raw)
+    assert find_uploaded_dataset(file_fingerprint(path, "c.csv")) == first["dataset_key"]
+    os.remove(path)
+
+
+def test_same_file_resumes_where_it_stopped(client, payload):
+    _, raw = payload
+    upload_id = _init(client, len(raw), fingerprint="resume").get_json()["upload_id"]
+    assert _put(client, upload_id, 0, raw[:4096]).get_json()["received"] == 4096
+
+    # Dropped connection: picking the same file again finds the bytes already on the server
+    again = _init(client, len(raw), fingerprint="resume").get_json()
+    assert again["upload_id"] == upload_id and again["received"] == 4096
+    assert client.get(f"{UPLOAD_ROUTE}/{upload_id}").get_json() == {"received": 4096, "size": len(raw)}
+    # Another file (different fingerprint) starts its own upload
+    assert _init(client, len(raw), fingerprint="other").get_json()["upload_id"] != upload_id
+
+    assert _put(client, upload_id, 4096, raw[4096:]).get_json()["received"] == len(raw)
+    assert _complete(client, upload_id)["state"] == "done"
+
+
+@pytest.mark.parametrize("offset", [0, 100, 5000])
+def test_stale_offset_is_refused_with_the_server_position(client, payload, offset):
+    _, raw = payload
+    upload_id = _init(client, len(raw), fingerprint=f"stale{offset}").get_json()["upload_id"]
+    _put(client, upload_id, 0, raw[:2048])
+
+    # A retried chunk that did land (offset 0) or one sent from the wrong place
+    resp = _put(client, upload_id, offset, raw[offset:offset + 2048])
+    assert resp.status_code == 409
+    assert resp.get_json()["received"] == 2048
+    assert client.get(f"{UPLOAD_ROUTE}/{upload_id}").get_json()["received"] == 2048
+
+
+def test_chunk_past_the_declared_size_is_rolled_back(client, payload):
+    _, raw = payload
+    upload_id = _init(client, 3000, fingerprint="short").get_json()["upload_id"]
+    _put(client, upload_id, 0, raw[:2000])
+    body = io.BytesIO(raw[2000:])
+    resp = client.put(f"{UPLOAD_ROUTE}/{upload_id}?offset=2000", input_stream=body, content_length=len(raw) - 2000,
+                      content_type="application/octet-stream")
+    assert resp.status_code == 400 and resp.get_json()["received"] == 2000
+    assert client.get(f"{UPLOAD_ROUTE}/{upload_id}").get_json()["received"] == 2000
+    # Only one byte past the declared size was read before the chunk was refused
+    assert body.tell() == 1001
+
+
+def test_requests_queue_on_the_lock_file_and_see_a_finished_upload_as_gone(client, payload):
+    _, raw = payload
+    upload_id = _init(client, len(raw), fingerprint="locked").get_json()["upload_id"]
+    lock_path = os.path.join(UPLOAD_TMP_DIR, upload_id + ".lock")
+    assert os.path.exists(lock_path)
+
+    responses = []
+    with uploads._upload_lock(upload_id):
+        # A second request (any worker) waits for the flock
+        waiter = threading.Thread(target=lambda: responses.append(_put(client, upload_id, 0, raw[:100])))
+        waiter.start()
+        waiter.join(0.3)
+        assert waiter.is_alive()
+        uploads._discard(upload_id)
+    waiter.join(10)
+    assert responses[0].status_code == 404
+    assert not os.path.exists(lock_path)
+
+
+def test_incomplete_upload_cannot_complete(client, payload):
+    _, raw = payload
+    upload_id = _init(client, len(raw), fingerprint="incomplete").get_json()["upload_id"]
+    _put(client, upload_id, 0, raw[:1000])
+    resp = client.post(f"{UPLOAD_ROUTE}/{upload_id}/complete")
+    assert resp.status_code == 409 and resp.get_json()["received"] == 1000
+    # Still resumable afterwards
+    assert client.get(f"{UPLOAD_ROUTE}/{upload_id}").get_json()["received"] == 1000
+
+
+def test_unparseable_upload_is_reported_and_discarded(client):
+    raw = b"just one column\n1\n2\n"
+    upload_id = _upload(client, raw, "bad")
+    result = _complete(client, upload_id)
+    assert result["state"] == "error" and "two columns" in result["error"]
+    assert client.get(f"{UPLOAD_ROUTE}/{upload_id}").status_code == 404
+    assert not any(name.startswith(upload_id) for name in os.listdir(UPLOAD_TMP_DIR))
+
+
+def test_init_validation_and_unknown_ids(client, monkeypatch):
+    assert client.post(f"{UPLOAD_ROUTE}/init", json={"filename": "x.csv"}).status_code == 400
+    assert client.post(f"{UPLOAD_ROUTE}/init", json={"filename": "x.csv", "size": 0}).status_code == 400
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1024)
+    assert _init(client, 2048).status_code == 413
+
+    unknown = "0" * 32
+    assert client.get(f"{UPLOAD_ROUTE}/{unknown}").status_code == 404
+    assert _put(client, unknown, 0, b"x").status_code == 404
+    assert client.post(f"{UPLOAD_ROUTE}/{unknown}/complete").status_code == 404
+    assert client.get(f"{UPLOAD_ROUTE}/batch/{unknown}").status_code == 404
+    assert client.get(f"{UPLOAD_ROUTE}/not-an-id").status_code == 404
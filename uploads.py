@@ -0,0 +1,226 @@
+"""
+Resumable chunked uploads.
+Flask routes on app.server that receive a file as raw binary chunks instead of one base64
+dcc.Upload payload and assemble it on disk. The finished file is parsed in the batch upload
+pool (batch_upload.submit_upload_file), so no request waits for the parse; the browser side
+(assets/chunked_upload.js) polls for the result and only hands the dataset key to Dash.
+
+Protocol (JSON responses):
+    POST /upload/init               {"filename", "size", "fingerprint"} -> {"upload_id", "received", "chunk_size"}
+    PUT  /upload/<id>?offset=<n>    raw chunk bytes                      -> {"received"}
+    GET  /upload/<id>                                                    -> {"received", "size"}
+    POST /upload/<id>/complete                                           -> 202 {"batch_id", "filename"}
+    GET  /upload/batch/<batch_id>                                        -> {"state", "dataset_key", "filename", "rows", "warnings", "error"}
+The upload id is derived from the file's name, size and client fingerprint, so picking the
+same file again after a dropped connection resumes from the bytes already on the server.
+Requests for one upload are serialized with an flock on <id>.lock next to the partial file,
+so they are also ordered across gunicorn workers.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+from flask import request, jsonify
+
+from config import (
+    UPLOAD_ROUTE, UPLOAD_CHUNK_BYTES, UPLOAD_MAX_BYTES, UPLOAD_TMP_DIR, UPLOAD_PARTIAL_TTL_SECONDS
+)
+from batch_upload import submit_upload_file, batch_status
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: uploads are only serialized within this process
+    fcntl = None
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_process_lock = threading.Lock()
+
+
+def _paths(upload_id: str):
+    base = os.path.join(UPLOAD_TMP_DIR, upload_id)
+    return base + ".part", base + ".json", base + ".lock"
+
+
+@contextmanager
+def _upload_lock(upload_id: str):
+    """
+    Exclusive flock on the upload's lock file, held by one request of any worker at a time.
+    _discard removes the file under the lock; a request that was waiting on the removed file
+    takes the lock again on a new one (and then finds the upload gone).
+    """
+    if fcntl is None:
+        with _process_lock:
+            yield
+        return
+    path = _paths(upload_id)[2]
+    while True:
+        lock_file = open(path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.stat(path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+    try:
+        yield
+    finally:
+        # Closing the file releases the flock
+        lock_file.close()
+
+
+def _load_meta(upload_id: str):
+    if not _UPLOAD_ID.match(upload_id or ""):
+        return None
+    try:
+        with open(_paths(upload_id)[1]) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _discard(upload_id: str):
+    """Remove an upload's files. Call with its lock held."""
+    for path in _paths(upload_id):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _copy_at_most(src, dst, limit: int, block: int = 1 << 20) -> int:
+    """Copy up to `limit` bytes from src to dst; returns how many were copied."""
+    copied = 0
+    while copied < limit:
+        data = src.read(min(block, limit - copied))
+        if not data:
+            break
+        dst.write(data)
+        copied += len(data)
+    return copied
+
+
+def _expire_partials():
+    """Drop partial uploads nobody has touched for UPLOAD_PARTIAL_TTL_SECONDS."""
+    cutoff = time.time() - UPLOAD_PARTIAL_TTL_SECONDS
+    for name in os.listdir(UPLOAD_TMP_DIR):
+        upload_id, ext = os.path.splitext(name)
+        if ext == ".ready":
+            # A completed upload a parse worker never picked up (e.g. the pool was restarted)
+            try:
+                if os.path.getmtime(os.path.join(UPLOAD_TMP_DIR, name)) < cutoff:
+                    os.remove(os.path.join(UPLOAD_TMP_DIR, name))
+            except OSError:
+                pass
+        elif ext == ".part" and _UPLOAD_ID.match(upload_id):
+            path = os.path.join(UPLOAD_TMP_DIR, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    with _upload_lock(upload_id):
+                        # Checked again under the lock: a chunk may have landed meanwhile
+                        if not os.path.exists(path) or os.path.getmtime(path) < cutoff:
+                            _discard(upload_id)
+            except OSError:
+                pass
+
+
+def register_upload_routes(server):
+    """Attach the chunked upload routes to the Flask server behind the Dash app."""
+
+    @server.route(f"{UPLOAD_ROUTE}/init", methods=["POST"])
+    def upload_init():
+        body = request.get_json(silent=True) or {}
+        filename = os.path.basename(str(body.get("filename") or ""))
+        size = body.get("size")
+        if not filename or not isinstance(size, int) or size <= 0:
+            return jsonify(error="filename and a positive size are required"), 400
+        if size > UPLOAD_MAX_BYTES:
+            return jsonify(error=f"File is larger than the {UPLOAD_MAX_BYTES // 1024 ** 2} MB upload limit"), 413
+
+        fingerprint = f"{filename}|{size}|{body.get('fingerprint') or ''}"
+        upload_id = hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest()
+        os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+        _expire_partials()
+
+        data_path, meta_path, _ = _paths(upload_id)
+        with _upload_lock(upload_id):
+            if _load_meta(upload_id) is None or not os.path.exists(data_path):
+                open(data_path, "wb").close()
+                with open(meta_path, "w") as f:
+                    json.dump({"filename": filename, "size": size}, f)
+            received = os.path.getsize(data_path)
+        return jsonify(upload_id=upload_id, received=received, chunk_size=UPLOAD_CHUNK_BYTES)
+
+    @server.route(f"{UPLOAD_ROUTE}/<upload_id>", methods=["GET"])
+    def upload_status(upload_id):
+        meta = _load_meta(upload_id)
+        try:
+            received = os.path.getsize(_paths(upload_id)[0]) if meta is not None else None
+        except OSError:
+            received = None
+        if received is None:
+            return jsonify(error="unknown upload"), 404
+        return jsonify(received=received, size=meta["size"])
+
+    @server.route(f"{UPLOAD_ROUTE}/<upload_id>", methods=["PUT"])
+    def upload_chunk(upload_id):
+        if _load_meta(upload_id) is None:
+            return jsonify(error="unknown upload"), 404
+        offset = request.args.get("offset", type=int)
+        data_path = _paths(upload_id)[0]
+
+        with _upload_lock(upload_id):
+            meta = _load_meta(upload_id)
+            if meta is None:
+                # Completed or expired while this request waited for the lock
+                _discard(upload_id)
+                return jsonify(error="unknown upload"), 404
+            received = os.path.getsize(data_path)
+            if offset != received:
+                # Client is out of sync (e.g. a retried chunk that did land): tell it where to resume
+                return jsonify(received=received), 409
+            # Copy at most one byte past the declared size: enough to tell the chunk is too long
+            room = meta["size"] - received
+            with open(data_path, "ab") as f:
+                copied = _copy_at_most(request.stream, f, room + 1)
+            if copied > room:
+                with open(data_path, "r+b") as f:
+                    f.truncate(offset)
+                return jsonify(error="chunk runs past the declared file size", received=offset), 400
+        return jsonify(received=received + copied)
+
+    @server.route(f"{UPLOAD_ROUTE}/<upload_id>/complete", methods=["POST"])
+    def upload_complete(upload_id):
+        if _load_meta(upload_id) is None:
+            return jsonify(error="unknown upload"), 404
+        data_path = _paths(upload_id)[0]
+
+        with _upload_lock(upload_id):
+            meta = _load_meta(upload_id)
+            if meta is None:
+                _discard(upload_id)
+                return jsonify(error="unknown upload"), 404
+            received = os.path.getsize(data_path)
+            if received != meta["size"]:
+                return jsonify(error="upload is incomplete", received=received), 409
+            # Move the file out of the upload's name, so the same file can be uploaded again
+            # while this copy is still being parsed
+            ready_path = os.path.join(UPLOAD_TMP_DIR, f"{upload_id}-{uuid.uuid4().hex[:8]}.ready")
+            os.replace(data_path, ready_path)
+            _discard(upload_id)
+
+        batch_id = submit_upload_file(ready_path, meta["filename"])
+        return jsonify(batch_id=batch_id, filename=meta["filename"]), 202
+
+    @server.route(f"{UPLOAD_ROUTE}/batch/<batch_id>", methods=["GET"])
+    def upload_result(batch_id):
+        files = batch_status(batch_id)
+        if not files:
+            return jsonify(error="unknown upload"), 404
+        return jsonify(files[0])
@@ -2,69 +2,467 @@
 Utility functions for data processing, calculations, and analysis.
 """
 
+from __future__ import annotations
+
 import base64
+import bz2
+import gzip
 import io
-import numpy as np
-import pandas as pd
-from dash import html, dash_table
+import lzma
+import operator
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict, deque
+from dash import html, dcc, dash_table
+from dash.development.base_component import Component
+
+from config import (COMPUTE_CACHE_BUDGET_MB, COMPUTE_PERSIST_MIN_MS, COMPUTE_PERSIST_MIN_KB,
+                    PLOT_MAX_POINTS, CSV_SAMPLE_ROWS, CSV_CHUNK_ROWS, VIEW_DATA_TTL_SECONDS)
+from jobs import SharedStore
+from result_cache import RESULT_CACHE, result_key
+from startup import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+# Normalized-dataset contract: a frame flagged by mark_normalized has exactly the columns
+# 'datetime' (datetime64[ns]) and 'index' (float64), is sorted by datetime and has no NaT/NaN.
+# The upload parsers and the dataset registry hand out such frames; consumers skip column
+# detection, coercion and sorting for them. pandas copies attrs to derived frames (slices,
+# sort_values, concat), so is_normalized re-checks the order and the NaN-free values too.
+NORMALIZED_ATTR = "normalized"
+
+
+def mark_normalized(df: pd.DataFrame) -> pd.DataFrame:
+    """Flag df as meeting the normalized-dataset contract (the caller vouches for it). Returns df."""
+    df.attrs[NORMALIZED_ATTR] = True
+    return df
+
+
+def is_normalized(df: pd.DataFrame) -> bool:
+    """
+    True for a frame flagged by mark_normalized that still meets the contract: the columns and
+    dtypes, datetimes in order (which also rules out NaT) and no NaN values. O(n), vectorized.
+    """
+    return (bool(df.attrs.get(NORMALIZED_ATTR)) and list(df.columns) == ["datetime", "index"]
+            and df["datetime"].dtype == "datetime64[ns]" and df["index"].dtype == np.float64
+            and df["datetime"].is_monotonic_increasing and not np.isnan(df["index"].to_numpy()).any())
+
+
+def _sample_date_format(sample: pd.Series):
+    """
+    Explicit strptime format for a date column, guessed from its first non-null value the way
+    pd.to_datetime does, and kept only if it parses the sample as well as generic parsing does.
+    """
+    values = sample.dropna()
+    if values.empty or not isinstance(values.iloc[0], str):
+        return None
+    fmt = pd.tseries.api.guess_datetime_format(values.iloc[0])
+    if fmt is None:
+        return None
+    generic = pd.to_datetime(values, errors="coerce").notna().sum()
+    explicit = pd.to_datetime(values, format=fmt, errors="coerce").notna().sum()
+    return fmt if explicit >= generic else None
+
+
+def _parse_dates(col: pd.Series, fmt):
+    """
+    Date parse of a column (or chunk) with the sampled format. If that leaves more NaT than the
+    column has missing values (rows in another format, e.g. past the sample), the generic parse
+    of the whole column is used instead when it keeps more rows.
+    """
+    if fmt is None:
+        return pd.to_datetime(col, errors="coerce")
+    parsed = pd.to_datetime(col, format=fmt, errors="coerce")
+    valid = parsed.notna().sum()
+    if valid < col.notna().sum():
+        generic = pd.to_datetime(col, errors="coerce")
+        # Ties keep the sampled format: a chunk starting with e.g. 01/02 may guess day/month swapped
+        if generic.notna().sum() > valid:
+            return generic
+    return parsed
+
+
+class _Base64Stream(io.RawIOBase):
+    """Read-only byte stream that lazily decodes the base64 text of `payload` from offset `start`."""
+
+    def __init__(self, payload: str, start: int = 0):
+        self._payload = payload
+        self._pos = start
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        want = len(buf)
+        if len(self._pending) < want and self._pos < len(self._payload):
+            # 4 base64 chars -> 3 bytes; decode just enough for this read
+            take = -(-(want - len(self._pending)) // 3) * 4
+            chunk = self._payload[self._pos:self._pos + take]
+            self._pos += len(chunk)
+            self._pending += base64.b64decode(chunk)
+        n = min(want, len(self._pending))
+        buf[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def _naive_datetimes(dates: pd.Series) -> np.ndarray:
+    """Parsed dates as a tz-naive datetime64[ns] array (timezone-aware values converted to UTC)."""
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = dates.dt.tz_convert(None)
+    elif dates.dtype == object:
+        # Mixed UTC offsets: compare everything in UTC
+        dates = pd.to_datetime(dates, utc=True, errors="coerce").dt.tz_convert(None)
+    return dates.to_numpy(dtype="datetime64[ns]")
+
+
+def _payload_start(contents: str) -> int:
+    """Offset of the base64 text in a dcc.Upload data URL ("data:<mime>;base64,<payload>")."""
+    # An offset rather than a slice: slicing would copy the whole (possibly huge) string
+    comma = contents.find(",", 0, 1024)
+    if comma < 0:
+        raise ValueError("not a base64 data URL")
+    return comma + 1
+
+
+CSV_EXTENSIONS = (".csv", ".csv.gz", ".csv.bz2", ".csv.xz", ".zip")
+
+
+def _open_zip_member(data: bytes):
+    """Streaming reader for the CSV inside a zip archive (the only member, or the first *.csv one)."""
+    zf = zipfile.ZipFile(io.BytesIO(data))
+    members = [m for m in zf.infolist() if not m.is_dir()]
+    csv_members = [m for m in members if m.filename.lower().endswith(".csv")]
+    if csv_members:
+        return zf.open(csv_members[0])
+    if len(members) == 1:
+        return zf.open(members[0])
+    raise ValueError("the zip archive does not contain a .csv file")
+
+
+class _DataUrlSource:
+    """Uploaded file bytes carried in a dcc.Upload data URL (decoded lazily)."""
+
+    def __init__(self, contents: str):
+        self._contents = contents
+        self._start = _payload_start(contents)
+        self._data = None
+
+    @property
+    def size(self) -> int:
+        return (len(self._contents) - self._start) // 4 * 3 - self._contents[-2:].count("=")
+
+    def open(self):
+        return io.BufferedReader(_Base64Stream(self._contents, self._start), buffer_size=1 << 20)
+
+    def open_arrow(self):
+        import pyarrow as pa
+        if self._data is None:
+            with self.open() as stream:
+                self._data = stream.read()
+        return pa.BufferReader(self._data)
+
+
+class _FileSource:
+    """Uploaded file already on the server's disk (see uploads.py)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def open_arrow(self):
+        import pyarrow as pa
+        return pa.memory_map(self.path)
+
+
+def _open_upload(source, filename: str = ""):
+    """
+    Fresh stream over the bytes of an upload source, decompressed on the fly
+    when the filename ends in .gz / .bz2 / .xz / .zip.
+    """
+    raw = source.open()
+    name = (filename or "").lower()
+    if name.endswith(".gz"):
+        return gzip.open(raw, "rb")
+    if name.endswith(".bz2"):
+        return bz2.open(raw, "rb")
+    if name.endswith(".xz"):
+        return lzma.open(raw, "rb")
+    if name.endswith(".zip"):
+        # Zip needs random access to its central directory; the compressed bytes are small
+        return _open_zip_member(raw.read())
+    return raw
+
+
+def _stream_columns(source, filename: str, date_pos: int, num_pos: int, date_fmt, chunk_rows: int = None):
+    """
+    Parse the chosen date/numeric columns of an uploaded CSV chunk by chunk into preallocated
+    datetime64[ns] / float64 arrays, dropping invalid rows as they come. Chunks that no longer
+    fit the estimate are kept aside and joined once at the end.
+    Rows are sorted (stable) once at the end, only if they were not already in order.
+    Returns (datetimes, values, rows_read).
+    """
+    chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+
+    # Size the output from the average row length of the first MB of the file
+    # (a lower bound for compressed uploads - the rest goes to `overflow`)
+    with _open_upload(source, filename) as stream:
+        head = stream.read(1 << 20)
+    bytes_per_row = len(head) / max(head.count(b"\n"), 1)
+    capacity = int(source.size / max(bytes_per_row, 1.0) * 1.05) + 16
+    datetimes = np.empty(capacity, dtype="datetime64[ns]")
+    values = np.empty(capacity, dtype=float)
+
+    n = 0
+    rows_read = 0
+    in_order = True
+    last = None
+    overflow = []
+    # Positional usecols (header names may repeat); columns come back in file order
+    date_idx, num_idx = int(date_pos > num_pos), int(num_pos > date_pos)
+    with _open_upload(source, filename) as stream:
+        for chunk in pd.read_csv(stream, usecols=[date_pos, num_pos], chunksize=chunk_rows):
+            rows_read += len(chunk)
+            d = _naive_datetimes(_parse_dates(chunk.iloc[:, date_idx], date_fmt))
+            v = pd.to_numeric(chunk.iloc[:, num_idx], errors="coerce").to_numpy(dtype=float)
+            keep = ~np.isnat(d) & ~np.isnan(v)
+            d, v = d[keep], v[keep]
+            k = len(d)
+            if not k:
+                continue
+
+            if in_order and ((last is not None and d[0] < last) or (k > 1 and (d[1:] < d[:-1]).any())):
+                in_order = False
+            last = d[-1]
+            if overflow or n + k > capacity:
+                # Past the estimate: keep the chunk's own arrays instead of growing (copying) the buffers
+                overflow.append((d, v))
+                continue
+            datetimes[n:n + k] = d
+            values[n:n + k] = v
+            n += k
+
+    datetimes, values = datetimes[:n], values[:n]
+    if overflow:
+        datetimes = np.concatenate([datetimes] + [d for d, _ in overflow])
+        values = np.concatenate([values] + [v for _, v in overflow])
+        overflow.clear()
+    if not in_order:
+        order = np.argsort(datetimes, kind="stable")
+        datetimes, values = datetimes[order], values[order]
+    elif capacity > len(datetimes) * 1.25:
+        # Don't keep an oversized estimate alive behind the views
+        datetimes, values = datetimes.copy(), values.copy()
+    return datetimes, values, rows_read
+
+
+def _detect_columns(sample: pd.DataFrame, prefer_typed: bool = False):
+    """
+    Positions of the date and numeric columns in a sample frame: the first column ≥50% parseable
+    as dates, then the first other column ≥50% numeric. With prefer_typed (columnar files),
+    columns already stored as datetimes / numbers win over ones that merely parse as such.
+    Returns (date_pos, num_pos, error).
+    """
+    dtypes = list(sample.dtypes)
+    date_pos = None
+    if prefer_typed:
+        date_pos = next((i for i, t in enumerate(dtypes) if pd.api.types.is_datetime64_any_dtype(t)), None)
+    if date_pos is None:
+        for i in range(sample.shape[1]):
+            s = pd.to_datetime(sample.iloc[:, i], errors="coerce")
+            if s.notna().mean() >= 0.5:
+                date_pos = i
+                break
+    if date_pos is None:
+        return None, None, "Could not detect a date column."
+
+    num_pos = None
+    if prefer_typed:
+        num_pos = next((i for i, t in enumerate(dtypes) if i != date_pos and pd.api.types.is_numeric_dtype(t)
+                        and not pd.api.types.is_bool_dtype(t)), None)
+    if num_pos is None:
+        for i in range(sample.shape[1]):
+            if i == date_pos:
+                continue
+            s = pd.to_numeric(sample.iloc[:, i], errors="coerce")
+            if s.notna().mean() >= 0.5:
+                num_pos = i
+                break
+    if num_pos is None:
+        return None, None, "Could not detect a numeric column."
+    return date_pos, num_pos, None
 
 
 def parse_csv_flexible(contents: str, filename: str):
     """
     Accept TWO columns: one date/time-like and one numeric (names can be anything).
     Detect them and normalize to ['datetime','index'].
+    .csv.gz / .csv.bz2 / .csv.xz / .zip uploads are decompressed as a stream.
+    Detection runs on the first CSV_SAMPLE_ROWS rows; the two chosen columns are then
+    streamed in CSV_CHUNK_ROWS chunks (see _stream_columns), so peak memory stays close
+    to the size of the final columns rather than a multiple of the upload.
     """
-    if not filename or not filename.lower().endswith(".csv"):
-        return None, [], f"Please upload a CSV file. You uploaded: {filename}"
+    if not filename or not filename.lower().endswith(CSV_EXTENSIONS):
+        return None, [], f"Please upload a CSV (optionally .gz/.bz2/.xz/.zip compressed), Parquet, Feather or Arrow file. You uploaded: {filename}"
+    try:
+        source = _DataUrlSource(contents)
+    except Exception as e:
+        return None, [], f"Failed to read CSV: {e}"
+    return _parse_csv_source(source, filename)
 
+
+def _parse_csv_source(source, filename: str):
+    """parse_csv_flexible for any upload source (_DataUrlSource / _FileSource)."""
     try:
-        _, content_string = contents.split(",")
-        decoded = base64.b64decode(content_string)
-        df0 = pd.read_csv(io.BytesIO(decoded))
+        with _open_upload(source, filename) as stream:
+            sample = pd.read_csv(stream, nrows=CSV_SAMPLE_ROWS)
     except Exception as e:
         return None, [], f"Failed to read CSV: {e}"
 
-    if df0.empty:
+    if sample.empty:
         return None, [], "The CSV appears to be empty."
-    if df0.shape[1] < 2:
+    if sample.shape[1] < 2:
         return None, [], "CSV must have at least two columns (a date column and a numeric column)."
 
     warnings = []
 
-    # Find date-like column (≥50% parseable)
-    date_col = None
-    for c in df0.columns:
-        s = pd.to_datetime(df0[c], errors="coerce", infer_datetime_format=True)
-        if s.notna().mean() >= 0.5:
-            date_col = c
-            break
-    if date_col is None:
-        return None, [], "Could not detect a date column."
-
-    # Find numeric column (≥50% numeric)
-    num_col = None
-    for c in df0.columns:
-        if c == date_col:
-            continue
-        s = pd.to_numeric(df0[c], errors="coerce")
-        if s.notna().mean() >= 0.5:
-            num_col = c
-            break
-    if num_col is None:
-        return None, [], "Could not detect a numeric column."
-
-    df = pd.DataFrame({
-        "datetime": pd.to_datetime(df0[date_col], errors="coerce"),
-        "index": pd.to_numeric(df0[num_col], errors="coerce")
-    })
-    before = len(df)
-    df = df.dropna(subset=["datetime", "index"]).sort_values("datetime").reset_index(drop=True)
-    dropped = before - len(df)
+    date_pos, num_pos, err = _detect_columns(sample)
+    if err:
+        return None, [], err
+
+    date_fmt = _sample_date_format(sample.iloc[:, date_pos])
+
+    try:
+        datetimes, values, rows_read = _stream_columns(source, filename, date_pos, num_pos, date_fmt)
+    except Exception as e:
+        return None, [], f"Failed to read CSV: {e}"
+
+    df = mark_normalized(pd.DataFrame({"datetime": datetimes, "index": values}, copy=False))
+    dropped = rows_read - len(df)
     if dropped > 0:
         warnings.append(f"Dropped {dropped} rows with invalid/missing values.")
     return df, warnings, None
 
 
+COLUMNAR_EXTENSIONS = (".parquet", ".pq", ".feather", ".arrow", ".ipc", ".arrows")
+
+
+def _open_columnar(source, filename: str):
+    """
+    (sample pyarrow.Table, read(positions) -> pyarrow.Table) for a Parquet / Feather / Arrow IPC
+    upload. Parquet reads only the requested columns; IPC tables are zero-copy over the source.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from pyarrow import feather
+
+    if filename.lower().endswith((".parquet", ".pq")):
+        pf = pq.ParquetFile(source.open_arrow())
+        names = pf.schema_arrow.names
+        batch = next(pf.iter_batches(batch_size=CSV_SAMPLE_ROWS), None)
+        sample = pa.Table.from_batches([batch]) if batch is not None else pf.schema_arrow.empty_table()
+        return sample, lambda positions: pf.read(columns=[names[i] for i in positions])
+
+    try:
+        # Feather v1/v2 and the Arrow IPC file format
+        table = feather.read_table(source.open_arrow())
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_stream(source.open_arrow()).read_all()
+    return table.slice(0, CSV_SAMPLE_ROWS), lambda positions: table.select(list(positions))
+
+
+def parse_columnar_upload(contents: str, filename: str):
+    """
+    Parquet / Feather / Arrow IPC counterpart of parse_csv_flexible: same two-column detection
+    (natively typed datetime/numeric columns preferred) and ['datetime','index'] output.
+    Typed columns are converted without any text parsing; string date columns fall back to
+    the sampled-format parse used for CSV.
+    """
+    try:
+        source = _DataUrlSource(contents)
+    except Exception as e:
+        return None, [], f"Failed to read {filename}: {e}"
+    return _parse_columnar_source(source, filename)
+
+
+def _parse_columnar_source(source, filename: str):
+    """parse_columnar_upload for any upload source (_DataUrlSource / _FileSource)."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None, [], "Parquet/Feather/Arrow uploads need the 'pyarrow' package on the server."
+
+    try:
+        sample_table, read_columns = _open_columnar(source, filename)
+        sample = sample_table.to_pandas(date_as_object=False)
+    except Exception as e:
+        return None, [], f"Failed to read {filename}: {e}"
+
+    if sample.empty:
+        return None, [], "The file appears to be empty."
+    if sample.shape[1] < 2:
+        return None, [], "The file must have at least two columns (a date column and a numeric column)."
+
+    date_pos, num_pos, err = _detect_columns(sample, prefer_typed=True)
+    if err:
+        return None, [], err
+
+    try:
+        table = read_columns(sorted((date_pos, num_pos)))
+        date_raw = table.column(int(date_pos > num_pos)).to_pandas(date_as_object=False)
+        num_raw = table.column(int(num_pos > date_pos)).to_pandas()
+        del table
+        if pd.api.types.is_datetime64_any_dtype(date_raw.dtype):
+            d = _naive_datetimes(date_raw)
+        else:
+            d = _naive_datetimes(_parse_dates(date_raw, _sample_date_format(sample.iloc[:, date_pos])))
+        v = pd.to_numeric(num_raw, errors="coerce").to_numpy(dtype=float)
+    except Exception as e:
+        return None, [], f"Failed to read {filename}: {e}"
+
+    rows_read = len(d)
+    keep = ~np.isnat(d) & ~np.isnan(v)
+    d, v = d[keep], v[keep]
+    if len(d) > 1 and (d[1:] < d[:-1]).any():
+        order = np.argsort(d, kind="stable")
+        d, v = d[order], v[order]
+
+    warnings = []
+    df = mark_normalized(pd.DataFrame({"datetime": d, "index": v}, copy=False))
+    dropped = rows_read - len(df)
+    if dropped > 0:
+        warnings.append(f"Dropped {dropped} rows with invalid/missing values.")
+    return df, warnings, None
+
+
+def parse_upload(contents: str, filename: str):
+    """Parse a dcc.Upload file by extension: Parquet/Feather/Arrow IPC or CSV. Returns (df, warnings, error)."""
+    if filename and filename.lower().endswith(COLUMNAR_EXTENSIONS):
+        return parse_columnar_upload(contents, filename)
+    return parse_csv_flexible(contents, filename)
+
+
+def parse_upload_file(path: str, filename: str):
+    """parse_upload for a file already on disk (chunked uploads); `filename` selects the format."""
+    if filename and filename.lower().endswith(COLUMNAR_EXTENSIONS):
+        return _parse_columnar_source(_FileSource(path), filename)
+    if not filename or not filename.lower().endswith(CSV_EXTENSIONS):
+        return None, [], f"Please upload a CSV (optionally .gz/.bz2/.xz/.zip compressed), Parquet, Feather or Arrow file. You uploaded: {filename}"
+    return _parse_csv_source(_FileSource(path), filename)
+
+
 def compute_range(preset: str, start_date, end_date, data_min: pd.Timestamp, data_max: pd.Timestamp, snap_month: bool):
     """
     Resolve (start, end) timestamps based on a preset or DatePickerRange values.
@@ -127,6 +525,97 @@ def end_trade_day_with_buffer(start: pd.Timestamp, window_size_days: int,
     return tentative
 
 
+def end_trade_days_with_buffer(days: np.ndarray, window_size_days: int,
+                               buffer_minus: int = 1, buffer_plus: int = 1) -> np.ndarray:
+    """
+    Array version of end_trade_day_with_buffer.
+    Takes a datetime64 array, returns the weekend-aware last trading days as datetime64[D].
+    NaT inputs stay NaT.
+    """
+    days = np.asarray(days).astype("datetime64[D]")
+    tentative = days + np.timedelta64(max(int(window_size_days) - 1, 0), "D")
+
+    # 1970-01-01 was a Thursday, so Monday=0 … Sunday=6 is (epoch_days + 3) % 7
+    weekday = (tentative.view("int64") + 3) % 7
+    shift = np.where(weekday == 5, -int(buffer_minus), np.where(weekday == 6, int(buffer_plus), 0))
+    out = tentative + shift.astype("timedelta64[D]")
+    out[np.isnat(days)] = np.datetime64("NaT")
+    return out
+
+
+def window_end_positions(days: np.ndarray, window_size_days: int) -> np.ndarray:
+    """
+    For each row of a sorted datetime64[D] array, position of the latest row whose day is
+    <= that row's weekend-aware last trading day (-1 if none).
+    With duplicate days this is the last row of the matching day.
+    """
+    end_days = end_trade_days_with_buffer(days, window_size_days)
+    return np.searchsorted(days, end_days, side="right") - 1
+
+
+def _normalize_for_returns(df: pd.DataFrame) -> pd.DataFrame:
+    """Day-normalized, NaN-free, datetime-sorted copy of ['datetime','index'] used by the return kernels."""
+    df = df[["datetime", "index"]].copy()
+    df["datetime"] = pd.to_datetime(df["datetime"]).dt.normalize()
+    # Stable: rows of the same day keep their order (the day-normalized keys tie)
+    return df.dropna(subset=["datetime", "index"]).sort_values("datetime", kind="stable").reset_index(drop=True)
+
+
+def compute_windowed_returns_matrix(df: pd.DataFrame, windows) -> np.ndarray:
+    """
+    Weekend-aware calendar returns for many window sizes in one pass.
+    Normalizes/sorts df once and returns a float array of shape (rows, len(windows)),
+    row i aligned with the i-th row of the sorted, NaN-free frame.
+    Each column matches compute_windowed_returns_calendar for that window.
+    """
+    windows = [max(int(w or 1), 1) for w in windows]
+    if df.empty:
+        return np.empty((0, len(windows)), dtype=float)
+    if is_normalized(df):
+        return windowed_returns_from_arrays(df["datetime"].to_numpy(), df["index"].to_numpy(), windows)
+
+    df = _normalize_for_returns(df)
+    return windowed_returns_from_arrays(df["datetime"].to_numpy(),
+                                        pd.to_numeric(df["index"], errors="coerce").to_numpy(dtype=float), windows)
+
+
+def windowed_returns_from_arrays(datetimes: np.ndarray, values: np.ndarray, windows) -> np.ndarray:
+    """
+    compute_windowed_returns_matrix on arrays that are already sorted and NaN-free, e.g. the
+    memory-mapped columns of a registry dataset (datasets.open_series_file); they are read,
+    never copied. datetimes may be datetime64 or int64 nanoseconds.
+    """
+    windows = [max(int(w or 1), 1) for w in windows]
+    datetimes = np.asarray(datetimes)
+    if datetimes.dtype.kind != "M":
+        datetimes = datetimes.view("datetime64[ns]")
+    vals_arr = np.asarray(values, dtype=float)
+    n = len(vals_arr)
+    days = datetimes.astype("datetime64[D]")
+    pos = np.arange(n)
+
+    out = np.full((n, len(windows)), np.nan, dtype=float)
+    for k, ws in enumerate(windows):
+        # Special handling for 1-day returns: use backward-looking pct_change
+        # This computes (today / yesterday) - 1, which is the standard daily return
+        if ws == 1:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[1:, k] = vals_arr[1:] / vals_arr[:-1] - 1.0
+            continue
+
+        end_pos = window_end_positions(days, ws)
+
+        # Keep only windows whose end lies strictly after the start row and whose
+        # start/end values make a finite, non-zero ratio.
+        valid = end_pos > pos
+        start_vals = vals_arr[valid]
+        end_vals = vals_arr[end_pos[valid]]
+        ok = np.isfinite(start_vals) & np.isfinite(end_vals) & (start_vals != 0)
+        out[pos[valid][ok], k] = end_vals[ok] / start_vals[ok] - 1.0
+
+    return out
+
+
 def compute_windowed_returns_calendar(df: pd.DataFrame, window_size_days: int) -> pd.Series:
     """
     Compute % change using a calendar-day window with weekend-aware snapping.
@@ -139,60 +628,18 @@ def compute_windowed_returns_calendar(df: pd.DataFrame, window_size_days: int) -
     if df.empty:
         return pd.Series(dtype=float)
 
-    df = df.copy()
-    df["datetime"] = pd.to_datetime(df["datetime"]).dt.normalize()
-    df = df.dropna(subset=["datetime", "index"]).sort_values("datetime").reset_index(drop=True)
-
     ws = max(int(window_size_days or 1), 1)
-    vals = pd.to_numeric(df["index"], errors="coerce")
-    
-    # Special handling for 1-day returns: use backward-looking pct_change
-    # This computes (today / yesterday) - 1, which is the standard daily return
-    if ws == 1:
-        rets = vals.pct_change(1).values
-        return pd.Series(rets, index=df.index, name="ret_1d_cal")
-
-    dates = df["datetime"]
-
-    # Map unique day -> last row pos
-    date_to_lastpos = {}
-    for pos, day in enumerate(dates):
-        date_to_lastpos[day] = pos
-    unique_days = dates.drop_duplicates().reset_index(drop=True)
-
-    def pos_leq_day(target_day: pd.Timestamp):
-        # rightmost unique_days[idx] <= target_day
-        left, right = 0, len(unique_days) - 1
-        ans = -1
-        while left <= right:
-            mid = (left + right) // 2
-            if unique_days[mid] <= target_day:
-                ans = mid
-                left = mid + 1
-            else:
-                right = mid - 1
-        if ans == -1:
-            return None
-        return date_to_lastpos[unique_days[ans]]
-
-    rets = np.full(len(df), np.nan, dtype=float)
-    vals_arr = vals.values
-
-    for i in range(len(df)):
-        start_day = dates.iloc[i]
-        end_day = end_trade_day_with_buffer(start_day, ws)
-        j = pos_leq_day(end_day)
-        if j is None or j <= i:
-            continue
-        if np.isfinite(vals_arr[i]) and np.isfinite(vals_arr[j]) and vals_arr[i] != 0:
-            rets[i] = (vals_arr[j] / vals_arr[i]) - 1.0
+    rets = compute_windowed_returns_matrix(df, [ws])[:, 0]
+    name = "ret_1d_cal" if ws == 1 else f"ret_{ws}d_cal"
+    return pd.Series(rets, index=pd.RangeIndex(len(rets)), name=name)
 
-    return pd.Series(rets, index=df.index, name=f"ret_{ws}d_cal")
 
-
-def ema(s: pd.Series, span: int):
-    """Exponential Moving Average"""
-    return s.ewm(span=span, adjust=False).mean()
+def ema(s: pd.Series, span: int, seed: float = None):
+    """Exponential Moving Average (continuing from `seed`, the EMA of the row before s, if given)"""
+    if seed is None or np.isnan(seed):
+        return s.ewm(span=span, adjust=False).mean()
+    seeded = pd.concat([pd.Series([seed]), s], ignore_index=True).ewm(span=span, adjust=False).mean()
+    return pd.Series(seeded.to_numpy()[1:], index=s.index)
 
 
 def rsi(series: pd.Series, period: int = 14):
@@ -205,167 +652,353 @@ def rsi(series: pd.Series, period: int = 14):
     return out
 
 
-def bbands_mid_upper_lower(price: pd.Series, window: int = 20, k: float = 2.0):
-    """Bollinger Bands"""
-    mid = price.rolling(window).mean()
-    std = price.rolling(window).std()
-    upper = mid + k * std
-    lower = mid - k * std
-    return mid, upper, lower
-
-
-def compute_calendar_return_series(df: pd.DataFrame, window_size_days: int) -> pd.Series:
-    """
-    Wrapper that returns weekend-aware calendar returns aligned to df.index,
-    using compute_windowed_returns_calendar.
-    """
-    return compute_windowed_returns_calendar(df[["datetime","index"]].copy(), window_size_days)
-
-
-def build_indicators(df: pd.DataFrame, price_col="index"):
-    """
-    Builds a feature table.
-    Weekend-aware for ret_5, ret_10, mom_10 via compute_windowed_returns_calendar.
-    Other rolling features operate on available trading days.
-    """
-    out = pd.DataFrame(index=df.index)
-    p = pd.to_numeric(df[price_col], errors="coerce").astype(float)
+# Indicator registry: name -> (inputs, fn(*input_values)).
+# Inputs are other registry entries; "_price" (numeric price series), "_frame" (the
+# ['datetime','index'] frame) and "_seed" (recursive state carried over from earlier rows,
+# see extend_indicators) are seeded by build_indicators. Names starting with "_"
+# are shared intermediates and never appear in the output.
+INDICATOR_SPECS = {
+    "_cal":          (("_frame",), lambda df: compute_windowed_returns_matrix(df, [5, 10])),
+    "_bb_std":       (("_price",), lambda p: p.rolling(20).std()),
+    "_drawdown":     (("_price", "_seed"), lambda p, seed: p / np.maximum(p.cummax(), seed.get("_cum_max", -np.inf)) - 1.0),
 
     # returns, momentum & volatility
-    out["ret_1"]  = p.pct_change(1)
-
-    # weekend-aware multi-day returns
-    out["ret_5"]  = compute_calendar_return_series(df, 5)
-    out["ret_10"] = compute_calendar_return_series(df, 10)
+    "ret_1":         (("_price",), lambda p: p.pct_change(1)),
+    # weekend-aware multi-day returns (both windows in one pass via _cal)
+    "ret_5":         (("_cal", "_price"), lambda cal, p: pd.Series(cal[:, 0], index=pd.RangeIndex(len(cal))).reindex(p.index)),
+    "ret_10":        (("_cal", "_price"), lambda cal, p: pd.Series(cal[:, 1], index=pd.RangeIndex(len(cal))).reindex(p.index)),
     # momentum over 10 calendar days == ret_10
-    out["mom_10"] = out["ret_10"]
-
+    "mom_10":        (("ret_10",), lambda r: r),
     # volatility based on daily returns (trading-day based)
-    out["vol_20"] = out["ret_1"].rolling(20).std()
-    out["vol_60"] = out["ret_1"].rolling(60).std()
+    "vol_20":        (("ret_1",), lambda r: r.rolling(20).std()),
+    "vol_60":        (("ret_1",), lambda r: r.rolling(60).std()),
 
     # moving averages
-    out["sma_5"]   = p.rolling(5).mean()
-    out["sma_20"]  = p.rolling(20).mean()
-    out["ema_12"]  = ema(p, 12)
-    out["ema_26"]  = ema(p, 26)
+    "sma_5":         (("_price",), lambda p: p.rolling(5).mean()),
+    "sma_20":        (("_price",), lambda p: p.rolling(20).mean()),
+    "ema_12":        (("_price", "_seed"), lambda p, seed: ema(p, 12, seed.get("ema_12"))),
+    "ema_26":        (("_price", "_seed"), lambda p, seed: ema(p, 26, seed.get("ema_26"))),
 
     # MACD family
-    macd_line = out["ema_12"] - out["ema_26"]
-    macd_sig  = ema(macd_line, 9)
-    out["macd"]      = macd_line
-    out["macd_sig"]  = macd_sig
-    out["macd_hist"] = macd_line - macd_sig
+    "macd":          (("ema_12", "ema_26"), lambda e12, e26: e12 - e26),
+    "macd_sig":      (("macd", "_seed"), lambda m, seed: ema(m, 9, seed.get("macd_sig"))),
+    "macd_hist":     (("macd", "macd_sig"), lambda m, s: m - s),
 
     # RSI
-    out["rsi_14"] = rsi(p, 14)
+    "rsi_14":        (("_price",), lambda p: rsi(p, 14)),
 
-    # Bollinger
-    mid, up, lo = bbands_mid_upper_lower(p, 20, 2.0)
-    out["bb_mid"]   = mid
-    out["bb_up"]    = up
-    out["bb_lo"]    = lo
-    out["bb_width"] = (up - lo) / mid
-    out["bb_pos"]   = (p - mid) / (up - lo)
+    # Bollinger (20, 2)
+    "bb_mid":        (("_price",), lambda p: p.rolling(20).mean()),
+    "bb_up":         (("bb_mid", "_bb_std"), lambda mid, std: mid + 2.0 * std),
+    "bb_lo":         (("bb_mid", "_bb_std"), lambda mid, std: mid - 2.0 * std),
+    "bb_width":      (("bb_up", "bb_lo", "bb_mid"), lambda up, lo, mid: (up - lo) / mid),
+    "bb_pos":        (("_price", "bb_mid", "bb_up", "bb_lo"), lambda p, mid, up, lo: (p - mid) / (up - lo)),
 
     # drawdown features
-    rolling_max = p.cummax()
-    drawdown = p / rolling_max - 1.0
-    out["dd"]       = drawdown
-    out["dd_20"]    = (p / p.rolling(20).max() - 1.0)
-    out["dd_speed"] = drawdown.diff()
+    "dd":            (("_drawdown",), lambda d: d),
+    "dd_20":         (("_price",), lambda p: p / p.rolling(20).max() - 1.0),
+    "dd_speed":      (("_drawdown",), lambda d: d.diff()),
 
     # combos
-    out["sma_gap_5_20"]  = out["sma_5"] / out["sma_20"] - 1.0
-    out["ema_gap_12_26"] = out["ema_12"] / out["ema_26"] - 1.0
+    "sma_gap_5_20":  (("sma_5", "sma_20"), lambda s5, s20: s5 / s20 - 1.0),
+    "ema_gap_12_26": (("ema_12", "ema_26"), lambda e12, e26: e12 / e26 - 1.0),
+}
+
+INDICATOR_COLUMNS = [name for name in INDICATOR_SPECS if not name.startswith("_")]
+
+# Recursive features: extend_indicators continues them from their value on the row before
+# the recomputed tail (the running max behind drawdowns is taken from the prices directly)
+INDICATOR_SEEDED = ("ema_12", "ema_26", "macd_sig")
+# Rows of history the windowed features need (vol_60 on 1-day returns is the longest)
+INDICATOR_WARMUP_ROWS = 64
+# Longest weekend-aware return window among the features (ret_10 / mom_10)
+INDICATOR_MAX_CAL_WINDOW = 10
+
+# indicators-select option -> feature columns its charts read
+INDICATOR_GROUPS = {
+    "sma":  ["sma_5", "sma_20"],
+    "ema":  ["ema_12", "ema_26"],
+    "bb":   ["bb_mid", "bb_up", "bb_lo"],
+    "rsi":  ["rsi_14"],
+    "macd": ["macd", "macd_sig", "macd_hist"],
+    "vol":  ["vol_20"],
+    "dd":   ["dd"],
+}
+
+
+def indicator_columns_for(selected) -> list:
+    """Feature columns needed to draw the given indicators-select values."""
+    cols = []
+    for group in selected or []:
+        cols.extend(c for c in INDICATOR_GROUPS.get(group, []) if c not in cols)
+    return cols
+
+
+def _indicator_inputs(columns) -> set:
+    """Every INDICATOR_SPECS entry needed to compute columns (columns included)."""
+    needed, stack = set(), list(columns)
+    while stack:
+        name = stack.pop()
+        if name in INDICATOR_SPECS and name not in needed:
+            needed.add(name)
+            stack.extend(INDICATOR_SPECS[name][0])
+    return needed
+
+
+def build_indicators(df: pd.DataFrame, price_col="index", columns=None, seed: dict = None):
+    """
+    Builds a feature table.
+    Weekend-aware for ret_5, ret_10, mom_10 via compute_windowed_returns_matrix.
+    Other rolling features operate on available trading days.
+
+    `columns` limits the output to those features (default: all of INDICATOR_COLUMNS);
+    only they and their INDICATOR_SPECS inputs are computed, each intermediate once.
+    `seed` carries recursive state into df's first row (INDICATOR_SEEDED values and
+    "_cum_max" of the preceding rows); see extend_indicators.
+    """
+    requested = INDICATOR_COLUMNS if columns is None else list(columns)
+    unknown = [c for c in requested if c not in INDICATOR_SPECS]
+    if unknown:
+        raise ValueError(f"Unknown indicator(s): {unknown}. Available: {INDICATOR_COLUMNS}")
+
+    values = {
+        "_price": df[price_col] if is_normalized(df) else pd.to_numeric(df[price_col], errors="coerce").astype(float),
+        "_frame": df,
+        "_seed": seed or {},
+    }
+
+    def compute(name):
+        if name not in values:
+            inputs, fn = INDICATOR_SPECS[name]
+            values[name] = fn(*[compute(dep) for dep in inputs])
+        return values[name]
 
+    out = pd.DataFrame(index=df.index)
+    for name in INDICATOR_COLUMNS:
+        if name in requested:
+            out[name] = compute(name)
     return out
 
 
-def drop_event_analysis(df: pd.DataFrame, minimum_per_drop: float, windows_size: int):
+def sorted_returns(returns) -> np.ndarray:
+    """
+    Sorted, NaN-free copy of a return series: the structure behind the exceedance queries.
+    Build it once per window and answer any number of thresholds with count_exceedances.
+    """
+    arr = np.asarray(returns, dtype=float)
+    return np.sort(arr[~np.isnan(arr)])
+
+
+def count_exceedances(sorted_rets: np.ndarray, thresholds, mode: str = "drop") -> np.ndarray:
+    """
+    Number of returns at or beyond each threshold (fractions, e.g. 0.05 for 5%),
+    via one bulk binary search over sorted_returns(...).
+    - mode='drop': count of ret <= -threshold
+    - mode='gain': count of ret >= threshold
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    if mode == "gain":
+        return len(sorted_rets) - np.searchsorted(sorted_rets, thresholds, side="left")
+    return np.searchsorted(sorted_rets, -thresholds, side="right")
+
+
+def exceedance_curve(sorted_rets: np.ndarray, mode: str = "drop", step_pct: float = 0.1, max_pct: float = 50.0):
+    """
+    Survival curve of |move| for drops or gains.
+    Returns (thresholds_pct, counts, probabilities_pct) on a grid step_pct, 2*step_pct, …, max_pct.
+    """
+    n_steps = int(round(max_pct / step_pct))
+    thresholds_pct = np.arange(1, n_steps + 1) * step_pct
+    counts = count_exceedances(sorted_rets, thresholds_pct / 100.0, mode)
+    n = len(sorted_rets)
+    probs_pct = counts / n * 100.0 if n > 0 else np.zeros(len(counts), dtype=float)
+    return thresholds_pct, counts, probs_pct
+
+
+def drop_event_analysis(df: pd.DataFrame, minimum_per_drop: float, windows_size: int,
+                        returns: pd.Series = None, exceedance: np.ndarray = None):
     """
     Count drop events using weekend-aware windowed returns.
+    Pass `returns` to reuse an already computed compute_windowed_returns_calendar(df, windows_size),
+    or `exceedance` to reuse its sorted_returns(...).
     """
-    ret = compute_windowed_returns_calendar(df, windows_size)
-    ret = ret.dropna()
-    crossings = (ret <= -minimum_per_drop)
-    total_events = int(crossings.sum())
-    denom = max(len(ret), 1)
+    if exceedance is None:
+        ret = compute_windowed_returns_calendar(df, windows_size) if returns is None else returns
+        exceedance = sorted_returns(ret)
+    total_events = int(count_exceedances(exceedance, [minimum_per_drop], "drop")[0])
+    denom = max(len(exceedance), 1)
     prob = total_events / denom
     key = f"{windows_size} days and {minimum_per_drop * 100:.0f}% minimum percentage drop"
     return {key: {"events": total_events, "probability": f"{prob:.2%}"}}
 
 
-def gain_event_analysis(df: pd.DataFrame, minimum_per_gain: float, windows_size: int):
+def gain_event_analysis(df: pd.DataFrame, minimum_per_gain: float, windows_size: int,
+                        returns: pd.Series = None, exceedance: np.ndarray = None):
     """
     Count gain events using weekend-aware windowed returns.
+    Pass `returns` to reuse an already computed compute_windowed_returns_calendar(df, windows_size),
+    or `exceedance` to reuse its sorted_returns(...).
     """
-    ret = compute_windowed_returns_calendar(df, windows_size)
-    ret = ret.dropna()
-    crossings = (ret >= minimum_per_gain)
-    total_events = int(crossings.sum())
-    denom = max(len(ret), 1)
+    if exceedance is None:
+        ret = compute_windowed_returns_calendar(df, windows_size) if returns is None else returns
+        exceedance = sorted_returns(ret)
+    total_events = int(count_exceedances(exceedance, [minimum_per_gain], "gain")[0])
+    denom = max(len(exceedance), 1)
     prob = total_events / denom
     key = f"{windows_size} days and {minimum_per_gain * 100:.0f}% minimum percentage gain"
     return {key: {"events": total_events, "probability": f"{prob:.2%}"}}
 
 
-def build_trade_window_table(df: pd.DataFrame, window_size_days: int, limit: int = 200):
+# Server-side trade-window frames backing the custom-paged tables, keyed by table key.
+TRADE_WINDOW_COLUMNS = [
+    ("start", "Start (first day of trade)"),
+    ("last_trade_day", "Last day of trade (weekend-aware)"),
+    ("actual_end", "Actual end in data (<= last trade day)"),
+]
+# Shared with other processes: tables are built in background jobs and paged by the web worker
+# Kept in the persistent store with the analyses whose tables point at them (see stored_views_available)
+_TRADE_WINDOW_FRAMES = SharedStore("trade_windows", max_local=32, expire=VIEW_DATA_TTL_SECONDS, cache=RESULT_CACHE)
+
+
+def compute_trade_windows(df: pd.DataFrame, window_size_days: int) -> pd.DataFrame:
     """
-    Table of start date, weekend-aware last trade day, and actual end present in data (<= last trade day).
+    Start date, weekend-aware last trade day, and actual end present in data (<= last trade day)
+    for every row, as datetime64 columns ['start','last_trade_day','actual_end'].
     """
     if df.empty:
-        return html.Div()
-
-    df = df.copy()
-    df["datetime"] = pd.to_datetime(df["datetime"]).dt.normalize()
-    df = df.dropna(subset=["datetime", "index"]).sort_values("datetime").reset_index(drop=True)
-
-    dates = df["datetime"]
-
-    # Map unique days to last position
-    date_to_lastpos = {}
-    for pos, day in enumerate(dates):
-        date_to_lastpos[day] = pos
-    unique_days = dates.drop_duplicates().reset_index(drop=True)
-
-    def pos_leq_day(target_day: pd.Timestamp):
-        left, right = 0, len(unique_days) - 1
-        ans = -1
-        while left <= right:
-            mid = (left + right) // 2
-            if unique_days[mid] <= target_day:
-                ans = mid
-                left = mid + 1
-            else:
-                right = mid - 1
-        if ans == -1:
-            return None
-        return date_to_lastpos[unique_days[ans]]
+        return pd.DataFrame({c: pd.Series(dtype="datetime64[ns]") for c, _ in TRADE_WINDOW_COLUMNS})
 
+    if not is_normalized(df):
+        df = _normalize_for_returns(df)
     ws = max(int(window_size_days or 1), 1)
-    rows = []
-    for i in range(len(df)):
-        start_day = dates.iloc[i]
-        last_trade_day = end_trade_day_with_buffer(start_day, ws)
-        j = pos_leq_day(last_trade_day)
-        actual_end = dates.iloc[j] if (j is not None and j > i) else pd.NaT
-        rows.append({
-            "Start (first day of trade)": start_day.date(),
-            "Last day of trade (weekend-aware)": last_trade_day.date() if pd.notna(last_trade_day) else None,
-            "Actual end in data (<= last trade day)": actual_end.date() if pd.notna(actual_end) else None,
-        })
-
-    df_out = pd.DataFrame(rows)
-    if limit and len(df_out) > limit:
-        df_out = df_out.head(limit)
+    days = df["datetime"].values.astype("datetime64[D]")
+    end_pos = window_end_positions(days, ws)
+
+    actual_end = np.full(len(days), np.datetime64("NaT"), dtype="datetime64[D]")
+    valid = end_pos > np.arange(len(days))
+    actual_end[valid] = days[end_pos[valid]]
+
+    return pd.DataFrame({
+        "start": days.astype("datetime64[ns]"),
+        "last_trade_day": end_trade_days_with_buffer(days, ws).astype("datetime64[ns]"),
+        "actual_end": actual_end.astype("datetime64[ns]"),
+    })
+
+
+def _date_prefix_bounds(value: str):
+    """'2020' / '2020-03' / '2020-03-15' → [start, stop) timestamps covering that prefix."""
+    value = value.strip()
+    start = pd.Timestamp(value)
+    if len(value) == 4:
+        return start, start + pd.DateOffset(years=1)
+    if len(value) == 7:
+        return start, start + pd.DateOffset(months=1)
+    return start, start + pd.Timedelta(days=1)
+
+
+_FILTER_COMPARISONS = {
+    "=": operator.eq, "eq": operator.eq,
+    "!=": operator.ne, "ne": operator.ne,
+    "<": operator.lt, "lt": operator.lt,
+    "<=": operator.le, "le": operator.le,
+    ">": operator.gt, "gt": operator.gt,
+    ">=": operator.ge, "ge": operator.ge,
+}
+
+
+def _filter_trade_windows(frame: pd.DataFrame, filter_query: str) -> pd.DataFrame:
+    """Apply a DataTable filter_query ('{col} op value && ...') to a trade-window frame."""
+    if not filter_query:
+        return frame
+
+    mask = np.ones(len(frame), dtype=bool)
+    for part in filter_query.split(" && "):
+        part = part.strip()
+        if not part.startswith("{") or "}" not in part:
+            continue
+        col, rest = part[1:].split("}", 1)
+        if col not in frame.columns:
+            continue
+        op, _, value = rest.strip().partition(" ")
+        value = value.strip().strip("'\"`")
+        col_vals = frame[col]
+        try:
+            if op == "datestartswith":
+                lo, hi = _date_prefix_bounds(value)
+                mask &= ((col_vals >= lo) & (col_vals < hi)).to_numpy()
+            elif op == "contains":
+                text = col_vals.dt.strftime("%Y-%m-%d")
+                mask &= text.str.contains(value, regex=False, na=False).to_numpy()
+            elif op in _FILTER_COMPARISONS:
+                mask &= _FILTER_COMPARISONS[op](col_vals, pd.Timestamp(value)).to_numpy()
+        except (ValueError, TypeError):
+            # Unparseable date in the filter box → no rows match
+            mask[:] = False
+    return frame[mask]
+
+
+def page_trade_windows(frame: pd.DataFrame, page_current: int, page_size: int,
+                       sort_by=None, filter_query: str = ""):
+    """
+    Filter, sort and slice a trade-window frame server-side.
+    Returns (records for the requested page, page_count).
+    """
+    view = _filter_trade_windows(frame, filter_query)
+    if sort_by:
+        view = view.sort_values(
+            [s["column_id"] for s in sort_by],
+            ascending=[s["direction"] == "asc" for s in sort_by],
+            kind="stable",
+            na_position="last",
+        )
+
+    page_size = max(int(page_size or 20), 1)
+    page_count = max(int(np.ceil(len(view) / page_size)), 1)
+    page_current = min(max(int(page_current or 0), 0), page_count - 1)
+    page = view.iloc[page_current * page_size:(page_current + 1) * page_size]
+
+    text = page.apply(lambda col: col.dt.strftime("%Y-%m-%d"))
+    rows = text.astype(object).where(text.notna(), None).to_dict("records")
+    return rows, page_count
+
+
+def get_trade_windows(key: str):
+    """Trade-window frame stored for a table key, or None if it expired."""
+    return _TRADE_WINDOW_FRAMES.get(key)
+
+
+def _remember_trade_windows(frame: pd.DataFrame) -> str:
+    key = uuid.uuid4().hex
+    _TRADE_WINDOW_FRAMES.set(key, frame)
+    return key
+
+
+def build_trade_window_table(df: pd.DataFrame, window_size_days: int, page_size: int = 20):
+    """
+    Server-paged table of start date, weekend-aware last trade day, and actual end present
+    in data (<= last trade day). Only the visible page is sent to the browser; paging,
+    sorting and filtering are answered from the stored frame (see page_trade_windows).
+    """
+    if df.empty:
+        return html.Div()
+
+    frame = compute_trade_windows(df, window_size_days)
+    key = _remember_trade_windows(frame)
+    data, page_count = page_trade_windows(frame, 0, page_size)
 
     table = dash_table.DataTable(
-        data=df_out.to_dict("records"),
-        columns=[{"name": c, "id": c} for c in df_out.columns],
-        page_size=min(20, len(df_out)) or 5,
-        page_action="native",
+        id={"type": "trade-window-table", "key": key},
+        data=data,
+        columns=[{"name": name, "id": col, "type": "datetime"} for col, name in TRADE_WINDOW_COLUMNS],
+        page_size=page_size,
+        page_action="custom",
         page_current=0,
+        page_count=page_count,
+        sort_action="custom",
+        sort_mode="multi",
+        sort_by=[],
+        filter_action="custom",
+        filter_query="",
         style_table={"overflowX": "auto", "backgroundColor": "#1a1a1a"},
         style_cell={
             "textAlign": "left", 
@@ -400,7 +1033,7 @@ def build_trade_window_table(df: pd.DataFrame, window_size_days: int, limit: int
         ],
         style_cell_conditional=[
             {
-                "if": {"column_id": "Start (first day of trade)"},
+                "if": {"column_id": "start"},
                 "minWidth": "180px"
             }
         ]
@@ -442,6 +1075,21 @@ def compute_drawdown_recovery(
         Original series plus:
             cum_max, drawdown, drawdown_pct
     """
+    data = _drawdown_data(df, date_col, price_col)
+    if data.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    prices = data[price_col].to_numpy(dtype=float)
+    cum_max = np.maximum.accumulate(prices)
+    return _drawdown_frames(data, date_col, price_col, cum_max, *drawdown_episodes(prices, cum_max))
+
+
+def _drawdown_data(df: pd.DataFrame, date_col: str, price_col: str) -> pd.DataFrame:
+    """[date_col, price_col] of df with dates parsed, prices numeric, NaNs dropped, sorted by date."""
+    if is_normalized(df) and (date_col, price_col) == ("datetime", "index"):
+        # Already clean and sorted: a new frame over the same arrays (callers add columns to it)
+        return pd.DataFrame({date_col: df[date_col].to_numpy(), price_col: df[price_col].to_numpy()}, copy=False)
+
     # Ensure columns exist
     if date_col not in df.columns:
         raise ValueError(f"Column '{date_col}' not found in dataframe. Available columns: {list(df.columns)}")
@@ -453,91 +1101,641 @@ def compute_drawdown_recovery(
     data = data.dropna(subset=[date_col, price_col])
     data[price_col] = pd.to_numeric(data[price_col], errors='coerce')
     data = data.dropna(subset=[price_col])
-    data = data.sort_values(date_col).reset_index(drop=True)
-    
-    if data.empty:
-        return pd.DataFrame(), pd.DataFrame()
-    
+    # Stable: rows with the same timestamp keep their order, so episodes do not depend on the sort
+    return data.sort_values(date_col, kind="stable").reset_index(drop=True)
+
+
+def _drawdown_frames(data: pd.DataFrame, date_col: str, price_col: str, cum_max: np.ndarray,
+                     peak_idx: np.ndarray, trough_idx: np.ndarray, recovery_idx: np.ndarray):
+    """(events_df, annotated) of compute_drawdown_recovery from the running max and episode indices."""
     # Running peak & drawdown
-    data["cum_max"] = data[price_col].cummax()
+    data["cum_max"] = cum_max
     data["drawdown"] = data[price_col] - data["cum_max"]
     data["drawdown_pct"] = data["drawdown"] / data["cum_max"]
     
-    dates = data[date_col].to_list()
-    prices = data[price_col].to_list()
-    n = len(data)
-    
-    episodes = []
-    i = 0
-    
-    # Advance to first record high (start of first episode)
-    while i < n and (i == 0 or prices[i] < data.loc[i, "cum_max"]):
-        if i == 0 and prices[i] == max(prices[: i + 1]):
-            break
-        i += 1
-    
-    # Scan peak -> trough -> recovery
-    while i < n:
-        peak_idx = i
-        peak_val = prices[peak_idx]
-        peak_date = dates[peak_idx]
-        
-        # Move forward until recovery (price >= peak_val) or series ends.
-        j = peak_idx + 1
-        trough_idx = peak_idx
-        trough_val = peak_val
-        
-        while j < n and prices[j] < peak_val:
-            if prices[j] < trough_val:
-                trough_val = prices[j]
-                trough_idx = j
-            j += 1
-        
-        trough_date = dates[trough_idx]
-        dd_pct = (trough_val - peak_val) / peak_val
-        days_to_trough = trough_idx - peak_idx
-        
-        if j < n and prices[j] >= peak_val:
-            # Recovered
-            recovery_idx = j
-            recovery_val = prices[recovery_idx]
-            recovery_date = dates[recovery_idx]
-            days_to_recovery = recovery_idx - peak_idx
-            
-            episodes.append({
-                "peak_date": peak_date,
-                "peak_value": float(peak_val),
-                "trough_date": trough_date,
-                "trough_value": float(trough_val),
-                "recovery_date": recovery_date,
-                "recovery_value": float(recovery_val),
-                "drawdown_pct": float(dd_pct),     # negative number (e.g. -0.20)
-                "days_to_trough": int(days_to_trough),
-                "days_to_recovery": int(days_to_recovery),
-            })
-            
-            # Start next episode at this recovery point's next *record* high
-            i = recovery_idx + 1
-            # fast-forward to next record high (start of next episode)
-            while i < n and prices[i] < max(prices[: i + 1]):
-                i += 1
-        else:
-            # No recovery by end of data → open drawdown
-            episodes.append({
-                "peak_date": peak_date,
-                "peak_value": float(peak_val),
-                "trough_date": trough_date,
-                "trough_value": float(trough_val),
-                "recovery_date": pd.NaT,
-                "recovery_value": pd.NA,
-                "drawdown_pct": float(dd_pct),
-                "days_to_trough": int(days_to_trough),
-                "days_to_recovery": pd.NA,
-            })
-            break
-    
-    events_df = pd.DataFrame(episodes)
+    prices = data[price_col].to_numpy(dtype=float)
+    dates = data[date_col].to_numpy()
+    is_open = recovery_idx < 0
+    rec_safe = np.where(is_open, 0, recovery_idx)
+
+    peak_vals = prices[peak_idx]
+    trough_vals = prices[trough_idx]
+    recovery_dates = dates[rec_safe]
+    recovery_dates[is_open] = np.datetime64("NaT")
+    recovery_vals = prices[rec_safe]
+    days_to_recovery = recovery_idx - peak_idx
+    if is_open.any():
+        # Open drawdowns carry NA recovery fields
+        recovery_vals = recovery_vals.astype(object)
+        recovery_vals[is_open] = pd.NA
+        days_to_recovery = days_to_recovery.astype(object)
+        days_to_recovery[is_open] = pd.NA
+
+    events_df = pd.DataFrame({
+        "peak_date": dates[peak_idx],
+        "peak_value": peak_vals,
+        "trough_date": dates[trough_idx],
+        "trough_value": trough_vals,
+        "recovery_date": recovery_dates,
+        "recovery_value": recovery_vals,
+        "drawdown_pct": (trough_vals - peak_vals) / peak_vals,   # negative number (e.g. -0.20)
+        "days_to_trough": (trough_idx - peak_idx).astype(np.int64),
+        "days_to_recovery": days_to_recovery,
+    })
     annotated = data.copy()
     
     return events_df, annotated
 
+
+def drawdown_episodes(prices: np.ndarray, cum_max: np.ndarray):
+    """
+    Linear-time peak → trough → recovery segmentation of a sorted price series.
+
+    An episode starts at a record high (price == running max) and recovers at the next
+    record high; the following episode starts at the first record high after that
+    recovery row. The trough is the first lowest price strictly between peak and
+    recovery (the peak itself if there is none).
+
+    Returns int arrays (peak_idx, trough_idx, recovery_idx); recovery_idx is -1 for a
+    final episode that has not recovered by the end of the data.
+    """
+    n = len(prices)
+    if n == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    highs = np.flatnonzero(prices >= cum_max)
+    peak_idx = highs[0::2]
+    recovery_idx = highs[1::2]
+    if len(recovery_idx) < len(peak_idx):
+        recovery_idx = np.append(recovery_idx, -1)
+
+    # Rows strictly between each peak and its recovery (or the end of the data)
+    seg_start = peak_idx + 1
+    seg_end = np.where(recovery_idx >= 0, recovery_idx, n)
+    has_rows = seg_end > seg_start
+
+    trough_idx = peak_idx.copy()
+    if has_rows.any():
+        starts, ends = seg_start[has_rows], seg_end[has_rows]
+        # Interleave [start, end) bounds so reduceat yields each segment's minimum at
+        # even slots; the padding keeps an end bound of n addressable.
+        bounds = np.column_stack([starts, ends]).ravel()
+        padded = np.append(prices, np.inf)
+        seg_min = np.minimum.reduceat(padded, bounds)[0::2]
+
+        # Label every row with its segment (-1 outside) and keep the first row
+        # that hits the segment minimum.
+        label = np.full(n, -1, dtype=np.int64)
+        lengths = ends - starts
+        rows = np.repeat(starts - np.cumsum(np.r_[0, lengths[:-1]]), lengths) + np.arange(lengths.sum())
+        label[rows] = np.repeat(np.arange(len(starts)), lengths)
+
+        hit = np.flatnonzero((label >= 0) & (prices == seg_min[np.maximum(label, 0)]))
+        hit_label = label[hit]
+        first = np.r_[True, hit_label[1:] != hit_label[:-1]]
+        trough_idx[np.flatnonzero(has_rows)[hit_label[first]]] = hit[first]
+
+    return peak_idx, trough_idx, recovery_idx
+
+
+# -----------------------------
+# Appended datasets: rows before the append point are unchanged, so only the tail that
+# can see the new rows is recomputed (see datasets.append_dataset)
+# -----------------------------
+
+def _changed_rows(df: pd.DataFrame, changed_at):
+    """(first row of sorted df at/after changed_at, changed_at's day, df's days as datetime64[D])."""
+    changed_at = pd.Timestamp(changed_at)
+    dts = df["datetime"].to_numpy(dtype="datetime64[ns]")
+    k = int(np.searchsorted(dts, np.datetime64(changed_at), side="left"))
+    return k, np.datetime64(changed_at.normalize(), "D"), dts.astype("datetime64[D]")
+
+
+def _first_reaching(days: np.ndarray, upto: int, window_size_days: int, changed_day) -> int:
+    """First row before `upto` whose weekend-aware window end reaches changed_day (upto if none)."""
+    # A window ends at most window_size_days after its start, so only the last few days can reach
+    lo = int(np.searchsorted(days[:upto], changed_day - np.timedelta64(window_size_days + 1, "D")))
+    # End days are non-decreasing, so every row from the first hit on reaches it too
+    return lo + int(np.searchsorted(end_trade_days_with_buffer(days[lo:upto], window_size_days), changed_day))
+
+
+def extend_windowed_returns(df: pd.DataFrame, windows, prev: np.ndarray, changed_at) -> np.ndarray:
+    """
+    compute_windowed_returns_matrix(df, windows), given `prev`, the matrix (same windows) of a
+    frame whose rows before `changed_at` are the same as df's. A row is recomputed only if
+    it is new or its window end reaches changed_at's day.
+    """
+    windows = [max(int(w or 1), 1) for w in windows]
+    k, changed_day, days = _changed_rows(df, changed_at)
+    first = min(k, len(prev))
+    for ws in windows:
+        if ws > 1:
+            first = _first_reaching(days, first, ws, changed_day)
+    lo = max(first - 1, 0)   # 1-day returns look one row back
+    tail = compute_windowed_returns_matrix(df.iloc[lo:], windows)
+    return np.vstack([prev[:first], tail[first - lo:]])
+
+
+def extend_indicators(df: pd.DataFrame, prev: dict, changed_at, columns) -> pd.DataFrame:
+    """
+    build_indicators(df, columns=columns), given `prev` (feature -> column, for columns and
+    the INDICATOR_SEEDED features they depend on) of a frame whose rows before `changed_at`
+    are the same as df's. The tail is rebuilt from INDICATOR_WARMUP_ROWS rows of history,
+    with EMAs and the running max continued from the rows before it.
+    """
+    k, changed_day, days = _changed_rows(df, changed_at)
+    first = min([k] + [len(col) for col in prev.values()])
+    first = _first_reaching(days, first, INDICATOR_MAX_CAL_WINDOW, changed_day)
+    lo = max(first - INDICATOR_WARMUP_ROWS, 0)
+    seed = {}
+    if lo > 0:
+        seed = {name: float(prev[name][lo - 1]) for name in INDICATOR_SEEDED if name in prev}
+        seed["_cum_max"] = float(np.max(pd.to_numeric(df["index"].iloc[:lo], errors="coerce")))
+    tail = build_indicators(df.iloc[lo:].reset_index(drop=True), columns=columns, seed=seed)
+
+    out = pd.DataFrame(index=df.index)
+    for c in tail.columns:
+        out[c] = np.concatenate([prev[c][:first], tail[c].to_numpy(dtype=float)[first - lo:]])
+    return out
+
+
+def extend_drawdown_episodes(prices: np.ndarray, prev_cum_max: np.ndarray, prev_episodes, k: int):
+    """
+    (cum_max, (peak_idx, trough_idx, recovery_idx)) for prices whose first k rows are the
+    same as those of the series prev_cum_max / prev_episodes (drawdown_episodes output) were
+    computed on. Episodes that recovered before row k are kept; the open one is recomputed.
+    """
+    k = min(k, len(prev_cum_max))
+    tail_max = np.maximum.accumulate(prices[k:])
+    if k:
+        tail_max = np.maximum(tail_max, prev_cum_max[k - 1])
+    cum_max = np.concatenate([prev_cum_max[:k], tail_max])
+
+    peak_prev, trough_prev, recovery_prev = (np.asarray(a) for a in prev_episodes)
+    closed = int(np.sum((recovery_prev >= 0) & (recovery_prev < k)))
+    # Restart at the peak of the first episode still open at row k (or at k if none is)
+    p0 = int(peak_prev[closed]) if closed < len(peak_prev) and peak_prev[closed] < k else k
+    peak_new, trough_new, recovery_new = drawdown_episodes(prices[p0:], cum_max[p0:])
+    return cum_max, (
+        np.concatenate([peak_prev[:closed], peak_new + p0]),
+        np.concatenate([trough_prev[:closed], trough_new + p0]),
+        np.concatenate([recovery_prev[:closed], np.where(recovery_new >= 0, recovery_new + p0, -1)]),
+    )
+
+
+class ComputationCache:
+    """
+    Size-bounded LRU memo of numpy results (return arrays, sorted returns, indicator columns).
+    Keys start with the dataset fingerprint and date range. Cached arrays are read-only.
+    Memory is the first tier, but each analysis runs in a fresh background job process whose
+    memory starts cold, so reuse across clicks comes from the `shared` diskcache store (the
+    persistent RESULT_CACHE): results put with persist=True are also written there under
+    result_key by a writer thread, so they outlive the background job that made them.
+    """
+
+    # Writes waiting for the writer thread; beyond this they are dropped (it is only a cache)
+    MAX_PENDING_WRITES = 256
+
+    def __init__(self, budget_bytes: int, shared=None, persist_min_seconds: float = 0.0,
+                 persist_min_bytes: int = 0):
+        self.budget_bytes = budget_bytes
+        self.shared = shared
+        self.persist_min_seconds = persist_min_seconds
+        self.persist_min_bytes = persist_min_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._reset_writer()
+        if hasattr(os, "register_at_fork"):
+            # A forked job process gets no copy of the writer thread (or of a lock it held)
+            os.register_at_fork(after_in_child=self._reset_writer)
+
+    def _reset_writer(self):
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._writer = None
+
+    def get(self, key):
+        """Cached value for key (counted as a hit), or None (counted as a miss)."""
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        value = self.shared.get(result_key("compute", *key)) if self.shared is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._put_local(key, value)
+
+    def worth_persisting(self, seconds: float, nbytes: int) -> bool:
+        """Whether a result that took `seconds` to compute and holds `nbytes` should go to disk too."""
+        return (self.shared is not None and seconds >= self.persist_min_seconds
+                and nbytes >= self.persist_min_bytes)
+
+    def put(self, key, value, persist: bool = False):
+        """
+        Store a numpy array under key, evicting least recently used entries over budget. Returns it.
+        With persist, it is also queued for the shared store (written by a background thread).
+        """
+        value = self._put_local(key, value)
+        if persist and self.shared is not None:
+            with self._lock:
+                if len(self._pending) < self.MAX_PENDING_WRITES:
+                    self._pending.append((key, value))
+                    if self._writer is None:
+                        # Not a daemon: a job process waits for it before exiting
+                        self._writer = threading.Thread(target=self._write_pending, name="compute-cache-writer")
+                        self._writer.start()
+        return value
+
+    def _write_pending(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._writer = None
+                    return
+                key, value = self._pending.popleft()
+            try:
+                self.shared.set(result_key("compute", *key), value, tag="compute")
+            except Exception:
+                # Full or read-only disk: the entry stays in memory only
+                pass
+
+    def _put_local(self, key, value):
+        value.flags.writeable = False
+        nbytes = value.nbytes
+
+        with self._lock:
+            if key not in self._entries and nbytes <= self.budget_bytes:
+                self._entries[key] = (value, nbytes)
+                self._nbytes += nbytes
+                while self._nbytes > self.budget_bytes:
+                    _, (_, dropped) = self._entries.popitem(last=False)
+                    self._nbytes -= dropped
+        return value
+
+    def get_or_compute(self, key, compute, persist: bool = None):
+        """Cached value for key, or compute() stored with `persist` (default: worth_persisting)."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        started = time.perf_counter()
+        value = compute()
+        if persist is None:
+            persist = self.worth_persisting(time.perf_counter() - started, value.nbytes)
+        return self.put(key, value, persist)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self._nbytes, "budget_bytes": self.budget_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._nbytes = 0
+        if self.shared is not None:
+            self.shared.evict("compute")
+
+
+COMPUTE_CACHE = ComputationCache(COMPUTE_CACHE_BUDGET_MB * 1024 * 1024, shared=RESULT_CACHE,
+                                 persist_min_seconds=COMPUTE_PERSIST_MIN_MS / 1000,
+                                 persist_min_bytes=COMPUTE_PERSIST_MIN_KB * 1024)
+
+
+def _range_key(date_range):
+    if date_range is None:
+        return None
+    start, end = date_range
+    return (pd.Timestamp(start).isoformat(), pd.Timestamp(end).isoformat())
+
+
+def _append_parent(base, date_range):
+    """
+    (parent fingerprint, parent range key, changed_at) under which the dataset an append
+    was made to may have cached results for the same slice, or None.
+    `base` is the append metadata the registry keeps: {"parent", "changed_at", "parent_last"}.
+    """
+    if not base:
+        return None
+    changed_at = pd.Timestamp(base["changed_at"])
+    if date_range is None:
+        return base["parent"], None, changed_at
+    start, end = date_range
+    if pd.Timestamp(start) >= changed_at:
+        return None
+    # Same start; the parent's slice stopped at its last row at the latest
+    parent_end = min(pd.Timestamp(end), pd.Timestamp(base["parent_last"]))
+    return base["parent"], _range_key((start, parent_end)), changed_at
+
+
+def cached_windowed_returns(df: pd.DataFrame, windows, fingerprint: str = None, date_range=None,
+                            base: dict = None) -> np.ndarray:
+    """
+    compute_windowed_returns_matrix(df, windows), memoized per window under
+    (fingerprint, date_range) and always persisted, whatever their size: every threshold or
+    window change starts a new job process that needs them again.
+    df must be the dataset sliced to date_range.
+    Without a fingerprint nothing is cached. For a dataset made by an append (`base`),
+    windows the parent has cached are extended with extend_windowed_returns.
+    """
+    windows = [max(int(w or 1), 1) for w in windows]
+    if fingerprint is None or not windows:
+        return compute_windowed_returns_matrix(df, windows)
+
+    rng = _range_key(date_range)
+    cols, missing = {}, []
+    for ws in dict.fromkeys(windows):
+        hit = COMPUTE_CACHE.get(("returns", fingerprint, rng, ws))
+        if hit is None:
+            missing.append(ws)
+        else:
+            cols[ws] = hit
+    parent = _append_parent(base, date_range) if missing else None
+    if parent is not None:
+        parent_fp, parent_rng, changed_at = parent
+        prev = {ws: COMPUTE_CACHE.get(("returns", parent_fp, parent_rng, ws)) for ws in missing}
+        reuse = [ws for ws in missing if prev[ws] is not None]
+        if reuse:
+            mat = extend_windowed_returns(df, reuse, np.column_stack([prev[ws] for ws in reuse]), changed_at)
+            for k, ws in enumerate(reuse):
+                cols[ws] = COMPUTE_CACHE.put(("returns", fingerprint, rng, ws), mat[:, k].copy(), persist=True)
+            missing = [ws for ws in missing if ws not in cols]
+    if missing:
+        # One matrix pass for every window not cached yet
+        mat = compute_windowed_returns_matrix(df, missing)
+        for k, ws in enumerate(missing):
+            cols[ws] = COMPUTE_CACHE.put(("returns", fingerprint, rng, ws), mat[:, k].copy(), persist=True)
+    return np.column_stack([cols[ws] for ws in windows])
+
+
+def cached_sorted_returns(returns, window_size_days: int, fingerprint: str = None, date_range=None) -> np.ndarray:
+    """sorted_returns(returns), memoized (and persisted, like the returns) under (fingerprint, date_range, window)."""
+    if fingerprint is None:
+        return sorted_returns(returns)
+    key = ("sorted_returns", fingerprint, _range_key(date_range), max(int(window_size_days or 1), 1))
+    return COMPUTE_CACHE.get_or_compute(key, lambda: sorted_returns(returns), persist=True)
+
+
+def cached_indicators(df: pd.DataFrame, columns=None, fingerprint: str = None, date_range=None,
+                      base: dict = None) -> pd.DataFrame:
+    """
+    build_indicators(df, columns=columns), memoized per feature column under
+    (fingerprint, date_range); only columns not cached yet are computed, in one call.
+    For a dataset made by an append (`base`) whose parent has them cached, only the tail
+    is recomputed (extend_indicators).
+    """
+    if fingerprint is None:
+        return build_indicators(df, columns=columns)
+
+    requested = INDICATOR_COLUMNS if columns is None else [c for c in INDICATOR_COLUMNS if c in columns]
+    rng = _range_key(date_range)
+    cols, missing = {}, []
+    for c in requested:
+        hit = COMPUTE_CACHE.get(("indicator", fingerprint, rng, c))
+        if hit is None:
+            missing.append(c)
+        else:
+            cols[c] = hit
+    if missing:
+        # The recursive inputs are cached as well, so a later append can continue them
+        todo = [c for c in INDICATOR_COLUMNS if c in missing or (c in INDICATOR_SEEDED and c in _indicator_inputs(missing))]
+        prev = None
+        started = time.perf_counter()
+        parent = _append_parent(base, date_range)
+        if parent is not None:
+            parent_fp, parent_rng, changed_at = parent
+            prev = {c: COMPUTE_CACHE.get(("indicator", parent_fp, parent_rng, c)) for c in todo}
+        if prev and all(col is not None for col in prev.values()):
+            fresh = extend_indicators(df, prev, changed_at, todo)
+        else:
+            fresh = build_indicators(df, columns=todo)
+        persist = COMPUTE_CACHE.worth_persisting(time.perf_counter() - started, 8 * len(fresh) * len(todo))
+        for c in todo:
+            cols[c] = COMPUTE_CACHE.put(("indicator", fingerprint, rng, c), fresh[c].to_numpy(dtype=float), persist)
+
+    out = pd.DataFrame(index=df.index)
+    for c in requested:
+        out[c] = cols[c]
+    return out
+
+
+def cached_drawdown_recovery(df: pd.DataFrame, date_col: str = "datetime", price_col: str = "index",
+                             fingerprint: str = None, base: dict = None):
+    """
+    compute_drawdown_recovery(df, date_col, price_col) for a whole dataset, with the running
+    max and episode indices memoized under fingerprint. For a dataset made by an append
+    (`base`) only the new rows and the drawdown still open before them are recomputed.
+    """
+    data = _drawdown_data(df, date_col, price_col)
+    if data.empty or fingerprint is None:
+        return compute_drawdown_recovery(data, date_col, price_col)
+
+    prices = data[price_col].to_numpy(dtype=float)
+    cum_max = COMPUTE_CACHE.get(("drawdown", fingerprint, None, "cum_max"))
+    episodes = COMPUTE_CACHE.get(("drawdown", fingerprint, None, "episodes"))
+    if cum_max is None or episodes is None:
+        started = time.perf_counter()
+        parent = _append_parent(base, None)
+        prev_cum_max = prev_episodes = None
+        if parent is not None:
+            prev_cum_max = COMPUTE_CACHE.get(("drawdown", parent[0], None, "cum_max"))
+            prev_episodes = COMPUTE_CACHE.get(("drawdown", parent[0], None, "episodes"))
+        if prev_cum_max is not None and prev_episodes is not None:
+            k = int(np.searchsorted(data[date_col].to_numpy(dtype="datetime64[ns]"), np.datetime64(parent[2]), side="left"))
+            cum_max, found = extend_drawdown_episodes(prices, prev_cum_max, prev_episodes, k)
+        else:
+            cum_max = np.maximum.accumulate(prices)
+            found = drawdown_episodes(prices, cum_max)
+        episodes = np.vstack(found).astype(np.int64)
+        # Used as a pair, so both go to disk or neither does
+        persist = COMPUTE_CACHE.worth_persisting(time.perf_counter() - started, cum_max.nbytes + episodes.nbytes)
+        cum_max = COMPUTE_CACHE.put(("drawdown", fingerprint, None, "cum_max"), cum_max, persist)
+        episodes = COMPUTE_CACHE.put(("drawdown", fingerprint, None, "episodes"), episodes, persist)
+    return _drawdown_frames(data, date_col, price_col, cum_max, *episodes)
+
+
+def drawdown_shading(annotated: pd.DataFrame, events_df: pd.DataFrame, date_col: str = "datetime",
+                     price_col: str = "index", max_points: int = None):
+    """
+    (x, y) of one fill='toself' trace shading each episode of events_df between the price
+    and its peak level, episodes separated by None. events_df may be a filtered
+    compute_drawdown_recovery result (its index numbers the episodes); each episode is cut
+    out of annotated by its peak/recovery rows and reduced to its share of max_points.
+    """
+    max_points = max_points or PLOT_MAX_POINTS
+    prices = annotated[price_col].to_numpy(dtype=float)
+    peak_idx, _, recovery_idx = drawdown_episodes(prices, annotated["cum_max"].to_numpy(dtype=float))
+    starts = peak_idx[events_df.index]
+    ends = np.where(recovery_idx[events_df.index] >= 0, recovery_idx[events_df.index], len(annotated) - 1) + 1
+    total = max(int((ends - starts).sum()), 1)
+
+    xs, ys = [], []
+    for p, r in zip(starts, ends):
+        episode = annotated.iloc[p:r]
+        budget = max(3, max_points * len(episode) // (2 * total))
+        x, y = downsample_xy(episode[date_col].to_numpy(), episode[price_col].to_numpy(), budget)
+        x_peak, y_peak = downsample_xy(episode[date_col].to_numpy(), episode["cum_max"].to_numpy(), budget)
+        # Along the price, back along the peak level, then a gap before the next episode
+        xs += [*x, *x_peak[::-1], None]
+        ys += [*y, *y_peak[::-1], None]
+    return xs, ys
+
+
+# Full-resolution traces behind downsampled graphs, keyed by graph key (see downsampled_graph);
+# shared because the figure is built in a background job and zoomed through the web worker.
+_FULL_RES_TRACES = SharedStore("full_res_traces", max_local=64, expire=VIEW_DATA_TTL_SECONDS, cache=RESULT_CACHE)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points that preserve the visual shape
+    of (x, y). First and last points are always kept. x must be sorted and numeric.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float) - float(x[0])
+    y = np.asarray(y, dtype=float)
+
+    # n_out - 2 buckets over the interior points [1, n-1)
+    edges = (np.floor(np.arange(n_out - 1) * ((n - 2) / (n_out - 2))) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    # reduceat runs the last bucket to the end of the array: stop it before the last point
+    avg_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], edges[k + 1]
+        # Third vertex: average of the next bucket (the last point for the final bucket)
+        cx, cy = (avg_x[k + 1], avg_y[k + 1]) if k + 1 < n_out - 2 else (x[-1], y[-1])
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[k + 1] = a
+    return out
+
+
+def _as_plot_numeric(x) -> np.ndarray:
+    """Trace x values as a float array (datetimes → ns since epoch)."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(float)
+    return pd.to_datetime(x).values.astype("datetime64[ns]").view("int64").astype(float)
+
+
+def downsample_xy(x, y, max_points: int = None):
+    """
+    Shape-preserving (LTTB) reduction of one series to at most max_points points
+    (default PLOT_MAX_POINTS). Non-finite y values are dropped before sampling.
+    """
+    max_points = max_points or PLOT_MAX_POINTS
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if len(x) <= max_points:
+        return x, y
+    finite = np.isfinite(y)
+    x, y = x[finite], y[finite]
+    idx = lttb_indices(_as_plot_numeric(x), y, max_points)
+    return x[idx], y[idx]
+
+
+def downsampled_graph(fig, max_points: int = None, **graph_kwargs):
+    """
+    dcc.Graph for fig with every oversized line/bar trace reduced by LTTB.
+    The full series are kept server-side so zooming in re-renders the visible window
+    at full resolution (see zoom_downsampled_traces). A figure with nothing to reduce gets a
+    plain dcc.Graph: no stored data and no zoom callback.
+    """
+    max_points = max_points or PLOT_MAX_POINTS
+    full = {}
+    for i, trace in enumerate(fig.data):
+        if trace.type not in ("scatter", "scattergl", "bar") or trace.x is None or trace.y is None:
+            continue
+        if trace.type != "bar" and "lines" not in (trace.mode or "lines"):
+            continue
+        if len(trace.x) <= max_points:
+            continue
+        x_full, y_full = np.asarray(trace.x), np.asarray(trace.y, dtype=float)
+        full[i] = (x_full, y_full)
+        trace.x, trace.y = downsample_xy(x_full, y_full, max_points)
+
+    if not full:
+        return dcc.Graph(figure=fig, **graph_kwargs)
+    key = uuid.uuid4().hex
+    _FULL_RES_TRACES.set(key, {"traces": full, "max_points": max_points})
+    return dcc.Graph(id={"type": "downsampled-graph", "key": key}, figure=fig, **graph_kwargs)
+
+
+def zoom_downsampled_traces(key: str, relayout: dict):
+    """
+    New (x, y) per trace index for a relayoutData event on a downsampled_graph:
+    the visible x-range at up to max_points (full resolution once zoomed in far enough),
+    or the overview again on autorange. None when there is nothing to update.
+    """
+    entry = _FULL_RES_TRACES.get(key)
+    if entry is None or not relayout:
+        return None
+
+    x0 = x1 = None
+    for k, v in relayout.items():
+        if k.startswith("xaxis") and k.endswith(".range[0]"):
+            x0 = v
+        elif k.startswith("xaxis") and k.endswith(".range[1]"):
+            x1 = v
+        elif k.startswith("xaxis") and k.endswith(".range") and isinstance(v, (list, tuple)):
+            x0, x1 = v
+    autorange = any(k.startswith("xaxis") and k.endswith(".autorange") for k in relayout)
+    if not autorange and (x0 is None or x1 is None):
+        return None
+
+    updates = {}
+    for i, (x_full, y_full) in entry["traces"].items():
+        if autorange:
+            updates[i] = downsample_xy(x_full, y_full, entry["max_points"])
+            continue
+        xs = _as_plot_numeric(x_full)
+        if np.issubdtype(x_full.dtype, np.number):
+            lo_v, hi_v = float(x0), float(x1)
+        else:
+            # relayout bounds arrive as ISO strings with variable sub-second precision
+            lo_v, hi_v = pd.to_datetime([x0, x1], format="ISO8601").values.astype("datetime64[ns]").view("int64").astype(float)
+        # One extra point on each side keeps the line running to the plot edges
+        lo = max(int(np.searchsorted(xs, lo_v, side="left")) - 1, 0)
+        hi = min(int(np.searchsorted(xs, hi_v, side="right")) + 1, len(xs))
+        updates[i] = downsample_xy(x_full[lo:hi], y_full[lo:hi], entry["max_points"])
+    return updates
+
+
+def stored_views_available(outputs) -> bool:
+    """
+    True when every downsampled graph and trade-window table in outputs (components, or
+    tuples/lists/dicts of them) still has its server-side data, so a stored analysis
+    (result_cache.cached_result) can be served again with working zoom and paging.
+    Graphs without a downsampled-graph id have nothing to restore.
+    """
+    stores = {"downsampled-graph": _FULL_RES_TRACES, "trade-window-table": _TRADE_WINDOW_FRAMES}
+    pending = [outputs]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, (list, tuple)):
+            pending.extend(item)
+        elif isinstance(item, dict):
+            pending.extend(item.values())
+        elif isinstance(item, Component):
+            view_id = getattr(item, "id", None)
+            if isinstance(view_id, dict) and view_id.get("type") in stores:
+                if view_id["key"] not in stores[view_id["type"]]:
+                    return False
+            pending.append(getattr(item, "children", None))
+    return True